@@ -0,0 +1,148 @@
+"""
+grep 搜索基准测试
+
+生成合成源码树（源码文件 + node_modules 子树 + 二进制文件），对比原先的
+rglob + 整文件逐行匹配与 file_search 的耗时：
+
+- literal：不含正则元字符的模式（快速路径）
+- regex：正则模式
+- rare：几乎不出现的模式（需要搜索全部文件）
+- common：大量出现的模式（达到 max_results 后提前停止）
+
+indexed 列为使用 TrigramIndex 筛选候选文件后的查询耗时（索引建立耗时单独输出）。
+
+用法：
+    uv run python benchmarks/bench_grep.py
+    uv run python benchmarks/bench_grep.py --files 20000 --workers 16
+    uv run python benchmarks/bench_grep.py --root /mnt/nfs/bench
+"""
+
+import argparse
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from langchain_skills import file_search
+from langchain_skills.trigram_index import TrigramIndex
+
+
+PATTERNS = {
+    "literal rare": "needle_in_haystack",
+    "regex rare": r"def needle_\w+\(",
+    "literal common": "return",
+    "regex common": r"^\s+return \w+",
+}
+
+
+def make_tree(root: Path, files: int, vendor_files: int) -> None:
+    """生成 files 个源码文件和 vendor_files 个 node_modules 文件，约 4KB / 文件"""
+    rng = random.Random(0)
+    words = ["value", "result", "config", "handler", "request", "response", "item", "index"]
+
+    def source(i: int) -> str:
+        lines = []
+        for j in range(40):
+            name = f"{rng.choice(words)}_{j}"
+            lines.append(f"def {name}(arg):\n    return arg + {j}  # {rng.choice(words)}\n")
+        if i % 997 == 0:
+            lines.append("def needle_in_haystack():\n    pass\n")
+        return "".join(lines)
+
+    for i in range(files):
+        path = root / "src" / f"pkg{i % 50:02d}" / f"module_{i:05d}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source(i), encoding="utf-8")
+    for i in range(vendor_files):
+        path = root / "node_modules" / f"lib{i % 100:03d}" / f"index_{i:05d}.js"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source(i), encoding="utf-8")
+    for i in range(files // 20):
+        (root / "src" / f"asset_{i:04d}.png").write_bytes(b"\x89PNG\r\n\x1a\n\0" + os.urandom(4096))
+
+
+def legacy_grep(pattern: str, root: Path, max_results: int) -> list:
+    """原先的实现：rglob 全部文件后过滤，整文件读取逐行匹配"""
+    regex = re.compile(pattern)
+    files = []
+    for p in root.rglob("*"):
+        if p.is_file():
+            if any(part.startswith(".") or part in ("node_modules", "__pycache__", ".git", "venv", ".venv")
+                   for part in p.relative_to(root).parts):
+                continue
+            files.append(p)
+
+    results = []
+    for path in files:
+        if len(results) >= max_results:
+            break
+        lines = path.read_text(encoding="utf-8", errors="ignore").split("\n")
+        for n, line in enumerate(lines, 1):
+            if regex.search(line):
+                results.append((path, n))
+                if len(results) >= max_results:
+                    break
+    return results
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return time.perf_counter() - start, value
+
+
+def run(root: Path, files: int, vendor_files: int, max_results: int) -> None:
+    make_tree(root, files, vendor_files)
+    print(f"{files} source files, {vendor_files} node_modules files, max_results={max_results}")
+    index = TrigramIndex(root)
+    build_time, _ = timed(index.build)
+    print(f"trigram index built in {build_time:.3f}s")
+    print(f"{'pattern':>16} {'legacy (s)':>11} {'sequential (s)':>15} {'parallel (s)':>13} "
+          f"{'indexed (s)':>12} {'matches':>8}")
+
+    for label, pattern in PATTERNS.items():
+        legacy_time, legacy = timed(lambda: legacy_grep(pattern, root, max_results))
+        matcher = file_search.Matcher(pattern)
+        sequential_time, sequential = timed(lambda: file_search.search_files(
+            matcher, file_search.iter_files(root), max_results, parallel=False,
+        ))
+        parallel_time, parallel = timed(lambda: file_search.search(pattern, root, max_results))
+        indexed_time, indexed = timed(lambda: index.search(matcher, root, max_results))
+
+        # 结果应与原先的实现一致（二进制文件中不包含这些模式）
+        expected = sorted(legacy)
+        assert sorted((p, n) for p, n, _ in sequential.matches) == expected or len(legacy) >= max_results
+        assert sorted((p, n) for p, n, _ in parallel.matches) == sorted((p, n) for p, n, _ in sequential.matches)
+        assert indexed.matches == sequential.matches
+        print(f"{label:>16} {legacy_time:>11.3f} {sequential_time:>15.3f} {parallel_time:>13.3f} "
+              f"{indexed_time:>12.4f} {len(parallel.matches):>8}")
+    index.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="grep 搜索基准测试")
+    parser.add_argument("--files", type=int, default=5000, help="源码文件数")
+    parser.add_argument("--vendor-files", type=int, default=20000, help="node_modules 中的文件数")
+    parser.add_argument("--max-results", type=int, default=50)
+    parser.add_argument("--workers", type=int, help="并行搜索线程数（SKILLS_GREP_WORKERS）")
+    parser.add_argument("--root", type=Path, help="生成测试数据的目录（默认临时目录）")
+    args = parser.parse_args()
+
+    if args.workers:
+        os.environ["SKILLS_GREP_WORKERS"] = str(args.workers)
+
+    if args.root:
+        args.root.mkdir(parents=True, exist_ok=True)
+        run(args.root, args.files, args.vendor_files, args.max_results)
+        shutil.rmtree(args.root / "src")
+        shutil.rmtree(args.root / "node_modules")
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            run(Path(tmp), args.files, args.vendor_files, args.max_results)
+
+
+if __name__ == "__main__":
+    main()
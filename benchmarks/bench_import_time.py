@@ -0,0 +1,110 @@
+"""
+导入耗时基准（回归检查）
+
+在独立子进程中多次执行各命令，取中位数。--list-skills / --show-prompt
+只需要 SkillLoader，不应加载 langchain / langgraph；以 agent 导入作为对照。
+
+用法：
+    uv run python benchmarks/bench_import_time.py
+    uv run python benchmarks/bench_import_time.py --runs 20
+    # CI 回归检查：轻量命令的中位数超过 150ms 或加载了 langchain 时返回非零
+    uv run python benchmarks/bench_import_time.py --max-ms 150
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+# 不应出现在轻量命令中的模块
+HEAVY_MODULES = ("langchain", "langchain_core", "langchain_anthropic", "langgraph", "prompt_toolkit")
+
+# (名称, python 参数, 是否为轻量命令)
+CASES = [
+    ("python (baseline)", ["-c", "pass"], False),
+    ("import langchain_skills", ["-c", "import langchain_skills"], True),
+    ("from langchain_skills import SkillLoader", ["-c", "from langchain_skills import SkillLoader"], True),
+    ("import langchain_skills.cli", ["-c", "import langchain_skills.cli"], True),
+    ("langchain-skills --list-skills", ["-m", "langchain_skills.cli", "--list-skills"], True),
+    ("langchain-skills --show-prompt", ["-m", "langchain_skills.cli", "--show-prompt"], True),
+    ("import langchain_skills.agent", ["-c", "import langchain_skills.agent"], False),
+]
+
+# 在子进程退出前检查已加载的重量级模块
+_PROBE = (
+    "import atexit, sys\n"
+    "atexit.register(lambda: sys.stderr.write('\\nHEAVY=' + ','.join(sorted("
+    "m for m in {heavy!r} if m in sys.modules)) + '\\n'))\n"
+)
+
+
+def make_skills(root: Path, count: int) -> None:
+    """生成 count 个合成 skill"""
+    for i in range(count):
+        skill_dir = root / ".claude" / "skills" / f"skill-{i:03d}"
+        skill_dir.mkdir(parents=True)
+        (skill_dir / "SKILL.md").write_text(
+            f"---\nname: skill-{i:03d}\ndescription: 合成 skill {i}，用于导入耗时基准\n---\n# Skill {i}\n",
+            encoding="utf-8",
+        )
+
+
+def run_case(args: list[str], cwd: Path, runs: int) -> tuple[float, list[str]]:
+    """返回 (中位数毫秒, 加载的重量级模块)"""
+    probe = _PROBE.format(heavy=HEAVY_MODULES)
+    if args[0] == "-c":
+        command = [sys.executable, "-c", probe + args[1]]
+    else:
+        command = [sys.executable, "-c", probe + f"import runpy, sys; sys.argv = ['x', *{args[2:]!r}]; "
+                   f"runpy.run_module({args[1]!r}, run_name='__main__')"]
+
+    env = {**os.environ, "NO_COLOR": "1", "SKILLS_INDEX_PATH": ""}
+    timings = []
+    heavy: list[str] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True)
+        timings.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+        for line in result.stderr.splitlines():
+            if line.startswith("HEAVY="):
+                heavy = [m for m in line[len("HEAVY="):].split(",") if m]
+    return statistics.median(timings), heavy
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="导入耗时基准")
+    parser.add_argument("--runs", type=int, default=10, help="每个命令执行次数")
+    parser.add_argument("--skills", type=int, default=50, help="合成 skill 数量")
+    parser.add_argument("--max-ms", type=float, help="轻量命令的中位数上限（毫秒），超出时返回 1")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = Path(tmp)
+        make_skills(cwd, args.skills)
+
+        print(f"{'command':<42} {'median (ms)':>12}  heavy modules")
+        for name, case_args, light in CASES:
+            median, heavy = run_case(case_args, cwd, args.runs)
+            print(f"{name:<42} {median:>12.1f}  {', '.join(heavy) or '-'}")
+            if light and heavy:
+                failures.append(f"{name}: imports {', '.join(heavy)}")
+            if light and args.max_ms is not None and median > args.max_ms:
+                failures.append(f"{name}: {median:.1f}ms > {args.max_ms}ms")
+
+    if failures:
+        print("\nRegressions:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+目录树快照基准测试
+
+生成合成工作目录（源码文件 + node_modules + .gitignore 忽略的 build 目录），
+模拟一次会话中反复调用 glob / grep / list_dir，对比：
+
+- direct：不使用快照（每次 Path.glob / 遍历 / 逐个 stat，build 目录也会遍历）
+- snapshot (gitignore)：使用 TreeSnapshot，解析 .gitignore
+- snapshot (git)：使用 TreeSnapshot，由 git ls-files 提供忽略列表（需要安装 git）
+
+first 列为第一轮（包括建立快照）的耗时，glob / grep / list_dir 列为之后每轮中
+各工具的平均耗时（grep 搜索的模式不出现，需要读取全部未被忽略的文件）。
+
+用法：
+    uv run python benchmarks/bench_tree_snapshot.py
+    uv run python benchmarks/bench_tree_snapshot.py --files 20000 --rounds 50
+"""
+
+import argparse
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from langchain_skills.tools import SkillAgentContext, glob, grep, list_dir
+from langchain_skills.tree_snapshot import TreeSnapshot
+
+
+def make_tree(root: Path, files: int, vendor_files: int, build_files: int) -> None:
+    """生成源码文件、node_modules 文件和被 .gitignore 忽略的构建产物"""
+    body = "".join(f"def handler_{j}(arg):\n    return arg + {j}\n" for j in range(20))
+    for i in range(files):
+        path = root / "src" / f"pkg{i % 50:02d}" / f"module_{i:05d}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body, encoding="utf-8")
+    for i in range(vendor_files):
+        path = root / "node_modules" / f"lib{i % 100:03d}" / f"index_{i:05d}.js"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body, encoding="utf-8")
+    for i in range(build_files):
+        path = root / "build" / f"lib{i % 50:02d}" / f"module_{i:05d}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body, encoding="utf-8")
+    (root / ".gitignore").write_text("build/\n*.pyc\n", encoding="utf-8")
+
+
+# 一轮典型的工具调用
+CALLS = [
+    ("glob", lambda runtime: glob.func("**/*.py", runtime=runtime)),
+    ("glob", lambda runtime: glob.func("src/pkg0*/*.py", runtime=runtime)),
+    ("grep", lambda runtime: grep.func("needle_not_present", ".", runtime=runtime)),
+    ("list_dir", lambda runtime: list_dir.func(".", runtime=runtime)),
+    ("list_dir", lambda runtime: list_dir.func("src/pkg07", runtime=runtime)),
+]
+
+
+def measure(runtime, rounds: int) -> tuple[float, dict[str, float]]:
+    """返回 (第一轮耗时, {工具: 之后每轮的平均耗时})"""
+    start = time.perf_counter()
+    for _, call in CALLS:
+        call(runtime)
+    first = time.perf_counter() - start
+
+    totals = dict.fromkeys((name for name, _ in CALLS), 0.0)
+    for _ in range(rounds):
+        for name, call in CALLS:
+            start = time.perf_counter()
+            call(runtime)
+            totals[name] += time.perf_counter() - start
+    return first, {name: total / max(rounds, 1) for name, total in totals.items()}
+
+
+def run(root: Path, files: int, vendor_files: int, build_files: int, rounds: int) -> None:
+    make_tree(root, files, vendor_files, build_files)
+    has_git = shutil.which("git") is not None
+    if has_git:
+        subprocess.run(["git", "init", "-q"], cwd=root, check=True)
+    print(f"{files} source files, {vendor_files} node_modules files, {build_files} ignored build files, "
+          f"{rounds} rounds")
+    print(f"{'mode':>22} {'first (s)':>10} {'glob (s)':>9} {'grep (s)':>9} {'list_dir (s)':>13} {'dirs listed':>12}")
+
+    modes = [("direct", None), ("snapshot (gitignore)", False)]
+    if has_git:
+        modes.append(("snapshot (git)", True))
+    for label, use_git in modes:
+        snapshot = TreeSnapshot(root, use_git=use_git) if use_git is not None else None
+        runtime = SimpleNamespace(context=SkillAgentContext(
+            skill_loader=None, working_directory=root, tree_snapshot=snapshot,
+        ))
+        first, per_tool = measure(runtime, rounds)
+        scans = snapshot.scans if snapshot is not None else "-"
+        print(f"{label:>22} {first:>10.3f} {per_tool['glob']:>9.4f} {per_tool['grep']:>9.4f} "
+              f"{per_tool['list_dir']:>13.5f} {scans:>12}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="目录树快照基准测试")
+    parser.add_argument("--files", type=int, default=5000, help="源码文件数")
+    parser.add_argument("--vendor-files", type=int, default=20000, help="node_modules 中的文件数")
+    parser.add_argument("--build-files", type=int, default=5000, help=".gitignore 忽略的 build 目录中的文件数")
+    parser.add_argument("--rounds", type=int, default=20, help="第一轮之后重复的轮数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run(Path(tmp), args.files, args.vendor_files, args.build_files, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
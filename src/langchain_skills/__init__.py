@@ -75,28 +75,55 @@ def my_tool(arg: str, runtime: ToolRuntime[MyContext]) -> str:
 ```
 """
 
-from .agent import LangChainSkillsAgent, create_skills_agent
-from .skill_loader import SkillLoader, SkillMetadata, SkillContent, discover_skills, get_skill_content
-from .tools import load_skill, bash, read_file, write_file, ALL_TOOLS, SkillAgentContext
+import importlib
+from typing import TYPE_CHECKING
 
 __version__ = "0.1.0"
 
-__all__ = [
+# 公开名称 -> 所在子模块
+#
+# 按需导入：`from langchain_skills import SkillLoader` 只加载 skill_loader，
+# 不会触发 agent / tools 对 langchain、langgraph 的导入（约 1 秒）。
+_LAZY_ATTRS = {
     # Agent
-    "LangChainSkillsAgent",
-    "create_skills_agent",
+    "LangChainSkillsAgent": "agent",
+    "create_skills_agent": "agent",
     # Skill Loader
-    "SkillLoader",
-    "SkillMetadata",
-    "SkillContent",
-    "discover_skills",
-    "get_skill_content",
+    "SkillLoader": "skill_loader",
+    "SkillMetadata": "skill_loader",
+    "SkillContent": "skill_loader",
+    "discover_skills": "skill_loader",
+    "get_skill_content": "skill_loader",
     # Tools (注意：list_skills 已删除，skills 列表在 system prompt 中注入)
-    "load_skill",
-    "bash",
-    "read_file",
-    "write_file",
-    "ALL_TOOLS",
+    "load_skill": "tools",
+    "search_skills": "tools",
+    "search_references": "tools",
+    "bash": "tools",
+    "read_file": "tools",
+    "write_file": "tools",
+    "ALL_TOOLS": "tools",
     # Context
-    "SkillAgentContext",
-]
+    "SkillAgentContext": "tools",
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+if TYPE_CHECKING:
+    from .agent import LangChainSkillsAgent, create_skills_agent
+    from .skill_loader import SkillLoader, SkillMetadata, SkillContent, discover_skills, get_skill_content
+    from .tools import load_skill, search_skills, search_references, bash, read_file, write_file, ALL_TOOLS, SkillAgentContext
+
+
+def __getattr__(name: str):
+    """首次访问时导入对应子模块，并缓存到包的命名空间"""
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
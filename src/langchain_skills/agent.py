@@ -12,21 +12,39 @@ LangChain Skills Agent 主体
 
 流式输出支持：
 - 支持 Extended Thinking 显示模型思考过程
-- 事件级流式输出 (thinking / text / tool_call / tool_result)
+- 事件级流式输出 (thinking / text / tool_call / tool_progress / tool_result)
+
+Skills 相关度排序（SKILLS_PROMPT_TOP_K，默认 30）：
+- Skills 数量超过 top-k 时，只注入与会话首条用户消息最相关的 top-k 个
+- 其余 Skills 由 search_skills 工具检索，system prompt 大小不随库的增长而增长
+
+Prompt Cache 支持（SKILLS_PROMPT_CACHE=1）：
+- 工具定义和 system prompt 的 Skills 部分设置 cache_control 断点
+- warm_up() 在启动时预热前缀缓存，后续请求按 cache read 计费
 """
 
 import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Iterator
+from typing import AsyncIterator, Optional, Iterator
 
 from dotenv import load_dotenv
 from langchain.agents import create_agent
+from langchain.agents.middleware import ModelRequest, dynamic_prompt
 from langchain.chat_models import init_chat_model
-from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage
 from langgraph.checkpoint.memory import InMemorySaver
 
-from .skill_loader import SkillLoader
+from .prompts import BASE_SYSTEM_PROMPT
+from .read_cache import ReadCache
+from .shell_session import ShellSessionPool, sessions_supported
+from .skill_loader import SkillLoader, default_prompt_token_budget, default_prompt_top_k
+from .token_budget import PromptPlan
+from .tool_concurrency import ToolConcurrencyMiddleware, default_tool_concurrency
 from .tools import ALL_TOOLS, SkillAgentContext
+from .tree_snapshot import TreeSnapshot
+from .trigram_index import TrigramIndex, default_index_dir
 from .stream import StreamEventEmitter, ToolCallTracker, is_success, DisplayLimits
 
 
@@ -40,6 +58,27 @@ DEFAULT_MAX_TOKENS = 16000
 DEFAULT_TEMPERATURE = 1.0  # Extended Thinking 要求温度为 1.0
 DEFAULT_THINKING_BUDGET = 10000
 
+# Anthropic prompt cache 断点
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# 按首条用户消息缓存的 system prompt 分块数量
+RANKED_PROMPT_CACHE_SIZE = 256
+
+
+def _first_user_text(messages: list) -> str:
+    """提取会话中第一条用户消息的文本"""
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            content = message.content
+            if isinstance(content, str):
+                return content
+            return " ".join(
+                part if isinstance(part, str) else part.get("text", "")
+                for part in content
+                if isinstance(part, (str, dict))
+            )
+    return ""
+
 
 def get_anthropic_credentials() -> tuple[str | None, str | None]:
     """
@@ -91,6 +130,14 @@ class LangChainSkillsAgent:
         temperature: Optional[float] = None,
         enable_thinking: bool = True,
         thinking_budget: int = DEFAULT_THINKING_BUDGET,
+        prompt_caching: Optional[bool] = None,
+        skill_top_k: Optional[int] = None,
+        prompt_token_budget: Optional[int] = None,
+        shell_session: Optional[bool] = None,
+        tool_concurrency: Optional[int] = None,
+        read_cache: Optional[bool] = None,
+        grep_index: Optional[bool] = None,
+        tree_snapshot: Optional[bool] = None,
     ):
         """
         初始化 Agent
@@ -103,6 +150,23 @@ class LangChainSkillsAgent:
             temperature: 温度参数 (启用 thinking 时强制为 1.0)
             enable_thinking: 是否启用 Extended Thinking
             thinking_budget: thinking 的 token 预算
+            prompt_caching: 是否设置 Anthropic prompt cache 断点，
+                默认读取 SKILLS_PROMPT_CACHE
+            skill_top_k: Skills 数量超过该值时只注入最相关的 top-k 个，
+                默认读取 SKILLS_PROMPT_TOP_K（30），<= 0 表示全部注入
+            prompt_token_budget: system prompt 的 token 上限，超出时缩短或移除
+                低优先级 Skills 的描述，默认读取 SKILLS_PROMPT_TOKEN_BUDGET（16000），
+                <= 0 表示不限
+            shell_session: bash 工具是否为每个对话线程保留常驻 shell（cd / export
+                在调用之间保留），默认读取 SKILLS_SHELL_SESSION；Windows 上不可用
+            tool_concurrency: 同一轮中并发执行的工具调用数上限，
+                默认读取 SKILLS_TOOL_CONCURRENCY（8）
+            read_cache: 同一对话线程中重复读取未变化的文件时是否只返回提示（变化较少时返回 diff），
+                默认读取 SKILLS_READ_CACHE（默认启用，设为 0 关闭）
+            grep_index: 是否在后台为工作目录建立三元组索引供 grep 筛选候选文件，
+                默认读取 SKILLS_GREP_INDEX；SKILLS_GREP_INDEX_DIR 设置持久化目录
+            tree_snapshot: glob / grep / list_dir 是否共用遵循 .gitignore 的目录树快照，
+                默认读取 SKILLS_TREE_SNAPSHOT（默认启用，设为 0 关闭）
         """
         # thinking 配置
         self.enable_thinking = enable_thinking
@@ -116,6 +180,33 @@ class LangChainSkillsAgent:
         else:
             self.temperature = temperature or float(os.getenv("MODEL_TEMPERATURE", str(DEFAULT_TEMPERATURE)))
         self.working_directory = working_directory or Path.cwd()
+        if prompt_caching is None:
+            prompt_caching = os.getenv("SKILLS_PROMPT_CACHE", "").lower() in ("1", "true", "yes")
+        self.prompt_caching = prompt_caching
+        self.skill_top_k = default_prompt_top_k() if skill_top_k is None else skill_top_k
+        if prompt_token_budget is None:
+            prompt_token_budget = default_prompt_token_budget()
+        self.prompt_token_budget = prompt_token_budget
+        if shell_session is None:
+            shell_session = os.getenv("SKILLS_SHELL_SESSION", "").lower() in ("1", "true", "yes")
+        self.shell_sessions = ShellSessionPool() if shell_session and sessions_supported() else None
+        self.tool_concurrency = default_tool_concurrency() if tool_concurrency is None else max(1, tool_concurrency)
+        if read_cache is None:
+            read_cache = os.getenv("SKILLS_READ_CACHE", "1").lower() not in ("0", "false", "no")
+        self.read_cache = ReadCache() if read_cache else None
+        if tree_snapshot is None:
+            tree_snapshot = os.getenv("SKILLS_TREE_SNAPSHOT", "1").lower() not in ("0", "false", "no")
+        self.tree_snapshot = TreeSnapshot(self.working_directory) if tree_snapshot else None
+        if grep_index is None:
+            grep_index = os.getenv("SKILLS_GREP_INDEX", "").lower() in ("1", "true", "yes")
+        self.grep_index = (
+            TrigramIndex(
+                self.working_directory, cache_dir=default_index_dir(), snapshot=self.tree_snapshot,
+            ).start()
+            if grep_index else None
+        )
+        self._ranked_blocks: OrderedDict[str, list[str]] = OrderedDict()
+        self._ranked_lock = threading.Lock()
 
         # 初始化 SkillLoader
         self.skill_loader = SkillLoader(skill_paths)
@@ -127,8 +218,15 @@ class LangChainSkillsAgent:
         self.context = SkillAgentContext(
             skill_loader=self.skill_loader,
             working_directory=self.working_directory,
+            shell_sessions=self.shell_sessions,
+            read_cache=self.read_cache,
+            grep_index=self.grep_index,
+            tree_snapshot=self.tree_snapshot,
         )
 
+        # 会话记忆（单独保存，重建 Agent 时不会丢失对话历史）
+        self.checkpointer = InMemorySaver()
+
         # 创建 LangChain Agent
         self.agent = self._create_agent()
 
@@ -138,45 +236,81 @@ class LangChainSkillsAgent:
 
         这是 Level 1 的核心：将所有 Skills 的元数据注入到 system prompt。
         每个 skill 约 100 tokens，启动时一次性加载。
-        """
-        base_prompt = """You are a helpful coding assistant with access to specialized skills.
 
-Your capabilities include:
-- Loading and using specialized skills for specific tasks
-- Executing bash commands and scripts
-- Reading and writing files
-- Following skill instructions to complete complex tasks
-
-When a user request matches a skill's description, use the load_skill tool to get detailed instructions before proceeding."""
+        Skills 超过 skill_top_k 时这里是不含用户请求的版本（用于 --show-prompt
+        和预热），实际请求由 _select_system_prompt 按首条用户消息挑选。
+        """
+        with self._ranked_lock:
+            self._ranked_blocks.clear()
+        self.prompt_plan: PromptPlan = self.skill_loader.plan_system_prompt(
+            BASE_SYSTEM_PROMPT, top_k=self.skill_top_k, token_budget=self.prompt_token_budget,
+        )
+        self._system_blocks = self.prompt_plan.blocks
+        # Skills 超过 top_k 时每个会话注入的 Skills 部分不同，只有基础 prompt 是稳定前缀
+        self._ranked = self.skill_top_k > 0 and len(self.skill_loader.skill_names()) > self.skill_top_k
+        return self.prompt_plan.prompt
 
-        return self.skill_loader.build_system_prompt(base_prompt)
+    def _build_system_message(self, blocks: Optional[list[str]] = None) -> SystemMessage:
+        """
+        构建分块的 system message（启用 prompt cache 时使用）
 
-    def _create_agent(self):
+        基础 prompt 和 Skills 部分各占一个 content block，
+        缓存断点由 AnthropicPromptCachingMiddleware 设置在最后一块（Skills 部分）。
+        Skills 按请求挑选时基础 prompt 也设置断点：工具定义 + 基础 prompt 在所有
+        会话间相同，warm_up() 预热的正是这段前缀。
         """
-        创建 LangChain Agent
+        content = [{"type": "text", "text": block} for block in (blocks or self._system_blocks)]
+        if self._ranked and len(content) > 1:
+            content[0]["cache_control"] = CACHE_CONTROL
+        return SystemMessage(content=content)
 
-        使用 LangChain 1.0 的 create_agent API:
-        - model: 可以是字符串 ID 或 model 实例
-        - tools: 工具列表
-        - system_prompt: 系统提示（Level 1 注入 Skills 元数据）
-        - context_schema: 上下文类型（供 ToolRuntime 使用）
-        - checkpointer: 会话记忆
+    def _ranked_system_blocks(self, query: str) -> list[str]:
+        """
+        按用户请求挑选 Skills 后的 system prompt 分块
 
-        Extended Thinking 支持:
-        - 启用后可获取模型的思考过程
-        - 温度必须为 1.0
+        以首条用户消息为键缓存：同一会话的每一轮得到相同的 system prompt，
+        prompt cache 前缀保持稳定，BM25 检索也只在会话开始时执行一次。
+        """
+        with self._ranked_lock:
+            blocks = self._ranked_blocks.get(query)
+            if blocks is not None:
+                self._ranked_blocks.move_to_end(query)
+                return blocks
+
+        blocks = self.skill_loader.build_system_prompt_blocks(
+            BASE_SYSTEM_PROMPT, query=query, top_k=self.skill_top_k, token_budget=self.prompt_token_budget,
+        )
+        with self._ranked_lock:
+            self._ranked_blocks[query] = blocks
+            while len(self._ranked_blocks) > RANKED_PROMPT_CACHE_SIZE:
+                self._ranked_blocks.popitem(last=False)
+        return blocks
+
+    def _select_system_prompt(self, request: ModelRequest) -> str | SystemMessage:
+        """dynamic_prompt 中间件：按会话首条用户消息注入最相关的 top-k 个 Skills"""
+        blocks = self._ranked_system_blocks(_first_user_text(request.state["messages"]))
+        if self.prompt_caching:
+            return self._build_system_message(blocks)
+        return "\n\n".join(blocks)
+
+    def _create_model(self, max_tokens: Optional[int] = None, enable_thinking: Optional[bool] = None):
+        """
+        初始化 Anthropic 模型
 
-        认证支持:
-        - 支持 ANTHROPIC_API_KEY 或 ANTHROPIC_AUTH_TOKEN
-        - 支持 ANTHROPIC_BASE_URL 第三方代理
+        Args:
+            max_tokens: 覆盖默认 max_tokens（warm_up 使用）
+            enable_thinking: 覆盖默认 thinking 开关（warm_up 使用）
         """
+        if enable_thinking is None:
+            enable_thinking = self.enable_thinking
+
         # 获取认证信息
         api_key, base_url = get_anthropic_credentials()
 
         # 构建初始化参数
         init_kwargs = {
             "temperature": self.temperature,
-            "max_tokens": self.max_tokens,
+            "max_tokens": max_tokens or self.max_tokens,
         }
 
         # 添加认证参数（支持第三方代理）
@@ -186,30 +320,139 @@ When a user request matches a skill's description, use the load_skill tool to ge
             init_kwargs["base_url"] = base_url
 
         # Extended Thinking 配置（直接传递，避免 model_kwargs 警告）
-        if self.enable_thinking:
+        if enable_thinking:
             init_kwargs["thinking"] = {
                 "type": "enabled",
                 "budget_tokens": self.thinking_budget,
             }
 
-        # 初始化模型
-        model = init_chat_model(
+        return init_chat_model(
             self.model_name,
             model_provider="anthropic",
             **init_kwargs,
         )
 
+    def _create_agent(self):
+        """
+        创建 LangChain Agent
+
+        使用 LangChain 1.0 的 create_agent API:
+        - model: 可以是字符串 ID 或 model 实例
+        - tools: 工具列表
+        - system_prompt: 系统提示（Level 1 注入 Skills 元数据）
+        - context_schema: 上下文类型（供 ToolRuntime 使用）
+        - checkpointer: 会话记忆
+
+        Extended Thinking 支持:
+        - 启用后可获取模型的思考过程
+        - 温度必须为 1.0
+
+        认证支持:
+        - 支持 ANTHROPIC_API_KEY 或 ANTHROPIC_AUTH_TOKEN
+        - 支持 ANTHROPIC_BASE_URL 第三方代理
+
+        并行工具调用:
+        - 同一轮的工具调用并发执行（上限 tool_concurrency），结果按调用顺序写回
+        - ToolConcurrencyMiddleware 串行化同一路径上的写工具
+
+        Skills 相关度排序（skill_top_k > 0）:
+        - dynamic_prompt 中间件按会话首条用户消息替换 system prompt
+
+        Prompt Cache（prompt_caching=True）:
+        - system prompt 分块发送，Skills 部分与最后一个工具定义设置 cache_control
+        - 对话尾部同样设置断点，多轮对话按 cache read 计费
+        """
+        # 初始化模型
+        model = self._create_model()
+
+        # 同一轮的多个工具调用并发执行，写同一文件的工具串行
+        middleware = [ToolConcurrencyMiddleware(self.working_directory)]
+        system_prompt = self.system_prompt
+        if self.skill_top_k > 0:
+            # 需在 prompt cache 中间件之前执行，缓存断点才会打在替换后的 system prompt 上
+            middleware.append(dynamic_prompt(self._select_system_prompt))
+        if self.prompt_caching:
+            from langchain_anthropic.middleware import AnthropicPromptCachingMiddleware
+
+            system_prompt = self._build_system_message()
+            middleware.append(AnthropicPromptCachingMiddleware(unsupported_model_behavior="ignore"))
+
         # 创建 Agent
         agent = create_agent(
             model=model,
             tools=ALL_TOOLS,
-            system_prompt=self.system_prompt,
+            system_prompt=system_prompt,
+            middleware=middleware,
             context_schema=SkillAgentContext,
-            checkpointer=InMemorySaver(),
+            checkpointer=self.checkpointer,
         )
 
         return agent
 
+    def warm_up(self) -> dict:
+        """
+        预热 prompt cache
+
+        发送一个只包含工具定义和 system prompt 的最小请求（max_tokens=1，
+        不启用 thinking），让 Anthropic 缓存这段前缀。之后真正的请求
+        命中缓存，首 token 延迟和输入费用都会降低。
+
+        Skills 按首条用户消息挑选时（见 _select_system_prompt），实际请求的
+        Skills 部分各不相同，只预热其中稳定的部分：工具定义 + 基础 prompt。
+
+        thinking 参数只影响消息部分的缓存，工具定义和 system prompt
+        的缓存在启用 thinking 的请求中同样可以命中。
+
+        Returns:
+            usage 信息（含 cache_creation_input_tokens / cache_read_input_tokens），
+            未启用 prompt_caching 时返回空字典
+        """
+        if not self.prompt_caching:
+            return {}
+
+        model = self._create_model(max_tokens=1, enable_thinking=False)
+
+        # 与 AnthropicPromptCachingMiddleware 相同的打标方式：最后一个工具 + system 最后一块
+        last_tool = ALL_TOOLS[-1]
+        tools = [
+            *ALL_TOOLS[:-1],
+            last_tool.model_copy(update={"extras": {**(last_tool.extras or {}), "cache_control": CACHE_CONTROL}}),
+        ]
+        blocks = self._build_system_message().content
+        if self._ranked:
+            # 基础 prompt 已设置断点（见 _build_system_message），与实际请求的前缀逐字节一致
+            blocks = blocks[:1]
+        else:
+            blocks[-1]["cache_control"] = CACHE_CONTROL
+
+        response = model.bind_tools(tools).invoke([
+            SystemMessage(content=blocks),
+            HumanMessage(content="ping"),
+        ])
+        return dict(getattr(response, "response_metadata", {}).get("usage", {}) or {})
+
+    def watch_skills(self, **kwargs):
+        """
+        监听 Skills 目录变化（适用于 Web 服务等长期运行的进程）
+
+        Skills 增删改时自动重建 system prompt 和 Agent，会话记忆保留。
+
+        Args:
+            **kwargs: 传给 SkillWatcher 的参数（debounce, poll_interval 等）
+
+        Returns:
+            SkillWatcher 实例，可继续注册 on_added / on_removed 等回调
+        """
+        watcher = self.skill_loader.watch(**kwargs)
+        if self._on_skills_changed not in watcher._batch_callbacks:
+            watcher.on_batch(self._on_skills_changed)
+        return watcher
+
+    def _on_skills_changed(self, batch) -> None:
+        """Skills 变化后重建 system prompt 和 Agent（整体替换引用，进行中的请求不受影响）"""
+        self.system_prompt = self._build_system_prompt()
+        self.agent = self._create_agent()
+
     def get_system_prompt(self) -> str:
         """
         获取当前 system prompt
@@ -234,6 +477,10 @@ When a user request matches a skill's description, use the load_skill tool to ge
             for s in skills
         ]
 
+    def _run_config(self, thread_id: str) -> dict:
+        """单次运行的 config：会话 ID 与并行工具调用的并发上限"""
+        return {"configurable": {"thread_id": thread_id}, "max_concurrency": self.tool_concurrency}
+
     def invoke(self, message: str, thread_id: str = "default") -> dict:
         """
         同步调用 Agent
@@ -245,7 +492,7 @@ When a user request matches a skill's description, use the load_skill tool to ge
         Returns:
             Agent 响应
         """
-        config = {"configurable": {"thread_id": thread_id}}
+        config = self._run_config(thread_id)
 
         result = self.agent.invoke(
             {"messages": [{"role": "user", "content": message}]},
@@ -266,7 +513,7 @@ When a user request matches a skill's description, use the load_skill tool to ge
         Yields:
             流式响应块 (完整状态更新)
         """
-        config = {"configurable": {"thread_id": thread_id}}
+        config = self._run_config(thread_id)
 
         for chunk in self.agent.stream(
             {"messages": [{"role": "user", "content": message}]},
@@ -289,60 +536,30 @@ When a user request matches a skill's description, use the load_skill tool to ge
             - {"type": "thinking", "content": "..."} - 思考内容片段
             - {"type": "text", "content": "..."} - 响应文本片段
             - {"type": "tool_call", "name": "...", "args": {...}} - 工具调用
+            - {"type": "tool_progress", "name": "...", "id": "...", "stream": "stdout", "content": "..."}
+              - 工具执行中的增量输出（bash）
             - {"type": "tool_result", "name": "...", "content": "...", "success": bool} - 工具结果
             - {"type": "done", "response": "..."} - 完成标记，包含完整响应
         """
-        config = {"configurable": {"thread_id": thread_id}}
+        config = self._run_config(thread_id)
         emitter = StreamEventEmitter()
         tracker = ToolCallTracker()
 
         full_response = ""
         debug = os.getenv("SKILLS_DEBUG", "").lower() in ("1", "true", "yes")
 
-        # 使用 messages 模式获取 token 级流式
+        # messages 模式获取 token 级流式，custom 模式获取工具通过 stream_writer 推送的进度
         try:
-            for event in self.agent.stream(
+            for mode, event in self.agent.stream(
                 {"messages": [{"role": "user", "content": message}]},
                 config=config,
                 context=self.context,
-                stream_mode="messages",
+                stream_mode=["messages", "custom"],
             ):
-                # event 可能是 tuple(message, metadata) 或直接 message
-                if isinstance(event, tuple) and len(event) >= 2:
-                    chunk = event[0]
-                else:
-                    chunk = event
-
-                if debug:
-                    chunk_type = type(chunk).__name__
-                    print(f"[DEBUG] Event: {chunk_type}")
-
-                # 处理 AIMessageChunk / AIMessage
-                if isinstance(chunk, (AIMessageChunk, AIMessage)):
-                    # 处理 content
-                    for ev in self._process_chunk_content(chunk, emitter, tracker):
-                        if ev.type == "text":
-                            full_response += ev.data.get("content", "")
-                        if debug:
-                            print(f"[DEBUG] Yielding: {ev.type}")
-                        yield ev.data
-
-                    # 处理 tool_calls (有些情况下在 chunk.tool_calls 中)
-                    if hasattr(chunk, "tool_calls") and chunk.tool_calls:
-                        for ev in self._process_tool_calls(chunk.tool_calls, emitter, tracker):
-                            if debug:
-                                print(f"[DEBUG] Yielding from tool_calls: {ev.type}")
-                            yield ev.data
-
-                # 处理 ToolMessage (工具执行结果)
-                elif hasattr(chunk, "type") and chunk.type == "tool":
-                    if debug:
-                        tool_name = getattr(chunk, "name", "unknown")
-                        print(f"[DEBUG] Processing tool result: {tool_name}")
-                    for ev in self._process_tool_result(chunk, emitter, tracker):
-                        if debug:
-                            print(f"[DEBUG] Yielding: {ev.type}")
-                        yield ev.data
+                for data in self._translate_stream_item(mode, event, emitter, tracker, debug):
+                    if data["type"] == "text":
+                        full_response += data.get("content", "")
+                    yield data
 
             if debug:
                 print("[DEBUG] Stream completed normally")
@@ -359,6 +576,104 @@ When a user request matches a skill's description, use the load_skill tool to ge
         # 发送完成事件
         yield emitter.done(full_response).data
 
+    async def astream_events(self, message: str, thread_id: str = "default") -> AsyncIterator[dict]:
+        """
+        stream_events() 的异步版本
+
+        Agent 以异步方式运行，工具调用使用各工具的异步实现（bash 使用 asyncio
+        子进程，文件工具在有界线程池中执行），同一进程可同时服务多个对话
+        而不必为每次工具调用占用一个线程。事件格式与 stream_events() 相同。
+
+        Args:
+            message: 用户消息
+            thread_id: 会话 ID
+
+        Yields:
+            事件字典
+        """
+        config = self._run_config(thread_id)
+        emitter = StreamEventEmitter()
+        tracker = ToolCallTracker()
+
+        full_response = ""
+        debug = os.getenv("SKILLS_DEBUG", "").lower() in ("1", "true", "yes")
+
+        try:
+            async for mode, event in self.agent.astream(
+                {"messages": [{"role": "user", "content": message}]},
+                config=config,
+                context=self.context,
+                stream_mode=["messages", "custom"],
+            ):
+                for data in self._translate_stream_item(mode, event, emitter, tracker, debug):
+                    if data["type"] == "text":
+                        full_response += data.get("content", "")
+                    yield data
+
+        except Exception as e:
+            if debug:
+                import traceback
+                print(f"[DEBUG] Stream error: {e}")
+                traceback.print_exc()
+            yield emitter.error(str(e)).data
+            raise
+
+        yield emitter.done(full_response).data
+
+    def _translate_stream_item(
+        self,
+        mode: str,
+        event,
+        emitter: StreamEventEmitter,
+        tracker: ToolCallTracker,
+        debug: bool = False,
+    ) -> Iterator[dict]:
+        """把 agent.stream 的一项 (mode, event) 转换为事件字典"""
+        if mode == "custom":
+            if isinstance(event, dict) and event.get("type") == "tool_progress":
+                yield emitter.tool_progress(
+                    event.get("name", ""),
+                    event.get("content", ""),
+                    event.get("id", ""),
+                    event.get("stream", "stdout"),
+                ).data
+            return
+
+        # event 可能是 tuple(message, metadata) 或直接 message
+        if isinstance(event, tuple) and len(event) >= 2:
+            chunk = event[0]
+        else:
+            chunk = event
+
+        if debug:
+            chunk_type = type(chunk).__name__
+            print(f"[DEBUG] Event: {chunk_type}")
+
+        # 处理 AIMessageChunk / AIMessage
+        if isinstance(chunk, (AIMessageChunk, AIMessage)):
+            # 处理 content
+            for ev in self._process_chunk_content(chunk, emitter, tracker):
+                if debug:
+                    print(f"[DEBUG] Yielding: {ev.type}")
+                yield ev.data
+
+            # 处理 tool_calls (有些情况下在 chunk.tool_calls 中)
+            if hasattr(chunk, "tool_calls") and chunk.tool_calls:
+                for ev in self._process_tool_calls(chunk.tool_calls, emitter, tracker):
+                    if debug:
+                        print(f"[DEBUG] Yielding from tool_calls: {ev.type}")
+                    yield ev.data
+
+        # 处理 ToolMessage (工具执行结果)
+        elif hasattr(chunk, "type") and chunk.type == "tool":
+            if debug:
+                tool_name = getattr(chunk, "name", "unknown")
+                print(f"[DEBUG] Processing tool result: {tool_name}")
+            for ev in self._process_tool_result(chunk, emitter, tracker):
+                if debug:
+                    print(f"[DEBUG] Yielding: {ev.type}")
+                yield ev.data
+
     def _process_chunk_content(self, chunk, emitter: StreamEventEmitter, tracker: ToolCallTracker):
         """处理 chunk 的 content"""
         content = chunk.content
@@ -487,7 +802,7 @@ When a user request matches a skill's description, use the load_skill tool to ge
         # 基于内容判断是否成功（统一使用 is_success）
         success = is_success(content)
 
-        yield emitter.tool_result(name, content, success)
+        yield emitter.tool_result(name, content, success, getattr(chunk, "tool_call_id", "") or "")
 
     def get_last_response(self, result: dict) -> str:
         """
@@ -522,6 +837,9 @@ def create_skills_agent(
     working_directory: Optional[Path] = None,
     enable_thinking: bool = True,
     thinking_budget: int = DEFAULT_THINKING_BUDGET,
+    prompt_caching: Optional[bool] = None,
+    skill_top_k: Optional[int] = None,
+    prompt_token_budget: Optional[int] = None,
 ) -> LangChainSkillsAgent:
     """
     便捷函数：创建 Skills Agent
@@ -532,6 +850,9 @@ def create_skills_agent(
         working_directory: 工作目录
         enable_thinking: 是否启用 Extended Thinking
         thinking_budget: thinking 的 token 预算
+        prompt_caching: 是否设置 Anthropic prompt cache 断点
+        skill_top_k: Level 1 注入的 Skills 数量上限
+        prompt_token_budget: system prompt 的 token 上限
 
     Returns:
         配置好的 LangChainSkillsAgent 实例
@@ -542,4 +863,7 @@ def create_skills_agent(
         working_directory=working_directory,
         enable_thinking=enable_thinking,
         thinking_budget=thinking_budget,
+        prompt_caching=prompt_caching,
+        skill_top_k=skill_top_k,
+        prompt_token_budget=prompt_token_budget,
     )
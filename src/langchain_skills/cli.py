@@ -24,23 +24,17 @@ import sys
 from pathlib import Path
 
 from dotenv import load_dotenv
-from prompt_toolkit import PromptSession
-from prompt_toolkit.history import FileHistory
-from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-from prompt_toolkit.formatted_text import HTML
 from rich.console import Console, Group
 from rich.panel import Panel
-from rich.markdown import Markdown
 from rich.table import Table
 from rich.live import Live
 from rich.text import Text
 from rich.spinner import Spinner
-from rich.layout import Layout
-from rich.syntax import Syntax
-from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 
-from .agent import LangChainSkillsAgent, check_api_credentials
-from .skill_loader import SkillLoader
+# 注意：agent（langchain / langgraph）、prompt_toolkit、rich.markdown、rich.syntax
+# 导入开销较大，在用到的命令中才导入，--list-skills / --show-prompt 无需加载
+from .prompts import BASE_SYSTEM_PROMPT
+from .skill_loader import SkillLoader, default_prompt_token_budget, default_prompt_top_k
 from .stream import (
     ToolResultFormatter,
     has_args,
@@ -77,6 +71,7 @@ class StreamState:
         self.response_text = ""
         self.tool_calls = []
         self.tool_results = []
+        self.tool_progress = {}  # tool_id -> 执行中的最新输出（bash 实时输出）
         self.is_thinking = False
         self.is_responding = False
         self.is_processing = False  # 工具执行后等待 AI 继续处理
@@ -130,9 +125,15 @@ class StreamState:
             else:
                 self.tool_calls.append(tc_data)
 
+        elif event_type == "tool_progress":
+            tool_id = event.get("id", "")
+            output = self.tool_progress.get(tool_id, "") + event.get("content", "")
+            self.tool_progress[tool_id] = output[-DisplayLimits.TOOL_PROGRESS_TAIL:]
+
         elif event_type == "tool_result":
             self.is_processing = True  # 工具执行完成，等待 AI 继续处理
             self.tool_results.append({
+                "id": event.get("id", ""),
                 "name": event.get("name", "unknown"),
                 "content": event.get("content", ""),
             })
@@ -159,6 +160,7 @@ class StreamState:
             "response_text": self.response_text,
             "tool_calls": self.tool_calls,
             "tool_results": self.tool_results,
+            "tool_progress": self.tool_progress,
             "is_thinking": self.is_thinking,
             "is_responding": self.is_responding,
             "is_processing": self.is_processing,
@@ -185,6 +187,8 @@ def display_final_results(
         show_thinking: 是否显示 thinking
         show_response_panel: 是否用 Panel 显示响应
     """
+    from rich.markdown import Markdown
+
     # 显示 thinking
     if show_thinking and state.thinking_text:
         display_thinking = state.thinking_text
@@ -199,10 +203,11 @@ def display_final_results(
 
     # 显示工具调用和结果（Claude Code 风格）
     if show_tools and state.tool_calls:
+        paired = pair_tool_results(state.tool_calls, state.tool_results)
         for i, tc in enumerate(state.tool_calls):
             # 判断是否有结果及成功状态
-            has_result = i < len(state.tool_results)
-            tr = state.tool_results[i] if has_result else None
+            tr = paired[i]
+            has_result = tr is not None
             content = tr.get('content', '') if tr else ''
 
             # 确定状态和颜色
@@ -249,6 +254,32 @@ def display_final_results(
             console.print()
 
 
+def pair_tool_results(tool_calls: list, tool_results: list) -> list:
+    """
+    把工具结果与工具调用配对
+
+    并行工具调用的结果按完成顺序到达，优先按 id 配对；
+    没有 id 的结果按顺序填入剩余的调用。
+
+    Returns:
+        与 tool_calls 等长的列表，尚无结果的位置为 None
+    """
+    paired = [None] * len(tool_calls)
+    index_by_id = {tc.get("id"): i for i, tc in enumerate(tool_calls) if tc.get("id")}
+    unmatched = []
+    for tr in tool_results:
+        i = index_by_id.get(tr.get("id"))
+        if i is not None and paired[i] is None:
+            paired[i] = tr
+        else:
+            unmatched.append(tr)
+
+    free = (i for i in range(len(tool_calls)) if paired[i] is None)
+    for tr, i in zip(unmatched, free):
+        paired[i] = tr
+    return paired
+
+
 def format_tool_result(name: str, content: str, max_length: int = 800, compact: bool = False) -> list:
     """
     智能格式化工具结果
@@ -319,6 +350,29 @@ def format_tool_result_compact(name: str, content: str, max_lines: int = 5) -> l
     return elements
 
 
+def format_tool_progress(output: str, max_lines: int = DisplayLimits.TOOL_PROGRESS_LINES) -> list:
+    """
+    格式化执行中工具的实时输出（只显示最后几行）
+
+    Args:
+        output: 已收到的输出
+        max_lines: 最大显示行数
+
+    Returns:
+        Rich 可渲染元素列表
+    """
+    # 进度条常用 \r 覆盖当前行，只保留每行最后一次覆盖的内容
+    lines = [line.rsplit("\r", 1)[-1] for line in output.rstrip().split("\n")]
+    lines = [line for line in lines if line.strip()]
+    elements = []
+    for i, line in enumerate(lines[-max_lines:]):
+        prefix = "└" if i == 0 else " "
+        if len(line) > 80:
+            line = line[:77] + "..."
+        elements.append(Text(f"  {prefix} {line}", style="dim"))
+    return elements
+
+
 def format_tool_args(args: dict, max_length: int = 300) -> list:
     """
     格式化工具参数显示
@@ -330,6 +384,8 @@ def format_tool_args(args: dict, max_length: int = 300) -> list:
     Returns:
         Rich 可渲染元素列表
     """
+    from rich.syntax import Syntax
+
     elements = []
     try:
         args_formatted = json.dumps(args, indent=2, ensure_ascii=False)
@@ -353,6 +409,7 @@ def create_streaming_display(
     is_responding: bool = False,
     is_waiting: bool = False,
     is_processing: bool = False,
+    tool_progress: dict = None,
 ) -> Group:
     """
     创建流式显示的布局
@@ -366,13 +423,17 @@ def create_streaming_display(
         is_responding: 是否正在响应
         is_waiting: 是否处于初始等待状态
         is_processing: 工具执行后等待 AI 继续处理
+        tool_progress: tool_id -> 执行中工具的最新输出
 
     Returns:
         Rich Group 对象
     """
+    from rich.markdown import Markdown
+
     elements = []
     tool_calls = tool_calls or []
     tool_results = tool_results or []
+    tool_progress = tool_progress or {}
 
     # 判断是否有工具正在执行中
     is_tool_executing = len(tool_calls) > len(tool_results)
@@ -401,10 +462,11 @@ def create_streaming_display(
 
     # Tool Calls 和 Results 配对显示（Claude Code 风格）
     if tool_calls:
+        paired = pair_tool_results(tool_calls, tool_results)
         for i, tc in enumerate(tool_calls):
             # 判断工具状态
-            has_result = i < len(tool_results)
-            tr = tool_results[i] if has_result else None
+            tr = paired[i]
+            has_result = tr is not None
 
             # 确定状态和颜色
             if has_result:
@@ -438,7 +500,8 @@ def create_streaming_display(
                 )
                 elements.extend(result_elements)
             else:
-                # 还没有结果，显示带 spinner 的"正在执行"状态
+                # 还没有结果：显示实时输出的最后几行，以及带 spinner 的"正在执行"状态
+                elements.extend(format_tool_progress(tool_progress.get(tc.get('id', ''), "")))
                 spinner = Spinner("dots", text=" 执行中...", style="yellow")
                 elements.append(spinner)
 
@@ -512,12 +575,44 @@ def cmd_list_skills():
     console.print(table)
 
 
-def cmd_show_prompt():
-    """显示 system prompt（演示 Level 1）"""
+def cmd_build_bundle(output: str):
+    """
+    将 Skills 目录编译为单文件 bundle
+
+    Args:
+        output: bundle 输出路径（通过 SKILLS_BUNDLE 指定给 agent 使用）
+    """
+    from .skill_bundle import build_bundle
+
+    loader = SkillLoader(use_bundle=False)
+    skills = build_bundle(loader.skill_paths, Path(output))
+    size = Path(output).stat().st_size
+
+    console.print(f"[green]✓[/green] Bundled {len(skills)} skills into [bold]{output}[/bold] ({size:,} bytes)")
+    for skill in skills:
+        console.print(f"  - {skill.name}")
+    console.print(f"\n[dim]Use it with: SKILLS_BUNDLE={output}[/dim]")
+
+
+def cmd_show_prompt(token_budget: int | None = None):
+    """
+    显示 system prompt（演示 Level 1）及每个 skill 的 token 成本
+
+    Args:
+        token_budget: system prompt 的 token 上限，默认读取 SKILLS_PROMPT_TOKEN_BUDGET
+    """
+    from rich.markdown import Markdown
+
     console.print("\n[bold cyan]Building System Prompt (Level 1)...[/bold cyan]\n")
 
-    agent = LangChainSkillsAgent()
-    prompt = agent.get_system_prompt()
+    # 与 Agent 相同的构建参数，但无需导入 agent（langchain）
+    loader = SkillLoader()
+    plan = loader.plan_system_prompt(
+        BASE_SYSTEM_PROMPT,
+        top_k=default_prompt_top_k(),
+        token_budget=default_prompt_token_budget() if token_budget is None else token_budget,
+    )
+    prompt = plan.prompt
 
     console.print(Panel(
         Markdown(prompt),
@@ -526,12 +621,33 @@ def cmd_show_prompt():
         border_style="green",
     ))
 
-    # 统计信息
-    skills = agent.get_discovered_skills()
-    token_estimate = len(prompt) // 4  # 粗略估算
+    # 每个 skill 的成本（按优先级排列）
+    if plan.skills:
+        table = Table(title="Skill Token Costs")
+        table.add_column("Skill", style="green")
+        table.add_column("Full", justify="right")
+        table.add_column("Injected", justify="right")
+        table.add_column("Mode")
+        mode_styles = {"full": "white", "short": "yellow", "dropped": "red"}
+        for cost in plan.skills:
+            table.add_row(
+                cost.name,
+                str(cost.full_tokens),
+                str(cost.tokens),
+                f"[{mode_styles[cost.mode]}]{cost.mode}[/{mode_styles[cost.mode]}]",
+            )
+        console.print(table)
+
+    # 统计信息（离线估算，中文按字计数）
+    skills = loader.scan_skills()
+    budget = f" / budget {plan.token_budget}" if plan.token_budget and plan.token_budget > 0 else ""
 
     console.print(f"\n[dim]Skills discovered: {len(skills)}[/dim]")
-    console.print(f"[dim]Estimated tokens: ~{token_estimate}[/dim]")
+    console.print(
+        f"[dim]Skills injected: {plan.count('full')} full, {plan.count('short')} shortened, "
+        f"{plan.count('dropped')} dropped[/dim]"
+    )
+    console.print(f"[dim]Estimated tokens: ~{plan.total_tokens}{budget}[/dim]")
 
 
 def cmd_run(prompt: str, enable_thinking: bool = True):
@@ -542,6 +658,8 @@ def cmd_run(prompt: str, enable_thinking: bool = True):
         prompt: 用户请求
         enable_thinking: 是否启用 thinking 显示
     """
+    from .agent import LangChainSkillsAgent, check_api_credentials
+
     console.print(Panel(f"[bold cyan]User Request:[/bold cyan]\n{prompt}"))
     console.print()
 
@@ -595,6 +713,13 @@ def cmd_interactive(enable_thinking: bool = True):
     Args:
         enable_thinking: 是否启用 thinking 显示
     """
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.history import FileHistory
+    from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
+    from prompt_toolkit.formatted_text import HTML
+
+    from .agent import LangChainSkillsAgent, check_api_credentials
+
     print_banner()
 
     # 检查 API 认证（支持 ANTHROPIC_API_KEY 或 ANTHROPIC_AUTH_TOKEN）
@@ -701,6 +826,9 @@ Examples:
   # 显示 system prompt（演示 Level 1）
   %(prog)s --show-prompt
 
+  # 编译 Skills bundle（worker 通过 SKILLS_BUNDLE 加载）
+  %(prog)s --build-bundle skills.bundle
+
   # 执行请求（默认启用 thinking）
   %(prog)s "提取这篇公众号文章: https://mp.weixin.qq.com/s/xxx"
 
@@ -737,6 +865,16 @@ Features:
         action="store_true",
         help="显示 system prompt（演示 Level 1）",
     )
+    parser.add_argument(
+        "--build-bundle",
+        metavar="OUTPUT",
+        help="将 Skills 目录编译为单文件 bundle（配合 SKILLS_BUNDLE 使用）",
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        help="system prompt 的 token 上限（默认读取 SKILLS_PROMPT_TOKEN_BUDGET）",
+    )
     parser.add_argument(
         "--no-thinking",
         action="store_true",
@@ -758,10 +896,12 @@ Features:
     enable_thinking = not args.no_thinking
 
     # 执行命令
-    if args.list_skills:
+    if args.build_bundle:
+        cmd_build_bundle(args.build_bundle)
+    elif args.list_skills:
         cmd_list_skills()
     elif args.show_prompt:
-        cmd_show_prompt()
+        cmd_show_prompt(token_budget=args.token_budget)
     elif args.interactive:
         cmd_interactive(enable_thinking=enable_thinking)
     elif args.prompt:
@@ -0,0 +1,359 @@
+"""
+大文件的分页读取
+
+read_file 原先把整个文件读入内存并解码，只为返回前 2000 行，
+2000 行之后的内容也无法访问。这里基于 mmap 按需读取：
+
+- LineIndex：稀疏的行偏移索引，每处理 INDEX_BLOCK_BYTES 字节记录一个
+  (行号, 字节偏移) 检查点；只扫描到请求的行为止，按 (mtime_ns, size) 缓存，
+  翻页时不必从头扫描
+- read_lines：从检查点向前定位到起始行，只解码返回的那一页
+- read_tail：从文件末尾向前查找换行符，读取最后 N 行
+- read_bytes：按字节范围读取
+
+与 read_text 的 universal newlines 一致，\n、\r\n 和单独的 \r 都是行结束符，
+返回的行内容不含行结束符。
+
+内存占用与返回的页大小成正比，与文件大小无关。
+
+使用示例：
+    page = read_lines(path, offset=100_000, limit=50)
+    for number, line in page.lines:
+        print(number, line)
+"""
+
+import bisect
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+
+
+# 索引检查点之间的字节数（也是构建索引时每次读取的块大小）
+INDEX_BLOCK_BYTES = 1024 * 1024
+
+# 缓存的行索引数
+MAX_CACHED_INDEXES = 32
+
+# 判断二进制文件时检查的字节数
+BINARY_SNIFF_BYTES = 8192
+
+# 查找行结束符时每次搜索的字节数（\n 和 \r 分别查找，限定范围避免整个文件都没有
+# 某一种时每行都扫描到文件末尾）
+LINE_SCAN_BYTES = 64 * 1024
+
+# 单行返回的最大字节数，超出部分截断（避免压缩后的单行文件占满上下文）
+MAX_LINE_BYTES = 4000
+
+# read_file 默认返回的行数
+DEFAULT_READ_LINES = 2000
+
+# 字节范围模式默认读取的字节数和单次读取的上限
+DEFAULT_BYTE_RANGE = 64 * 1024
+MAX_BYTE_RANGE = 256 * 1024
+
+
+class BinaryFileError(ValueError):
+    """文件是二进制或无法按 UTF-8 解码"""
+
+
+@dataclass
+class FilePage:
+    """一页读取结果"""
+    lines: list[tuple[int, str]]        # [(行号, 内容)]，行号从 1 开始
+    file_size: int
+    total_lines: Optional[int] = None   # 已扫描到文件末尾时为总行数
+    has_more: bool = False              # 这一页之后是否还有内容
+
+    @property
+    def next_offset(self) -> Optional[int]:
+        """下一页的起始行号"""
+        if not self.has_more or not self.lines:
+            return None
+        return self.lines[-1][0] + 1
+
+
+@dataclass
+class LineIndex:
+    """
+    稀疏行偏移索引
+
+    检查点 (lines[i], offsets[i]) 的字节偏移一定是该行的开头。检查点大约每
+    INDEX_BLOCK_BYTES 字节一个，定位时从最近的检查点向后扫描，最多扫描一个块。
+    """
+    stamp: tuple[int, int]                                  # (mtime_ns, size)
+    lines: list[int] = field(default_factory=lambda: [1])   # 检查点的行号
+    offsets: list[int] = field(default_factory=lambda: [0])  # 检查点的字节偏移
+    complete: bool = False                                  # 是否已扫描到文件末尾
+    total_lines: Optional[int] = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def _extend(self, mm: mmap.mmap, until_line: Optional[int] = None) -> None:
+        """向后扫描并追加检查点，直到覆盖 until_line 或到达文件末尾"""
+        size = len(mm)
+        while not self.complete and (until_line is None or self.lines[-1] <= until_line):
+            start = self.offsets[-1]
+            end = min(start + INDEX_BLOCK_BYTES, size)
+            if end < size:
+                # 检查点必须落在行首：块在最后一个行结束符之后结束（\r\n 不拆开）
+                block_end = end
+                terminator, end = _prev_line_end(mm, block_end)
+                if terminator < start:
+                    _, end = _line_end(mm, block_end)
+                elif end < size and mm[end - 1] == _CR and mm[end] == _LF:
+                    end += 1
+            newlines = _count_line_ends(mm[start:end])
+            if end >= size:
+                self.complete = True
+                ends_with_newline = size > 0 and mm[size - 1] in (_LF, _CR)
+                self.total_lines = self.lines[-1] + newlines - (1 if ends_with_newline or size == 0 else 0)
+                break
+            self.lines.append(self.lines[-1] + newlines)
+            self.offsets.append(end)
+
+    def locate(self, mm: mmap.mmap, line: int) -> Optional[int]:
+        """
+        返回第 line 行开头的字节偏移
+
+        Returns:
+            字节偏移，行号超出文件末尾时返回 None
+        """
+        with self.lock:
+            self._extend(mm, line)
+            i = bisect.bisect_right(self.lines, line) - 1
+            current, position = self.lines[i], self.offsets[i]
+
+        size = len(mm)
+        while current < line:
+            if position >= size:
+                return None
+            _, position = _line_end(mm, position)
+            current += 1
+        return position if position < size else None
+
+    def count_lines(self, mm: mmap.mmap) -> int:
+        """扫描到文件末尾，返回总行数"""
+        with self.lock:
+            self._extend(mm)
+            return self.total_lines
+
+
+_indexes: "OrderedDict[Path, LineIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _get_index(path: Path, stamp: tuple[int, int]) -> LineIndex:
+    """取得（必要时新建）文件的行索引，文件变化后重建"""
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None or index.stamp != stamp:
+            index = LineIndex(stamp)
+            _indexes[path] = index
+        _indexes.move_to_end(path)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+        return index
+
+
+@contextmanager
+def _open_mmap(path: Path) -> Iterator[tuple[Optional[mmap.mmap], tuple[int, int]]]:
+    """只读映射文件，空文件返回 None（mmap 不支持长度为 0 的映射）"""
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        stamp = (st.st_mtime_ns, st.st_size)
+        if st.st_size == 0:
+            yield None, stamp
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mm, stamp
+        finally:
+            mm.close()
+
+
+def _check_text(mm: mmap.mmap) -> None:
+    """文件开头包含 NUL 字节时视为二进制文件"""
+    if mm.find(b"\0", 0, min(len(mm), BINARY_SNIFF_BYTES)) >= 0:
+        raise BinaryFileError("binary file")
+
+
+def _decode_line(mm: mmap.mmap, start: int, end: int) -> str:
+    """解码 [start, end) 的一行（不含换行符），超长时截断"""
+    if end - start <= MAX_LINE_BYTES:
+        try:
+            return mm[start:end].decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise BinaryFileError(str(e)) from e
+    text = mm[start:start + MAX_LINE_BYTES].decode("utf-8", errors="ignore")
+    return f"{text} ... (line truncated, {end - start} bytes in total)"
+
+
+_LF = ord("\n")
+_CR = ord("\r")
+
+
+def _count_line_ends(data: bytes) -> int:
+    """统计行结束符数（\r\n 计为一个）"""
+    count = data.count(b"\n")
+    cr = data.count(b"\r")
+    if cr:
+        count += cr - data.count(b"\r\n")
+    return count
+
+
+def _line_end(mm: mmap.mmap, start: int) -> tuple[int, int]:
+    """返回 (行内容结束位置, 下一行开头)"""
+    size = len(mm)
+    position = start
+    while position < size:
+        stop = min(position + LINE_SCAN_BYTES, size)
+        newline = mm.find(b"\n", position, stop)
+        cr = mm.find(b"\r", position, stop if newline < 0 else newline)
+        if cr >= 0:
+            if cr + 1 < size and mm[cr + 1] == _LF:
+                return cr, cr + 2
+            return cr, cr + 1
+        if newline >= 0:
+            return newline, newline + 1
+        position = stop
+    return size, size
+
+
+def _prev_line_end(mm: mmap.mmap, position: int) -> tuple[int, int]:
+    """
+    查找 position 之前的最后一个行结束符
+
+    Returns:
+        (行结束符开头, 下一行开头)；没有时返回 (-1, 0)
+    """
+    while position > 0:
+        low = max(0, position - LINE_SCAN_BYTES)
+        newline = mm.rfind(b"\n", low, position)
+        cr = mm.rfind(b"\r", max(low, newline + 1), position)
+        if cr >= 0:
+            return cr, cr + 1
+        if newline >= 0:
+            if newline > 0 and mm[newline - 1] == _CR:
+                return newline - 1, newline + 1
+            return newline, newline + 1
+        position = low
+    return -1, 0
+
+
+def read_lines(path: Path, offset: int = 1, limit: int = 2000) -> FilePage:
+    """
+    读取从第 offset 行开始的 limit 行
+
+    Args:
+        path: 文件路径
+        offset: 起始行号（从 1 开始）
+        limit: 最多返回的行数
+
+    Returns:
+        FilePage（offset 超出文件末尾时 lines 为空）
+
+    Raises:
+        BinaryFileError: 二进制文件或无法按 UTF-8 解码
+        OSError: 无法读取文件
+    """
+    offset = max(1, offset)
+    with _open_mmap(path) as (mm, stamp):
+        if mm is None:
+            return FilePage([], 0, total_lines=0)
+        _check_text(mm)
+
+        index = _get_index(path, stamp)
+        position = index.locate(mm, offset)
+        lines = []
+        if position is not None:
+            number = offset
+            while len(lines) < limit and position < len(mm):
+                end, next_start = _line_end(mm, position)
+                lines.append((number, _decode_line(mm, position, end)))
+                position = next_start
+                number += 1
+        return FilePage(
+            lines=lines,
+            file_size=len(mm),
+            total_lines=index.total_lines if index.complete else None,
+            has_more=position is not None and position < len(mm),
+        )
+
+
+def read_tail(path: Path, count: int = 100) -> FilePage:
+    """
+    读取文件的最后 count 行
+
+    从文件末尾向前查找换行符，只读取返回的部分；行号来自行索引
+    （首次调用时以块为单位统计全文件的换行符数，结果会被缓存）。
+
+    Args:
+        path: 文件路径
+        count: 行数
+
+    Returns:
+        FilePage
+
+    Raises:
+        BinaryFileError: 二进制文件或无法按 UTF-8 解码
+        OSError: 无法读取文件
+    """
+    with _open_mmap(path) as (mm, stamp):
+        if mm is None:
+            return FilePage([], 0, total_lines=0)
+        _check_text(mm)
+
+        size = len(mm)
+        # 末尾的行结束符属于最后一行
+        end = size
+        if mm[size - 1] == _LF:
+            end = size - 2 if size > 1 and mm[size - 2] == _CR else size - 1
+        elif mm[size - 1] == _CR:
+            end = size - 1
+        starts = []
+        position = end
+        while len(starts) < count:
+            terminator, start = _prev_line_end(mm, position)
+            starts.append(start)
+            if terminator < 0:
+                break
+            position = terminator
+
+        total = _get_index(path, stamp).count_lines(mm)
+        first_number = total - len(starts) + 1
+        lines = []
+        for number, start in enumerate(reversed(starts), first_number):
+            line_end, _ = _line_end(mm, start)
+            lines.append((number, _decode_line(mm, start, min(line_end, end))))
+        return FilePage(lines=lines, file_size=size, total_lines=total, has_more=False)
+
+
+def read_bytes(path: Path, start: int, length: int) -> tuple[str, int, int, int]:
+    """
+    按字节范围读取
+
+    Args:
+        path: 文件路径
+        start: 起始字节偏移（负数表示从文件末尾倒数）
+        length: 读取的字节数（上限 MAX_BYTE_RANGE）
+
+    Returns:
+        (文本, 起始偏移, 结束偏移, 文件大小)；范围边界截断的多字节字符以替换字符表示
+
+    Raises:
+        OSError: 无法读取文件
+    """
+    length = max(0, min(length, MAX_BYTE_RANGE))
+    with _open_mmap(path) as (mm, stamp):
+        size = stamp[1]
+        if mm is None:
+            return "", 0, 0, 0
+        if start < 0:
+            start = max(0, size + start)
+        start = min(start, size)
+        data = mm[start:start + length]
+        return data.decode("utf-8", errors="replace"), start, start + len(data), size
@@ -0,0 +1,335 @@
+"""
+grep 工具的文件搜索
+
+原先的实现先 rglob 出全部文件（node_modules 等目录也会完整遍历，之后才过滤），
+再逐个整文件读取（包括二进制文件）并在单线程中逐行匹配。这里：
+
+- iter_files：遍历时直接跳过隐藏目录和 SKIP_DIRS，不进入被排除的子树
+- 打开文件后 mmap，开头包含 NUL 字节的文件视为二进制文件跳过
+- 不含正则元字符的模式走字面量快速路径：先在 mmap 上查找，不包含时不解码
+- 正则模式先在整个文件上搜索候选位置，只对候选所在的行做逐行匹配
+  （结果与逐行匹配一致；模式包含 lookaround / \\A / \\Z、原子组或占有量词时
+  整文件搜索可能漏掉匹配的行，回退到逐行匹配）
+- 换行符按通用换行处理（\\r\\n 和 \\r 视为换行），与 read_text 后逐行匹配一致
+- 多个文件在线程池中并行搜索，结果按遍历顺序合并，达到 max_results 后停止
+
+使用示例：
+    result = search("def main", Path("src"))
+    for path, line_number, line in result.matches:
+        print(path, line_number, line)
+"""
+
+import itertools
+import mmap
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from .skill_loader import _env_int
+
+
+# 遍历时跳过的目录（以 . 开头的文件和目录也会跳过）
+SKIP_DIRS = frozenset({"node_modules", "__pycache__", "venv"})
+
+# 判断二进制文件时检查的字节数
+BINARY_SNIFF_BYTES = 8192
+
+# 默认返回的匹配数
+DEFAULT_MAX_RESULTS = 50
+
+# 并行搜索的线程数（SKILLS_GREP_WORKERS）；单核机器上线程切换的开销大于收益，
+# 默认不超过 CPU 数，网络存储上 I/O 等待占主要时间时可以调大
+DEFAULT_SEARCH_WORKERS = min(8, os.cpu_count() or 1)
+
+# 每个线程池任务搜索的文件数
+FILES_PER_TASK = 16
+
+# 每个线程预先提交的任务数
+_PREFETCH_PER_WORKER = 4
+
+# 整文件搜索可能与逐行匹配结果不同的语法
+_LINE_ONLY_SYNTAX = ("(?=", "(?!", "(?<=", "(?<!", "\\A", "\\Z", "(?>")
+
+# 占有量词（*+ ++ ?+ {m,n}+）不回溯，整文件搜索时可能越过换行后无法退回；
+# 宁可误判（如 \++），误判只是改为逐行匹配
+_POSSESSIVE = re.compile(r"[*+?}]\+")
+
+# 包含这些字符的模式不走字面量快速路径（换行符不可能出现在单行中）
+_NON_LITERAL_CHARACTERS = frozenset(".^$*+?{}[]\\|()\n")
+
+
+@dataclass
+class SearchResult:
+    """搜索结果"""
+    matches: list[tuple[Path, int, str]] = field(default_factory=list)  # [(文件, 行号, 行内容)]
+    files_searched: int = 0       # 实际搜索的文本文件数（不含跳过的二进制文件）
+    truncated: bool = False       # 是否因达到 max_results 提前停止
+
+
+class Matcher:
+    """
+    编译后的搜索模式
+
+    匹配语义与对每一行执行 re.search(pattern, line) 相同。
+    """
+
+    def __init__(self, pattern: str):
+        """
+        Args:
+            pattern: 正则表达式
+
+        Raises:
+            re.error: 模式非法
+        """
+        self.pattern = pattern
+        self.regex = re.compile(pattern)
+        self.literal: Optional[str] = None
+        self.scan: Optional[re.Pattern] = None
+        if pattern and not any(c in _NON_LITERAL_CHARACTERS for c in pattern):
+            self.literal = pattern
+        elif not any(syntax in pattern for syntax in _LINE_ONLY_SYNTAX) and not _POSSESSIVE.search(pattern):
+            # 逐行匹配的位置在整个文件中按 MULTILINE 搜索时一定也能匹配，
+            # 因此最左侧的候选位置之前不会有匹配的行
+            self.scan = re.compile(pattern, re.MULTILINE)
+
+    @property
+    def literal_bytes(self) -> Optional[bytes]:
+        return self.literal.encode("utf-8") if self.literal is not None else None
+
+    def _candidate(self, text: str, position: int) -> int:
+        """position 之后第一个可能匹配的位置，没有时返回 -1"""
+        if self.literal is not None:
+            return text.find(self.literal, position)
+        if self.scan is not None:
+            match = self.scan.search(text, position)
+            return match.start() if match else -1
+        return position if position <= len(text) else -1
+
+    def find_lines(self, text: str, limit: int) -> list[tuple[int, str]]:
+        """
+        返回匹配的行
+
+        Args:
+            text: 文件内容
+            limit: 最多返回的行数
+
+        Returns:
+            [(行号, 行内容)]，行内容不含换行符
+        """
+        found = []
+        position = 0
+        line_number = 1
+        counted = 0
+        while len(found) < limit:
+            start = self._candidate(text, position)
+            if start < 0:
+                break
+            line_start = text.rfind("\n", 0, start) + 1
+            line_end = text.find("\n", start)
+            if line_end < 0:
+                line_end = len(text)
+            line_number += text.count("\n", counted, line_start)
+            counted = line_start
+
+            line = text[line_start:line_end]
+            if self.literal is not None or self.regex.search(line):
+                found.append((line_number, line))
+            position = line_end + 1
+            if position > len(text):
+                break
+        return found
+
+
+def iter_files(root: Path, directories: Optional[list[Path]] = None) -> Iterator[Path]:
+    """
+    按名称顺序深度优先遍历 root 下的文件
+
+    隐藏文件、隐藏目录和 SKIP_DIRS 中的目录在遍历时跳过，不会进入其子树；
+    不跟随目录的符号链接（避免循环）。
+
+    Args:
+        root: 根目录
+        directories: 不为 None 时，遍历到的目录（包括 root）追加到该列表
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        if directories is not None:
+            directories.append(Path(directory))
+
+        subdirs = []
+        for entry in entries:
+            if entry.name.startswith(".") or entry.name in SKIP_DIRS:
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    yield Path(entry.path)
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
+
+
+def search_file(path: Path, matcher: Matcher, limit: int) -> Optional[list[tuple[int, str]]]:
+    """
+    搜索单个文件
+
+    Args:
+        path: 文件路径
+        matcher: 搜索模式
+        limit: 最多返回的行数
+
+    Returns:
+        [(行号, 行内容)]；二进制文件或无法读取时返回 None
+    """
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm.find(b"\0", 0, BINARY_SNIFF_BYTES) >= 0:
+                    return None
+                literal = matcher.literal_bytes
+                if literal is not None and mm.find(literal) < 0:
+                    return []
+                text = mm[:].decode("utf-8", errors="ignore")
+    except (OSError, ValueError):
+        return None
+    if "\r" in text:
+        # 通用换行：与 read_text 相同，\r\n 中的 \r 不属于行内容
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return matcher.find_lines(text, limit)
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> tuple[ThreadPoolExecutor, int]:
+    """
+    并行搜索的线程池（独立于工具的 I/O 线程池，避免在池内等待池内任务）
+
+    Returns:
+        (线程池, 线程数)
+    """
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None:
+            _executor_workers = max(1, _env_int("SKILLS_GREP_WORKERS", DEFAULT_SEARCH_WORKERS))
+            _executor = ThreadPoolExecutor(max_workers=_executor_workers, thread_name_prefix="grep")
+        return _executor, _executor_workers
+
+
+def search_files(
+    matcher: Matcher,
+    files: Iterable[Path],
+    max_results: int = DEFAULT_MAX_RESULTS,
+    parallel: bool = True,
+) -> SearchResult:
+    """
+    并行搜索多个文件，结果按 files 的顺序合并
+
+    Args:
+        matcher: 搜索模式
+        files: 要搜索的文件（可以是生成器，按需消费）
+        max_results: 达到该匹配数后停止
+        parallel: 是否使用线程池（线程数为 1 时总是顺序搜索）
+
+    Returns:
+        SearchResult
+    """
+    result = SearchResult()
+    files = iter(files)
+
+    def collect(found: Optional[list[tuple[int, str]]], path: Path) -> bool:
+        """合并一个文件的结果，达到上限时返回 True"""
+        if found is None:
+            return False
+        result.files_searched += 1
+        for line_number, line in found:
+            result.matches.append((path, line_number, line))
+            if len(result.matches) >= max_results:
+                result.truncated = True
+                return True
+        return False
+
+    executor, workers = _get_executor() if parallel else (None, 1)
+    if workers <= 1:
+        for path in files:
+            if collect(search_file(path, matcher, max_results), path):
+                break
+        return result
+
+    window: deque[tuple[list[Path], Future]] = deque()
+
+    def submit() -> bool:
+        batch = list(itertools.islice(files, FILES_PER_TASK))
+        if batch:
+            window.append((batch, executor.submit(_search_batch, batch, matcher, max_results)))
+        return bool(batch)
+
+    # 同时进行的任务数从 1 开始倍增：匹配很多时第一个任务就可能达到上限，
+    # 不必预先读取大量文件
+    depth = 1
+    submit()
+    while window:
+        batch, future = window.popleft()
+        if any(collect(found, path) for path, found in zip(batch, future.result())):
+            for _, pending in window:
+                pending.cancel()
+            break
+        depth = min(depth * 2, workers * _PREFETCH_PER_WORKER)
+        while len(window) < depth and submit():
+            pass
+    return result
+
+
+def _search_batch(paths: list[Path], matcher: Matcher, limit: int) -> list[Optional[list[tuple[int, str]]]]:
+    """
+    在一个任务中搜索多个文件（减少小文件的调度开销）
+
+    批内的匹配数达到 limit 后不再搜索剩余文件（调用方必然在这一批内停止），
+    返回的列表可能比 paths 短。
+    """
+    results = []
+    total = 0
+    for path in paths:
+        found = search_file(path, matcher, limit)
+        results.append(found)
+        total += len(found or ())
+        if total >= limit:
+            break
+    return results
+
+
+def search(pattern: str, root: Path, max_results: int = DEFAULT_MAX_RESULTS) -> SearchResult:
+    """
+    在文件或目录中搜索
+
+    Args:
+        pattern: 正则表达式
+        root: 文件或目录
+        max_results: 达到该匹配数后停止
+
+    Returns:
+        SearchResult
+
+    Raises:
+        re.error: 模式非法
+    """
+    matcher = Matcher(pattern)
+    if root.is_file():
+        return search_files(matcher, [root], max_results, parallel=False)
+    return search_files(matcher, iter_files(root), max_results)
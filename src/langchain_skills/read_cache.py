@@ -0,0 +1,138 @@
+"""
+按对话线程的 read_file 缓存
+
+模型经常在同一对话中多次读取同一个文件，每次完整内容都会重新进入上下文。
+ReadCache 记录每个线程读取过的文件页：
+
+- 以 (解析后的路径, 读取方式) 为 key，(mtime_ns, size) 未变化时
+  read_file 不再读取文件，只返回 "unchanged since turn N" 提示
+- 文件有少量变化时返回相对上次读取的 diff（改动较多时返回完整内容）
+- write_file / edit 使该路径的记录失效，bash 使所在线程的全部记录失效
+  （无法确定命令修改了哪些文件）。失效只清除文件状态，保留内容：
+  mtime 精度较粗时文件状态可能不变，下次读取必须重新读文件，
+  但仍可以与上次读取的内容比较，返回 diff 或确认内容未变
+
+线程数和每个线程的记录数都有上限（LRU），单条记录超过 MAX_RECORD_CHARS 时
+只保存文件状态，不保存内容（仍可返回 unchanged 提示，但不能返回 diff）。
+"""
+
+import difflib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Optional
+
+
+# 保留缓存的对话线程数
+MAX_THREADS = 64
+
+# 每个线程保留的读取记录数
+MAX_ENTRIES_PER_THREAD = 64
+
+# 单条记录保存的内容上限（字符），超出时不保存内容
+MAX_RECORD_CHARS = 512 * 1024
+
+# diff 的上下文行数
+DIFF_CONTEXT_LINES = 2
+
+# diff 超过新内容的该比例时改为返回完整内容
+MAX_DIFF_RATIO = 0.5
+
+
+@dataclass(frozen=True)
+class ReadRecord:
+    """一次读取的记录"""
+    stamp: Optional[tuple[int, int]]        # (mtime_ns, size)，失效后为 None
+    turn: Optional[int]                     # 读取时的对话轮次
+    first_line: int                         # 页内第一行的行号（字节模式为 1）
+    lines: Optional[tuple[str, ...]] = None  # 页内容，超出 MAX_RECORD_CHARS 时为 None
+
+
+class ReadCache:
+    """按对话线程记录 read_file 读取过的文件页"""
+
+    def __init__(self, max_threads: int = MAX_THREADS, max_entries: int = MAX_ENTRIES_PER_THREAD):
+        """
+        Args:
+            max_threads: 保留缓存的线程数上限
+            max_entries: 每个线程的记录数上限
+        """
+        self.max_threads = max_threads
+        self.max_entries = max_entries
+        self._threads: OrderedDict[str, OrderedDict[tuple, ReadRecord]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, thread_id: str, key: tuple) -> Optional[ReadRecord]:
+        """返回线程中 key 的上一次读取记录"""
+        with self._lock:
+            entries = self._threads.get(thread_id)
+            if entries is None:
+                return None
+            record = entries.get(key)
+            if record is not None:
+                entries.move_to_end(key)
+            return record
+
+    def put(self, thread_id: str, key: tuple, record: ReadRecord) -> None:
+        """保存读取记录"""
+        if record.lines is not None and sum(len(line) for line in record.lines) > MAX_RECORD_CHARS:
+            record = replace(record, lines=None)
+        with self._lock:
+            entries = self._threads.get(thread_id)
+            if entries is None:
+                entries = self._threads[thread_id] = OrderedDict()
+            self._threads.move_to_end(thread_id)
+            entries[key] = record
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+
+    def invalidate_path(self, path: str) -> None:
+        """使所有线程中该路径的记录失效（key 的第一项为路径）"""
+        with self._lock:
+            for entries in self._threads.values():
+                for key, record in entries.items():
+                    if key[0] == path:
+                        entries[key] = replace(record, stamp=None)
+
+    def invalidate_thread(self, thread_id: str) -> None:
+        """使线程的全部记录失效"""
+        with self._lock:
+            entries = self._threads.get(thread_id)
+            if entries is not None:
+                for key, record in entries.items():
+                    entries[key] = replace(record, stamp=None)
+
+
+def render_diff(old: tuple[str, ...], new: list[str], old_first: int, new_first: int) -> Optional[str]:
+    """
+    生成行号为文件绝对行号的 unified diff
+
+    Args:
+        old: 上次读取的内容
+        new: 本次读取的内容
+        old_first: 上次读取第一行的行号
+        new_first: 本次读取第一行的行号
+
+    Returns:
+        diff 文本；改动超过新内容的 MAX_DIFF_RATIO 时返回 None
+    """
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    parts = []
+    for group in matcher.get_grouped_opcodes(DIFF_CONTEXT_LINES):
+        i1, i2 = group[0][1], group[-1][2]
+        j1, j2 = group[0][3], group[-1][4]
+        parts.append(f"@@ -{old_first + i1},{i2 - i1} +{new_first + j1},{j2 - j1} @@")
+        for tag, a1, a2, b1, b2 in group:
+            if tag == "equal":
+                parts.extend(f" {line}" for line in old[a1:a2])
+                continue
+            parts.extend(f"-{line}" for line in old[a1:a2])
+            parts.extend(f"+{line}" for line in new[b1:b2])
+
+    diff = "\n".join(parts)
+    if len(diff) > MAX_DIFF_RATIO * max(1, sum(len(line) + 1 for line in new)):
+        return None
+    return diff
@@ -0,0 +1,519 @@
+"""
+Shell 命令执行
+
+bash 工具的底层实现。subprocess.run(capture_output=True) 要等命令结束
+才能拿到输出，skill 脚本最长可运行 300 秒，期间用户只能看到 spinner。
+run_command() 在后台线程中增量读取 stdout / stderr：
+
+- 输出按 PROGRESS_INTERVAL 合并后通过 on_output 回调实时推送
+  （bash 工具转发为 tool_progress 事件，CLI / Web 实时显示）
+- 以增量解码器处理 UTF-8，多字节字符跨读取边界时不会出现乱码
+- 命令在独立进程组中运行，超时后连同子进程一起终止，返回已读取的输出
+- 定长捕获（OutputCapture）：内存中只保留开头和结尾，输出超出后完整内容
+  写入溢出文件，返回值中给出文件路径和字节数 / 行数，模型可用 read_file 翻阅
+
+arun_command() 是基于 asyncio 子进程的异步版本，在事件循环中读取输出，
+不占用工作线程，供异步模式下的 bash 工具使用。
+
+使用示例：
+    result = run_command("make build", cwd, on_output=lambda stream, text: print(text, end=""))
+    print(result.returncode, result.stdout)
+"""
+
+import asyncio
+import codecs
+import itertools
+import os
+import queue
+import signal
+import stat
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional, TextIO
+
+
+# bash 工具的默认超时（秒）
+DEFAULT_TIMEOUT = 300
+
+# 两次推送输出的最小间隔（秒），期间的输出合并为一次回调
+PROGRESS_INTERVAL = 0.1
+
+# 每次从管道读取的最大字节数
+READ_CHUNK_BYTES = 64 * 1024
+
+# 超时终止进程后，等待读取线程结束的时间（秒）
+# 后台子进程可能继承了管道而一直不关闭，不能无限等待
+READER_JOIN_TIMEOUT = 1.0
+
+# 每个输出流在内存中保留的开头 / 结尾字符数，超出部分只写入溢出文件
+DEFAULT_HEAD_CHARS = 8000
+DEFAULT_TAIL_CHARS = 8000
+
+# 溢出文件目录中最多保留的文件数（超出时删除最旧的）
+SPILL_MAX_FILES = 100
+
+# 输出回调：(流名称 "stdout" / "stderr", 文本片段)
+OutputCallback = Callable[[str, str], None]
+
+_spill_counter = itertools.count()
+
+
+def default_spill_dir() -> Path:
+    """溢出文件目录，默认读取 SKILLS_OUTPUT_DIR，未设置时使用系统临时目录下按用户区分的子目录"""
+    configured = os.getenv("SKILLS_OUTPUT_DIR")
+    if configured:
+        return Path(configured)
+    user = os.getuid() if hasattr(os, "getuid") else os.getenv("USERNAME", "user")
+    return Path(tempfile.gettempdir()) / f"langchain_skills-outputs-{user}"
+
+
+def _make_private_dir(path: Path) -> None:
+    """
+    创建仅当前用户可访问（0o700）的目录
+
+    临时目录由所有用户共享、路径可预测：目录已存在时要求不是符号链接且属于
+    当前用户，并收紧权限，防止其他用户抢先创建目录读取或替换输出文件。
+
+    Raises:
+        OSError: 无法创建，或目录属于其他用户
+    """
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if not hasattr(os, "getuid"):
+        return
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(f"Spill directory is not owned by the current user: {path}")
+    if stat.S_IMODE(st.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+
+
+class OutputCapture:
+    """
+    单个输出流的定长捕获
+
+    内存中只保留开头 head_chars 和结尾 tail_chars 个字符。输出第一次超出
+    两者之和时创建溢出文件，写入已有内容，之后的输出直接追加到文件。
+    无论输出多大，内存占用都不超过 head_chars + tail_chars 加一个读取块。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        head_chars: int = DEFAULT_HEAD_CHARS,
+        tail_chars: int = DEFAULT_TAIL_CHARS,
+        spill_dir: Optional[Path] = None,
+    ):
+        """
+        Args:
+            name: 流名称（stdout / stderr），用于溢出文件名
+            head_chars: 保留的开头字符数
+            tail_chars: 保留的结尾字符数
+            spill_dir: 溢出文件目录，默认见 default_spill_dir()
+        """
+        self.name = name
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+        self.spill_dir = spill_dir
+        self.chars = 0
+        self.bytes = 0
+        self.lines = 0
+        self.spill_path: Optional[Path] = None
+        self._head: list[str] = []
+        self._head_len = 0
+        self._tail: deque[str] = deque()
+        self._tail_len = 0
+        self._spill: Optional[TextIO] = None
+        self._spill_failed = False
+
+    @property
+    def truncated(self) -> bool:
+        """是否有内容没有保留在内存中"""
+        return self.chars > self.head_chars + self.tail_chars
+
+    def write(self, text: str, nbytes: Optional[int] = None) -> None:
+        """
+        追加一段输出
+
+        Args:
+            text: 解码后的文本
+            nbytes: 原始字节数（默认按 UTF-8 编码计算）
+        """
+        if not text:
+            return
+        self.chars += len(text)
+        self.bytes += len(text.encode("utf-8")) if nbytes is None else nbytes
+        self.lines += text.count("\n")
+
+        if self._head_len < self.head_chars:
+            part = text[:self.head_chars - self._head_len]
+            self._head.append(part)
+            self._head_len += len(part)
+            text = text[len(part):]
+            if not text:
+                return
+
+        self._tail.append(text)
+        self._tail_len += len(text)
+        if self.truncated:
+            if self._spill is None and not self._spill_failed:
+                self._open_spill()
+            elif self._spill is not None:
+                self._spill.write(text)
+        # 丢弃已完全移出结尾窗口的片段
+        while self._tail and self._tail_len - len(self._tail[0]) >= self.tail_chars:
+            self._tail_len -= len(self._tail.popleft())
+
+    def _open_spill(self) -> None:
+        """创建溢出文件并写入目前为止的全部输出（此时仍完整保留在内存中）"""
+        spill_dir = self.spill_dir or default_spill_dir()
+        path = spill_dir / f"bash-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_spill_counter)}-{self.name}.log"
+        try:
+            _make_private_dir(spill_dir)
+            _prune_spill_dir(spill_dir)
+            # O_EXCL：不跟随、不复用已存在的文件（包括预先放置的符号链接）
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            self._spill = os.fdopen(fd, "w", encoding="utf-8", newline="")
+            self._spill.writelines(self._head)
+            self._spill.writelines(self._tail)
+            self.spill_path = path
+        except OSError:
+            self._spill = None
+            self._spill_failed = True
+
+    def close(self) -> None:
+        """关闭溢出文件"""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def text(self) -> str:
+        """
+        返回捕获的输出
+
+        未超出限制时为完整输出；超出时为 开头 + 省略说明 + 结尾，
+        说明中给出完整输出的字节数、行数和溢出文件路径。
+        """
+        head = "".join(self._head)
+        tail = "".join(self._tail)
+        if not self.truncated:
+            return _normalize_newlines(head + tail)
+
+        tail = tail[-self.tail_chars:]
+        omitted = self.chars - len(head) - len(tail)
+        if self.spill_path is not None:
+            where = f"full {self.name} saved to {self.spill_path}; use read_file to view it"
+        else:
+            where = "full output was not saved"
+        marker = (
+            f"\n... [{omitted:,} characters omitted; {self.name} was "
+            f"{self.bytes:,} bytes / {self.lines:,} lines; {where}] ...\n"
+        )
+        return _normalize_newlines(head) + marker + _normalize_newlines(tail)
+
+
+def _prune_spill_dir(spill_dir: Path) -> None:
+    """溢出文件超过 SPILL_MAX_FILES 个时删除最旧的"""
+    try:
+        entries = sorted(
+            (entry for entry in os.scandir(spill_dir) if entry.name.endswith(".log")),
+            key=lambda entry: entry.stat().st_mtime_ns,
+        )
+        for entry in entries[:max(0, len(entries) - SPILL_MAX_FILES + 1)]:
+            os.unlink(entry.path)
+    except OSError:
+        pass
+
+
+@dataclass
+class CommandResult:
+    """命令执行结果"""
+    returncode: Optional[int]   # 超时被终止时为 None
+    stdout: str                 # 捕获的输出（超出限制时为 开头 + 省略说明 + 结尾）
+    stderr: str
+    timed_out: bool = False
+    duration: float = 0.0       # 耗时（秒）
+    # 常驻 shell：执行前启动了新的 shell（工作目录和环境变量已恢复初始状态）
+    shell_restarted: bool = False
+    stdout_capture: Optional[OutputCapture] = field(default=None, repr=False)
+    stderr_capture: Optional[OutputCapture] = field(default=None, repr=False)
+
+    @property
+    def truncated(self) -> bool:
+        """输出是否超出限制（完整内容见各 capture 的 spill_path）"""
+        return any(c is not None and c.truncated for c in (self.stdout_capture, self.stderr_capture))
+
+
+def _normalize_newlines(text: str) -> str:
+    """与 text=True 的 universal newlines 一致：\r\n 和 \r 都转换为 \n"""
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _pump(pipe, name: str, events: "queue.Queue[tuple[str, Optional[str], int]]") -> None:
+    """读取线程：把管道中的输出解码后放入队列，结束时放入 (name, None, 0)"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    try:
+        for data in iter(lambda: pipe.read1(READ_CHUNK_BYTES), b""):
+            events.put((name, decoder.decode(data), len(data)))
+        text = decoder.decode(b"", final=True)
+        if text:
+            events.put((name, text, 0))
+    except (OSError, ValueError):
+        # 超时后管道被关闭
+        pass
+    finally:
+        events.put((name, None, 0))
+
+
+def _kill_process_group(pid: int) -> None:
+    """终止进程及其所在进程组（Windows 上只终止进程本身）"""
+    try:
+        if os.name != "nt":
+            os.killpg(pid, signal.SIGKILL)
+        else:
+            os.kill(pid, signal.SIGTERM)
+    except OSError:
+        pass
+
+
+def run_command(
+    command: str,
+    cwd: str,
+    timeout: float = DEFAULT_TIMEOUT,
+    on_output: Optional[OutputCallback] = None,
+    progress_interval: float = PROGRESS_INTERVAL,
+    head_chars: int = DEFAULT_HEAD_CHARS,
+    tail_chars: int = DEFAULT_TAIL_CHARS,
+    spill_dir: Optional[Path] = None,
+) -> CommandResult:
+    """
+    执行 shell 命令并增量读取输出
+
+    Args:
+        command: shell 命令（Unix 为 /bin/sh，Windows 为 cmd.exe）
+        cwd: 工作目录
+        timeout: 超时（秒），超时后终止进程
+        on_output: 输出回调，按 progress_interval 合并后调用；
+            回调在调用方线程中执行，抛出的异常会被忽略
+        progress_interval: 两次回调的最小间隔（秒）
+        head_chars: 每个流在内存中保留的开头字符数
+        tail_chars: 每个流在内存中保留的结尾字符数
+        spill_dir: 溢出文件目录，默认见 default_spill_dir()
+
+    Returns:
+        CommandResult；输出未超出 head_chars + tail_chars 时 stdout / stderr
+        为完整输出，否则为 开头 + 省略说明 + 结尾
+
+    Raises:
+        OSError: 无法启动进程
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        # 独立进程组，超时后连同子进程一起终止（否则子进程占用管道，读取无法结束）
+        start_new_session=os.name != "nt",
+    )
+
+    events: "queue.Queue[tuple[str, Optional[str], int]]" = queue.Queue()
+    readers = [
+        threading.Thread(target=_pump, args=(pipe, name, events), daemon=True, name=f"shell-{name}")
+        for pipe, name in ((process.stdout, "stdout"), (process.stderr, "stderr"))
+    ]
+    for reader in readers:
+        reader.start()
+
+    output = {
+        name: OutputCapture(name, head_chars, tail_chars, spill_dir)
+        for name in ("stdout", "stderr")
+    }
+    pending: dict[str, list[str]] = {"stdout": [], "stderr": []}
+    last_flush = start
+
+    def flush() -> None:
+        nonlocal last_flush
+        last_flush = time.monotonic()
+        for name, parts in pending.items():
+            if parts and on_output is not None:
+                try:
+                    on_output(name, "".join(parts))
+                except Exception:
+                    pass
+            parts.clear()
+
+    open_streams = len(readers)
+    timed_out = False
+    while open_streams:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            break
+        try:
+            name, text, nbytes = events.get(timeout=min(remaining, progress_interval))
+        except queue.Empty:
+            flush()
+            continue
+        if text is None:
+            open_streams -= 1
+            continue
+        output[name].write(text, nbytes)
+        pending[name].append(text)
+        if time.monotonic() - last_flush >= progress_interval:
+            flush()
+
+    returncode: Optional[int] = None
+    if not timed_out:
+        # 管道已关闭，但进程可能仍在运行（如关闭了输出的后台任务）
+        try:
+            returncode = process.wait(timeout=max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            timed_out = True
+
+    if timed_out:
+        _kill_process_group(process.pid)
+        process.wait()
+        join_deadline = time.monotonic() + READER_JOIN_TIMEOUT
+        for reader in readers:
+            reader.join(max(0.0, join_deadline - time.monotonic()))
+        # 收集终止前已读取但尚未处理的输出
+        while True:
+            try:
+                name, text, nbytes = events.get_nowait()
+            except queue.Empty:
+                break
+            if text is not None:
+                output[name].write(text, nbytes)
+                pending[name].append(text)
+
+    flush()
+    for capture in output.values():
+        capture.close()
+    # 读取线程仍阻塞在 read 上时 close 会等待它返回，交给垃圾回收处理
+    if not any(reader.is_alive() for reader in readers):
+        for pipe in (process.stdout, process.stderr):
+            pipe.close()
+
+    return CommandResult(
+        returncode=returncode,
+        stdout=output["stdout"].text(),
+        stderr=output["stderr"].text(),
+        timed_out=timed_out,
+        duration=time.monotonic() - start,
+        stdout_capture=output["stdout"],
+        stderr_capture=output["stderr"],
+    )
+
+
+async def arun_command(
+    command: str,
+    cwd: str,
+    timeout: float = DEFAULT_TIMEOUT,
+    on_output: Optional[OutputCallback] = None,
+    progress_interval: float = PROGRESS_INTERVAL,
+    head_chars: int = DEFAULT_HEAD_CHARS,
+    tail_chars: int = DEFAULT_TAIL_CHARS,
+    spill_dir: Optional[Path] = None,
+) -> CommandResult:
+    """
+    run_command() 的异步版本
+
+    使用 asyncio.create_subprocess_shell，输出在事件循环中读取，
+    on_output 也在事件循环中调用。参数和返回值与 run_command() 相同。
+    任务被取消时终止命令所在的进程组后再抛出 CancelledError。
+
+    Raises:
+        OSError: 无法启动进程
+    """
+    start = time.monotonic()
+    process = await asyncio.create_subprocess_shell(
+        command,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        # 独立进程组，超时后连同子进程一起终止（否则子进程占用管道，读取无法结束）
+        start_new_session=os.name != "nt",
+    )
+
+    output = {
+        name: OutputCapture(name, head_chars, tail_chars, spill_dir)
+        for name in ("stdout", "stderr")
+    }
+    pending: dict[str, list[str]] = {"stdout": [], "stderr": []}
+
+    def flush() -> None:
+        for name, parts in pending.items():
+            if parts and on_output is not None:
+                try:
+                    on_output(name, "".join(parts))
+                except Exception:
+                    pass
+            parts.clear()
+
+    async def pump(stream: asyncio.StreamReader, name: str) -> None:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            data = await stream.read(READ_CHUNK_BYTES)
+            if not data:
+                break
+            text = decoder.decode(data)
+            output[name].write(text, len(data))
+            pending[name].append(text)
+        text = decoder.decode(b"", final=True)
+        if text:
+            output[name].write(text, 0)
+            pending[name].append(text)
+
+    async def flush_periodically() -> None:
+        while True:
+            await asyncio.sleep(progress_interval)
+            flush()
+
+    flusher = asyncio.create_task(flush_periodically())
+    readers = asyncio.gather(pump(process.stdout, "stdout"), pump(process.stderr, "stderr"))
+    timed_out = False
+    returncode: Optional[int] = None
+    try:
+        # 管道关闭后进程可能仍在运行（如关闭了输出的后台任务），一并计入超时
+        await asyncio.wait_for(asyncio.shield(readers), timeout)
+        returncode = await asyncio.wait_for(process.wait(), max(0.0, start + timeout - time.monotonic()))
+    except asyncio.TimeoutError:
+        timed_out = True
+        _kill_process_group(process.pid)
+        # 读取终止前已写入管道的输出；仍被其他进程占用的管道不再等待
+        try:
+            await asyncio.wait_for(asyncio.gather(asyncio.shield(readers), process.wait()), READER_JOIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+    except asyncio.CancelledError:
+        # 调用方取消（如用户中断）：终止整个进程组并回收，否则命令会在后台继续运行
+        _kill_process_group(process.pid)
+        try:
+            await asyncio.wait_for(process.wait(), READER_JOIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        raise
+    finally:
+        flusher.cancel()
+        if not readers.done():
+            readers.cancel()
+        flush()
+        for capture in output.values():
+            capture.close()
+
+    return CommandResult(
+        returncode=returncode,
+        stdout=output["stdout"].text(),
+        stderr=output["stderr"].text(),
+        timed_out=timed_out,
+        duration=time.monotonic() - start,
+        stdout_capture=output["stdout"],
+        stderr_capture=output["stderr"],
+    )
@@ -0,0 +1,446 @@
+"""
+常驻 Shell 会话
+
+run_command() 每次调用都启动一个新的 /bin/sh：既有进程启动开销，
+cd、export、source 激活的虚拟环境也都无法保留到下一次调用，
+模型只能反复拼接 `cd x && source y && ...` 前缀。
+
+ShellSession 为每个对话线程维护一个常驻的 shell 进程，命令通过 stdin 发送：
+
+- 命令以 eval 执行（语法错误只影响本条命令），stdin 重定向到 /dev/null，
+  避免命令读走后续的命令文本
+- 命令结束后在 stdout / stderr 各输出一行带随机 token 的分隔标记，
+  stdout 的标记行携带退出码
+- 超时后终止整个进程组，下一次调用自动重启（工作目录和环境变量恢复初始状态）
+- shell 意外退出（如执行了 exit）时同样在下一次调用前自动重启
+- 重启后（以及会话被淘汰后重新创建时）第一条命令的结果标记 shell_restarted，
+  bash 工具据此提示模型之前的 cd / export 已失效
+
+输出的增量推送和定长捕获与 run_command() 相同。仅支持 Unix；Windows 上
+bash 工具仍使用 run_command()。
+
+使用示例：
+    pool = ShellSessionPool()
+    session = pool.get("thread-1", cwd)
+    session.run("cd src && export FOO=1")
+    print(session.run("pwd; echo $FOO").stdout)
+"""
+
+import os
+import queue
+import shlex
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from .shell import (
+    DEFAULT_HEAD_CHARS,
+    DEFAULT_TAIL_CHARS,
+    DEFAULT_TIMEOUT,
+    PROGRESS_INTERVAL,
+    CommandResult,
+    OutputCallback,
+    OutputCapture,
+    _pump,
+)
+
+
+# 同时保留的 shell 会话数上限（超出时关闭最久未使用的）
+DEFAULT_MAX_SESSIONS = 8
+
+# 记录的被淘汰对话线程数上限（用于提示 shell 已重新启动）
+EVICTED_KEYS_LIMIT = 1024
+
+
+def sessions_supported() -> bool:
+    """当前平台是否支持常驻 shell 会话"""
+    return os.name != "nt"
+
+
+def _default_shell() -> list[str]:
+    """优先使用 bash（不加载 profile / rc 文件），否则使用 /bin/sh"""
+    bash = shutil.which("bash")
+    if bash:
+        return [bash, "--noprofile", "--norc"]
+    return ["/bin/sh"]
+
+
+class _FrameReader:
+    """
+    从单个输出流中切出一条命令的输出
+
+    标记可能跨读取块，末尾可能是标记开头的部分暂不输出，直到确认不是标记。
+    """
+
+    def __init__(self, marker: str):
+        self.marker = "\n" + marker
+        self.buffer = ""
+        self.done = False
+        self.status = ""        # 标记行中标记之后的内容（stdout 为退出码）
+
+    def feed(self, text: str) -> str:
+        """追加一段输出，返回可以确定属于本条命令的部分"""
+        self.buffer += text
+        index = self.buffer.find(self.marker)
+        if index >= 0:
+            end = self.buffer.find("\n", index + len(self.marker))
+            if end < 0:
+                # 标记行还不完整
+                emitted, self.buffer = self.buffer[:index], self.buffer[index:]
+                return emitted
+            emitted = self.buffer[:index]
+            self.status = self.buffer[index + len(self.marker):end].strip()
+            self.buffer = ""
+            self.done = True
+            return emitted
+
+        keep = self._partial_marker_length()
+        emitted = self.buffer[:len(self.buffer) - keep]
+        self.buffer = self.buffer[len(self.buffer) - keep:]
+        return emitted
+
+    def _partial_marker_length(self) -> int:
+        """buffer 末尾与标记开头重合的最大长度"""
+        start = max(0, len(self.buffer) - len(self.marker) + 1)
+        index = self.buffer.find("\n", start)
+        while index >= 0:
+            if self.marker.startswith(self.buffer[index:]):
+                return len(self.buffer) - index
+            index = self.buffer.find("\n", index + 1)
+        return 0
+
+    def drain(self) -> str:
+        """流结束时返回剩余的输出"""
+        emitted, self.buffer = self.buffer, ""
+        return emitted
+
+
+class ShellSession:
+    """
+    常驻的 shell 进程
+
+    同一会话内的命令串行执行，cd / export / source 的效果保留到后续命令。
+    """
+
+    def __init__(self, cwd: str, shell: Optional[list[str]] = None, restarted: bool = False):
+        """
+        Args:
+            cwd: 初始工作目录（重启后恢复到该目录）
+            shell: shell 命令行，默认见 _default_shell()
+            restarted: 是否替代了同一对话线程中被关闭的会话；
+                为 True 时第一条命令的结果同样标记 shell_restarted
+        """
+        self.cwd = cwd
+        self.shell = shell or _default_shell()
+        self.spawn_count = 0
+        self._restarted = restarted
+        self._process: Optional[subprocess.Popen] = None
+        self._events: "queue.Queue[tuple[str, Optional[str], int]]" = queue.Queue()
+        self._token = uuid.uuid4().hex
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._close_pending = False
+
+    @property
+    def busy(self) -> bool:
+        """是否正在执行命令"""
+        return self._lock.locked()
+
+    @property
+    def alive(self) -> bool:
+        """shell 进程是否在运行"""
+        return self._process is not None and self._process.poll() is None
+
+    def _spawn(self) -> None:
+        """启动 shell 进程和读取线程"""
+        self._kill()
+        process = subprocess.Popen(
+            self.shell,
+            cwd=self.cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+        # 每个进程使用独立的队列，旧进程残留的输出不会混入
+        events: "queue.Queue[tuple[str, Optional[str], int]]" = queue.Queue()
+        for pipe, name in ((process.stdout, "stdout"), (process.stderr, "stderr")):
+            threading.Thread(
+                target=_pump, args=(pipe, name, events), daemon=True, name=f"shell-session-{name}",
+            ).start()
+        self._process = process
+        self._events = events
+        self.spawn_count += 1
+
+    def _kill(self) -> None:
+        """终止 shell 进程及其启动的所有子进程"""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        if process.poll() is None:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                process.kill()
+        process.wait()
+        if process.stdin is not None:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    def _discard_stale_output(self) -> None:
+        """丢弃上一条命令结束后才到达的输出（如后台任务）"""
+        while True:
+            try:
+                _, text, _ = self._events.get_nowait()
+            except queue.Empty:
+                return
+            if text is None:
+                # 读取线程已结束，shell 已退出
+                self._kill()
+                return
+
+    def _send(self, command: str, marker: str) -> None:
+        """把命令及分隔标记写入 shell 的 stdin"""
+        script = (
+            f"eval {shlex.quote(command)} < /dev/null\n"
+            f"__skills_status=$?\n"
+            f"printf '\\n%s %d\\n' '{marker}' \"$__skills_status\"\n"
+            f"printf '\\n%s\\n' '{marker}' >&2\n"
+        )
+        self._process.stdin.write(script.encode("utf-8"))
+        self._process.stdin.flush()
+
+    def run(
+        self,
+        command: str,
+        timeout: float = DEFAULT_TIMEOUT,
+        on_output: Optional[OutputCallback] = None,
+        progress_interval: float = PROGRESS_INTERVAL,
+        head_chars: int = DEFAULT_HEAD_CHARS,
+        tail_chars: int = DEFAULT_TAIL_CHARS,
+        spill_dir: Optional[Path] = None,
+    ) -> CommandResult:
+        """
+        在会话中执行命令
+
+        参数和返回值与 run_command() 相同。超时或 shell 退出后，
+        下一次调用会启动新的 shell，其结果的 shell_restarted 为 True。
+
+        Raises:
+            OSError: 无法启动 shell
+        """
+        with self._lock:
+            try:
+                start = time.monotonic()
+                self._discard_stale_output()
+                restarted, self._restarted = self._restarted, False
+                if not self.alive:
+                    restarted = restarted or self.spawn_count > 0
+                    self._spawn()
+
+                self._counter += 1
+                marker = f"__SKILLS_DONE_{self._token}_{self._counter}__"
+                try:
+                    self._send(command, marker)
+                except (BrokenPipeError, OSError):
+                    # shell 在两次调用之间退出，重启后重试一次
+                    self._spawn()
+                    self._send(command, marker)
+                    restarted = True
+
+                result = self._collect(
+                    marker, start + timeout, start, on_output, progress_interval,
+                    head_chars, tail_chars, spill_dir,
+                )
+                result.shell_restarted = restarted
+                return result
+            finally:
+                # 执行期间被要求关闭（见 close()）
+                if self._close_pending:
+                    self._close_pending = False
+                    self._kill()
+
+    def _collect(
+        self,
+        marker: str,
+        deadline: float,
+        start: float,
+        on_output: Optional[OutputCallback],
+        progress_interval: float,
+        head_chars: int,
+        tail_chars: int,
+        spill_dir: Optional[Path],
+    ) -> CommandResult:
+        """读取一条命令的输出，直到两个流都出现分隔标记"""
+        frames = {name: _FrameReader(marker) for name in ("stdout", "stderr")}
+        output = {
+            name: OutputCapture(name, head_chars, tail_chars, spill_dir)
+            for name in ("stdout", "stderr")
+        }
+        pending: dict[str, list[str]] = {"stdout": [], "stderr": []}
+        last_flush = start
+
+        def accept(name: str, text: str) -> None:
+            if text:
+                output[name].write(text)
+                pending[name].append(text)
+
+        def flush() -> None:
+            nonlocal last_flush
+            last_flush = time.monotonic()
+            for name, parts in pending.items():
+                if parts and on_output is not None:
+                    try:
+                        on_output(name, "".join(parts))
+                    except Exception:
+                        pass
+                parts.clear()
+
+        timed_out = False
+        exited = False
+        while not all(frame.done for frame in frames.values()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            try:
+                name, text, _ = self._events.get(timeout=min(remaining, progress_interval))
+            except queue.Empty:
+                flush()
+                continue
+            if text is None:
+                # shell 在命令执行中退出（如 exit），剩余输出全部属于本条命令
+                accept(name, frames[name].drain())
+                frames[name].done = True
+                exited = True
+                continue
+            if not frames[name].done:
+                accept(name, frames[name].feed(text))
+            if time.monotonic() - last_flush >= progress_interval:
+                flush()
+
+        returncode: Optional[int] = None
+        if timed_out:
+            for name, frame in frames.items():
+                if not frame.done:
+                    accept(name, frame.drain())
+            self._kill()
+        elif exited:
+            returncode = self._process.wait() if self._process is not None else None
+            self._kill()
+        else:
+            try:
+                returncode = int(frames["stdout"].status)
+            except ValueError:
+                returncode = None
+
+        flush()
+        for capture in output.values():
+            capture.close()
+
+        return CommandResult(
+            returncode=returncode,
+            stdout=output["stdout"].text(),
+            stderr=output["stderr"].text(),
+            timed_out=timed_out,
+            duration=time.monotonic() - start,
+            stdout_capture=output["stdout"],
+            stderr_capture=output["stderr"],
+        )
+
+    def close(self) -> None:
+        """
+        终止 shell 进程
+
+        会话正在执行命令时既不等待也不打断它：标记为待关闭，命令结束后由
+        执行命令的线程关闭 shell。
+        """
+        self._close_pending = True
+        # 标记之前命令可能恰好结束，此时由这里关闭
+        if self._lock.acquire(blocking=False):
+            try:
+                if self._close_pending:
+                    self._close_pending = False
+                    self._kill()
+            finally:
+                self._lock.release()
+
+
+class ShellSessionPool:
+    """
+    按对话线程管理 ShellSession
+
+    会话数超过 max_sessions 时关闭最久未使用的空闲会话；正在执行命令的会话
+    不会被淘汰（全部忙碌时暂时超出上限）。被关闭会话的对话线程再次执行命令时
+    创建新会话，第一条命令的结果标记 shell_restarted。
+    """
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS):
+        """
+        Args:
+            max_sessions: 同时保留的会话数上限
+        """
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, ShellSession] = OrderedDict()
+        # 会话被淘汰的对话线程（只保留最近的 EVICTED_KEYS_LIMIT 个）
+        self._evicted: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, key: str, cwd: str) -> ShellSession:
+        """
+        获取（必要时创建）对话线程的会话
+
+        Args:
+            key: 对话线程 ID
+            cwd: 新会话的初始工作目录
+
+        Returns:
+            ShellSession（shell 进程在第一次执行命令时启动）
+        """
+        evicted = []
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                restarted = key in self._evicted
+                self._evicted.pop(key, None)
+                session = ShellSession(cwd, restarted=restarted)
+                self._sessions[key] = session
+            self._sessions.move_to_end(key)
+            idle = [k for k, s in self._sessions.items() if k != key and not s.busy]
+            for old_key in idle[:max(0, len(self._sessions) - self.max_sessions)]:
+                evicted.append(self._sessions.pop(old_key))
+                self._evicted[old_key] = None
+            while len(self._evicted) > EVICTED_KEYS_LIMIT:
+                self._evicted.popitem(last=False)
+        # 在池的锁之外关闭；选中后恰好开始执行命令的会话在命令结束后关闭
+        for old in evicted:
+            old.close()
+        return session
+
+    def close(self, key: Optional[str] = None) -> None:
+        """
+        关闭会话
+
+        Args:
+            key: 对话线程 ID，默认关闭所有会话
+        """
+        with self._lock:
+            if key is None:
+                sessions = list(self._sessions.values())
+                self._sessions.clear()
+            else:
+                session = self._sessions.pop(key, None)
+                sessions = [session] if session is not None else []
+        for session in sessions:
+            session.close()
@@ -0,0 +1,189 @@
+"""
+Skills 单文件 bundle
+
+容器中同时启动很多 agent worker 时，每个 worker 都要遍历上百个小文件来
+发现 Skills。build_bundle() 在构建阶段把 Skills 目录编译成一个文件，
+SkillBundle 通过 mmap 只读映射：
+
+- 启动只需一次 open + mmap，不再遍历目录
+- 多个 worker 映射同一个文件，共享 page cache
+- load_skill 只是对映射区域做一次切片
+
+文件格式（整数均为小端）：
+    magic       8 字节  b"LCSKBDL1"
+    header_len  4 字节  uint32，header 的字节数
+    header      JSON（UTF-8）:
+                {"version": 1, "skills": [
+                    {"name", "description", "skill_path", "offset", "length"}, ...]}
+    data        各 skill 的 instructions（UTF-8），offset 相对 data 起始位置
+
+bundle 只包含 Level 1 元数据和 Level 2 指令；scripts/、references/ 等
+仍在原目录中，由 skill_path 指向（Level 3 照常从磁盘执行）。
+
+使用示例：
+    build_bundle([Path(".claude/skills")], Path("skills.bundle"))
+
+    loader = SkillLoader(bundle_path=Path("skills.bundle"))
+    loader.load_skill("news-extractor")
+"""
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Optional
+
+from .skill_loader import SkillLoader, SkillMetadata
+
+
+BUNDLE_MAGIC = b"LCSKBDL1"
+BUNDLE_VERSION = 1
+_HEADER_LEN = struct.Struct("<I")
+
+
+def build_bundle(skill_paths: list[Path], output: Path) -> list[SkillMetadata]:
+    """
+    将 Skills 目录编译为 bundle 文件
+
+    发现规则与 SkillLoader.scan_skills() 相同（同名 skill 优先级高的路径生效）。
+    先写入临时文件再替换，正在映射旧 bundle 的进程不受影响。
+
+    Args:
+        skill_paths: Skills 搜索路径
+        output: 输出文件路径
+
+    Returns:
+        写入 bundle 的 Skills 元数据
+    """
+    # 总是扫描目录：设置了 SKILLS_BUNDLE 时也不能从旧 bundle 读取
+    loader = SkillLoader(skill_paths, content_cache_bytes=0, use_bundle=False)
+    skills = []
+    entries = []
+    bodies = []
+    offset = 0
+
+    for skill in loader.scan_skills():
+        instructions = loader._read_body(skill)
+        if instructions is None:
+            continue
+        body = instructions.encode("utf-8")
+        entries.append({
+            "name": skill.name,
+            "description": skill.description,
+            "skill_path": str(skill.skill_path.resolve()),
+            "offset": offset,
+            "length": len(body),
+        })
+        bodies.append(body)
+        skills.append(skill)
+        offset += len(body)
+
+    header = json.dumps(
+        {"version": BUNDLE_VERSION, "skills": entries},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(BUNDLE_MAGIC)
+        f.write(_HEADER_LEN.pack(len(header)))
+        f.write(header)
+        for body in bodies:
+            f.write(body)
+    os.replace(tmp, output)
+    return skills
+
+
+class SkillBundle:
+    """
+    只读映射的 Skills bundle
+
+    打开时只解析 header；instructions 在 load 时从映射区域切片解码。
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: bundle 文件路径
+
+        Raises:
+            ValueError: 文件不是合法的 Skills bundle
+        """
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            st = os.fstat(self._file.fileno())
+            self._stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self._file.close()
+            raise ValueError(f"Not a skill bundle: {self.path}")
+
+        try:
+            self.skills, self._spans = self._parse_header()
+        except ValueError:
+            self.close()
+            raise
+
+    def _parse_header(self) -> tuple[list[SkillMetadata], dict[str, tuple[int, int]]]:
+        """解析 header，返回元数据列表和 name -> (起始, 结束) 的绝对偏移"""
+        prefix = len(BUNDLE_MAGIC) + _HEADER_LEN.size
+        if len(self._map) < prefix or self._map[:len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+            raise ValueError(f"Not a skill bundle: {self.path}")
+
+        (header_len,) = _HEADER_LEN.unpack_from(self._map, len(BUNDLE_MAGIC))
+        data_start = prefix + header_len
+        try:
+            header = json.loads(self._map[prefix:data_start].decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ValueError(f"Corrupt skill bundle header: {self.path}")
+        if header.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported skill bundle version {header.get('version')}: {self.path}")
+
+        skills = []
+        spans = {}
+        for entry in header.get("skills", []):
+            start = data_start + entry["offset"]
+            end = start + entry["length"]
+            if end > len(self._map):
+                raise ValueError(f"Truncated skill bundle: {self.path}")
+            metadata = SkillMetadata(
+                name=entry["name"],
+                description=entry["description"],
+                skill_path=Path(entry["skill_path"]),
+            )
+            skills.append(metadata)
+            spans[metadata.name] = (start, end)
+        return skills, spans
+
+    def read_instructions(self, name: str) -> Optional[str]:
+        """
+        读取 skill 的 instructions
+
+        Args:
+            name: skill 名称
+
+        Returns:
+            instructions 文本，不存在时返回 None
+        """
+        span = self._spans.get(name)
+        if span is None:
+            return None
+        return self._map[span[0]:span[1]].decode("utf-8")
+
+    def is_stale(self) -> bool:
+        """bundle 文件是否已被替换（重新构建后需要重新打开）"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        return (st.st_ino, st.st_mtime_ns, st.st_size) != self._stamp
+
+    def close(self) -> None:
+        """解除映射并关闭文件"""
+        self._map.close()
+        self._file.close()
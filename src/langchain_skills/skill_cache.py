@@ -0,0 +1,144 @@
+"""
+Level 2 SkillContent 缓存
+
+load_skill 在繁忙的服务上会被反复调用（同一个 skill、多个会话），
+SkillContentCache 把最近使用的 SkillContent 保存在内存中：
+
+- 以 skill name 为键，LRU 淘汰
+- 容量按字节计算（instructions 的 UTF-8 长度），而不是条目数
+- 每次命中都用 SKILL.md 的 (path, mtime_ns, size) 校验，文件被编辑后自动失效
+- 提供 hits / misses / evictions / invalidations 计数
+
+线程安全，可在多个请求线程间共享。
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .skill_loader import SkillContent
+
+
+# 缓存校验戳：(SKILL.md 路径, mtime_ns, size)
+CacheStamp = tuple[str, int, int]
+
+
+@dataclass
+class CacheStats:
+    """缓存统计"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0          # 因容量不足被淘汰
+    invalidations: int = 0      # 因文件变化被丢弃
+    entries: int = 0
+    current_bytes: int = 0
+    max_bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class SkillContentCache:
+    """
+    按字节限额的 SkillContent LRU 缓存
+
+    使用示例：
+        cache = SkillContentCache(max_bytes=16 * 1024 * 1024)
+        content = cache.get("news-extractor", stamp)
+        if content is None:
+            content = load_from_disk()
+            cache.put("news-extractor", stamp, content)
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Args:
+            max_bytes: 缓存容量（字节），<= 0 表示禁用缓存
+        """
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[CacheStamp, "SkillContent", int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, name: str, stamp: CacheStamp) -> Optional["SkillContent"]:
+        """
+        查找缓存
+
+        Args:
+            name: skill 名称
+            stamp: SKILL.md 当前的 (path, mtime_ns, size)
+
+        Returns:
+            命中且未过期时返回 SkillContent，否则返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            cached_stamp, content, size = entry
+            if cached_stamp != stamp:
+                # 文件已被修改或 skill 已指向其他目录
+                del self._entries[name]
+                self._current_bytes -= size
+                self._invalidations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(name)
+            self._hits += 1
+            return content
+
+    def put(self, name: str, stamp: CacheStamp, content: "SkillContent") -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        size = len(content.instructions.encode("utf-8"))
+        if size > self.max_bytes:
+            # 单个条目超过总容量，不缓存
+            return
+
+        with self._lock:
+            previous = self._entries.pop(name, None)
+            if previous is not None:
+                self._current_bytes -= previous[2]
+
+            self._entries[name] = (stamp, content, size)
+            self._current_bytes += size
+
+            while self._current_bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._current_bytes -= evicted_size
+                self._evictions += 1
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """丢弃指定 skill 的缓存，name 为 None 时清空"""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+                self._current_bytes = 0
+                return
+
+            entry = self._entries.pop(name, None)
+            if entry is not None:
+                self._current_bytes -= entry[2]
+
+    def stats(self) -> CacheStats:
+        """返回当前统计快照"""
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                invalidations=self._invalidations,
+                entries=len(self._entries),
+                current_bytes=self._current_bytes,
+                max_bytes=self.max_bytes,
+            )
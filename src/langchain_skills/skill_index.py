@@ -0,0 +1,229 @@
+"""
+Skills 元数据索引
+
+为 SkillLoader.scan_skills() 提供基于 mtime/size 校验的增量扫描：
+- 记录每个 SKILL.md 的路径、mtime、size、解析出的 name/description 以及 body 偏移
+- 重新扫描时只解析发生变化的文件，未变化的直接复用索引
+- 根目录 mtime 未变化时复用上次的子目录列表，无需重新 listdir
+
+热启动成本：每个根目录一次 stat + 每个 skill 目录一次 stat（SKILL.md）。
+
+索引可选持久化到磁盘（JSON），供多个进程 / 多次启动共享：
+    SKILLS_INDEX_PATH=~/.cache/langchain_skills/skill_index.json
+
+索引文件格式：
+    {
+        "version": 3,
+        "roots": {
+            "/abs/.claude/skills": {
+                "mtime_ns": 1700000000000000000,
+                "dirs": ["news-extractor", "slides-generator"],
+                "skills": {
+                    "news-extractor": {
+                        "mtime_ns": ..., "size": ...,
+                        "name": "news-extractor", "description": "...",
+                        "body_offset": 128
+                    }
+                }
+            }
+        }
+    }
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .skill_loader import SkillMetadata
+
+
+INDEX_VERSION = 3
+
+# 持久化索引路径的环境变量
+INDEX_PATH_ENV = "SKILLS_INDEX_PATH"
+
+
+def default_index_path() -> Optional[Path]:
+    """从环境变量读取默认索引路径，未配置时返回 None（仅内存索引）"""
+    raw = os.getenv(INDEX_PATH_ENV)
+    if not raw:
+        return None
+    return Path(raw).expanduser()
+
+
+class SkillIndex:
+    """
+    mtime 校验的 Skills 元数据索引
+
+    使用示例：
+        index = SkillIndex(Path("~/.cache/skill_index.json").expanduser())
+        for skill_dir in index.list_skill_dirs(base_path):
+            metadata = index.get_metadata(base_path, skill_dir, parse)
+        index.save()
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: 持久化文件路径，None 表示只在内存中维护索引
+        """
+        self.path = path
+        self._roots: dict[str, dict] = {}
+        self._visited: dict[str, dict[str, dict]] = {}
+        self._dirty = False
+        # 并行扫描时多个线程会同时更新索引
+        self._lock = threading.Lock()
+
+        if path is not None:
+            self._load()
+
+    def _load(self) -> None:
+        """从磁盘加载索引，文件缺失或损坏时从空索引开始"""
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return
+
+        roots = data.get("roots")
+        if isinstance(roots, dict):
+            self._roots = roots
+
+    def list_skill_dirs(self, base_path: Path) -> list[Path]:
+        """
+        列出根目录下的所有子目录
+
+        根目录 mtime 未变化时直接复用索引中的目录列表（子目录的增删
+        会更新父目录 mtime），否则重新 listdir。目录按名称排序，扫描顺序
+        与文件系统无关。线程安全。
+
+        Args:
+            base_path: Skills 根目录
+
+        Returns:
+            子目录路径列表，根目录不存在时返回空列表
+        """
+        key = str(base_path)
+        try:
+            st = base_path.stat()
+        except OSError:
+            with self._lock:
+                if self._roots.pop(key, None) is not None:
+                    self._dirty = True
+            return []
+
+        root = self._roots.get(key)
+        if root is not None and root.get("mtime_ns") == st.st_mtime_ns:
+            dir_names = root.get("dirs", [])
+        else:
+            try:
+                with os.scandir(base_path) as it:
+                    dir_names = sorted(entry.name for entry in it if entry.is_dir())
+            except OSError:
+                return []
+
+            previous = root.get("skills", {}) if root else {}
+            with self._lock:
+                self._roots[key] = {"mtime_ns": st.st_mtime_ns, "dirs": dir_names, "skills": previous}
+                self._dirty = True
+
+        with self._lock:
+            self._visited[key] = {}
+        return [base_path / name for name in dir_names]
+
+    def get_metadata(
+        self,
+        base_path: Path,
+        skill_dir: Path,
+        parse: Callable[[Path], Optional["SkillMetadata"]],
+    ) -> Optional["SkillMetadata"]:
+        """
+        获取 skill 目录的元数据，mtime/size 未变化时复用索引（线程安全）
+
+        Args:
+            base_path: skill 所在的根目录（需先调用 list_skill_dirs）
+            skill_dir: skill 目录
+            parse: SKILL.md 解析函数，索引失效时调用
+
+        Returns:
+            元数据；目录中没有 SKILL.md 或解析失败返回 None
+        """
+        from .skill_loader import SkillMetadata
+
+        skill_md = skill_dir / "SKILL.md"
+        try:
+            st = skill_md.stat()
+        except OSError:
+            return None
+
+        key = str(base_path)
+        with self._lock:
+            root = self._roots.setdefault(key, {"mtime_ns": None, "dirs": [], "skills": {}})
+            entry = root["skills"].get(skill_dir.name)
+
+        if (
+            entry is None
+            or entry.get("mtime_ns") != st.st_mtime_ns
+            or entry.get("size") != st.st_size
+        ):
+            metadata = parse(skill_md)
+            entry = {
+                "mtime_ns": st.st_mtime_ns,
+                "size": st.st_size,
+                # 解析失败也记录下来（name 为空），避免每次扫描重复解析坏文件
+                "name": metadata.name if metadata else "",
+                "description": metadata.description if metadata else "",
+                "body_offset": metadata.body_offset if metadata else 0,
+            }
+            with self._lock:
+                self._dirty = True
+
+        with self._lock:
+            self._visited.setdefault(key, {})[skill_dir.name] = entry
+
+        if not entry["name"]:
+            return None
+
+        return SkillMetadata(
+            name=entry["name"],
+            description=entry["description"],
+            skill_path=skill_dir,
+            body_offset=entry.get("body_offset", 0),
+            file_stamp=(entry["mtime_ns"], entry["size"]),
+        )
+
+    def save(self) -> None:
+        """
+        结束一次扫描：清理已删除的 skill 条目，并在有变化时写回磁盘
+
+        写入采用临时文件 + os.replace，保证并发读取方不会读到半截文件。
+        """
+        for key, visited in self._visited.items():
+            root = self._roots.get(key)
+            if root is None:
+                continue
+            if root.get("skills", {}).keys() != visited.keys():
+                self._dirty = True
+            root["skills"] = visited
+        self._visited = {}
+
+        if not self._dirty or self.path is None:
+            self._dirty = False
+            return
+
+        data = {"version": INDEX_VERSION, "roots": self._roots}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(data, ensure_ascii=False, default=str), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # 索引只是加速手段，写入失败不影响扫描结果
+            return
+
+        self._dirty = False
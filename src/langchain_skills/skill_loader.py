@@ -26,12 +26,30 @@ SKILL.md 格式：
     详细指令内容...
 """
 
-import re
+import functools
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Optional
-from dataclasses import dataclass
+from types import MappingProxyType
+from typing import BinaryIO, Mapping, Optional, TYPE_CHECKING
+from dataclasses import dataclass, field
 
-import yaml
+# 注意：yaml、concurrent.futures、asyncio、difflib 在首次使用时才导入。索引命中（或使用
+# bundle）时无需解析 YAML，--list-skills 等命令的启动时间因此不受影响。
+
+from .skill_index import SkillIndex, default_index_path
+from .skill_cache import CacheStats, SkillContentCache
+from .skill_search import SkillSearchIndex
+from .skill_sections import SkillSection, find_section, format_toc, parse_sections
+from .token_budget import PromptPlan, SkillCost, TokenCounter, estimate_tokens, shorten_description
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+    from .skill_bundle import SkillBundle
+    from .skill_references import ReferenceIndex, ReferencePassage
+    from .skill_watcher import SkillWatcher
 
 
 # 默认 Skills 搜索路径（项目级优先，用户级兜底）
@@ -40,6 +58,54 @@ DEFAULT_SKILL_PATHS = [
     Path.home() / ".claude" / "skills",     # 用户级 Skills (~/.claude/skills/) - 兜底
 ]
 
+# 并行扫描的线程数（<= 1 表示顺序扫描）
+DEFAULT_SCAN_WORKERS = 8
+
+# skill 目录少于该数量时顺序扫描，线程池的开销不值得
+PARALLEL_SCAN_THRESHOLD = 32
+
+# 并行扫描时每个任务处理的 skill 目录数
+SCAN_BATCH_SIZE = 64
+
+# Level 2 内容缓存默认容量（字节）
+DEFAULT_CONTENT_CACHE_BYTES = 16 * 1024 * 1024
+
+# 未找到的 skill 名称的缓存时间（秒）和最大条目数
+DEFAULT_NEGATIVE_TTL = 5.0
+NEGATIVE_CACHE_MAX_ENTRIES = 1024
+
+# Skills 超过该数量时，Level 1 只注入与用户请求最相关的 top-k 个
+DEFAULT_PROMPT_TOP_K = 30
+
+# Agent 的 system prompt token 上限（超出时缩短或移除低优先级 Skills 的描述）
+DEFAULT_PROMPT_TOKEN_BUDGET = 16000
+
+# 异步接口（ascan_skills 等）执行阻塞 I/O 的线程数
+DEFAULT_ASYNC_WORKERS = 4
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数环境变量，非法值回退到默认值"""
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def default_scan_workers() -> int:
+    """从 SKILLS_SCAN_WORKERS 读取并行扫描线程数"""
+    return _env_int("SKILLS_SCAN_WORKERS", DEFAULT_SCAN_WORKERS)
+
+
+def default_prompt_top_k() -> int:
+    """从 SKILLS_PROMPT_TOP_K 读取 Level 1 注入的 skill 数量上限"""
+    return _env_int("SKILLS_PROMPT_TOP_K", DEFAULT_PROMPT_TOP_K)
+
+
+def default_prompt_token_budget() -> int:
+    """从 SKILLS_PROMPT_TOKEN_BUDGET 读取 system prompt 的 token 上限"""
+    return _env_int("SKILLS_PROMPT_TOKEN_BUDGET", DEFAULT_PROMPT_TOKEN_BUDGET)
+
 
 @dataclass
 class SkillMetadata:
@@ -52,10 +118,26 @@ class SkillMetadata:
     name: str               # skill 唯一名称
     description: str        # 何时使用此 skill 的描述
     skill_path: Path        # skill 目录路径
+    # SKILL.md body 的字节偏移，load_skill 直接 seek 到此处读取
+    body_offset: int = field(default=0, repr=False, compare=False)
+    # 解析时 SKILL.md 的 (mtime_ns, size)，用于判断 body_offset 是否仍然有效
+    file_stamp: Optional[tuple[int, int]] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        # frontmatter 中的 name / description 可能被 YAML 解析为数字或 None（如 `name: 2048`、
+        # 空的 `description:`），索引文件和 bundle 中也可能残留旧数据，这里统一转换为 str
+        self.name = as_text(self.name)
+        self.description = as_text(self.description)
+
+    def to_prompt_line(self, short: bool = False) -> str:
+        """
+        生成 system prompt 中的单行描述
 
-    def to_prompt_line(self) -> str:
-        """生成 system prompt 中的单行描述"""
-        return f"- **{self.name}**: {self.description}"
+        Args:
+            short: 使用缩短后的描述（token 预算不足时）
+        """
+        description = shorten_description(self.description) if short else self.description
+        return f"- **{self.name}**: {description}"
 
 
 @dataclass
@@ -72,6 +154,102 @@ class SkillContent:
     metadata: SkillMetadata
     instructions: str  # SKILL.md body 内容
 
+    @functools.cached_property
+    def sections(self) -> list[SkillSection]:
+        """按标题解析的章节列表（带 token 数），首次访问时解析并随内容一起缓存"""
+        return parse_sections(self.instructions)
+
+    def get_section(self, name: str) -> Optional[SkillSection]:
+        """按标题或路径（"Usage > Options"）查找章节，未找到返回 None"""
+        return find_section(self.sections, name)
+
+    def table_of_contents(self) -> str:
+        """带每个章节 token 数的目录"""
+        return format_toc(self.sections)
+
+
+@dataclass(frozen=True)
+class SkillRegistry:
+    """
+    某次扫描得到的 Skills 元数据快照（不可变）
+
+    扫描完成后 SkillLoader 整体替换快照引用（单次赋值，原子操作），
+    读取方只需取一次引用，无需加锁，也不会看到扫描到一半的结果。
+    """
+    skills: tuple[SkillMetadata, ...] = ()
+    by_name: Mapping[str, SkillMetadata] = field(default_factory=lambda: MappingProxyType({}))
+    generation: int = 0     # 第几次扫描的结果，0 表示尚未扫描
+
+    @classmethod
+    def build(cls, skills: list[SkillMetadata], generation: int) -> "SkillRegistry":
+        return cls(
+            skills=tuple(skills),
+            by_name=MappingProxyType({s.name: s for s in skills}),
+            generation=generation,
+        )
+
+    @property
+    def scanned(self) -> bool:
+        return self.generation > 0
+
+    def get(self, name: str) -> Optional[SkillMetadata]:
+        return self.by_name.get(name)
+
+    def __len__(self) -> int:
+        return len(self.skills)
+
+
+def as_text(value) -> str:
+    """将 frontmatter 字段值转换为 str，None 视为空字符串"""
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def _is_delimiter(line: bytes) -> bool:
+    """判断是否为 frontmatter 分隔行：--- 加可选空白，且以换行结尾"""
+    return line.endswith(b"\n") and line.rstrip() == b"---"
+
+
+def read_frontmatter(stream: BinaryIO) -> Optional[tuple[dict, int]]:
+    """
+    逐行读取 YAML frontmatter，读到结束的 --- 即停止
+
+    只读取 frontmatter 部分，不会把 SKILL.md 的 body 读入内存。
+
+    Args:
+        stream: 以二进制模式打开、位于文件开头的 SKILL.md
+
+    Returns:
+        (frontmatter 字典, body 的字节偏移)；格式不合法返回 None
+    """
+    if not _is_delimiter(stream.readline()):
+        return None
+
+    lines = []
+    for line in iter(stream.readline, b""):
+        if _is_delimiter(line):
+            break
+        lines.append(line)
+    else:
+        # 没有找到结束的 ---
+        return None
+
+    if not lines:
+        return None
+
+    import yaml
+
+    try:
+        frontmatter = yaml.safe_load(b"".join(lines).decode("utf-8"))
+    except (UnicodeDecodeError, yaml.YAMLError):
+        return None
+
+    if not isinstance(frontmatter, dict):
+        return None
+
+    return frontmatter, stream.tell()
+
 
 class SkillLoader:
     """
@@ -93,7 +271,16 @@ class SkillLoader:
         print(skill.instructions)
     """
 
-    def __init__(self, skill_paths: list[Path] | None = None):
+    def __init__(
+        self,
+        skill_paths: list[Path] | None = None,
+        index_path: Path | None = None,
+        scan_workers: int | None = None,
+        content_cache_bytes: int | None = None,
+        negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+        bundle_path: Path | None = None,
+        use_bundle: bool = True,
+    ):
         """
         初始化加载器
 
@@ -101,9 +288,44 @@ class SkillLoader:
             skill_paths: 自定义 Skills 搜索路径，默认为:
                 - .claude/skills/ (项目级，优先)
                 - ~/.claude/skills/ (用户级，兜底)
+            index_path: 元数据索引持久化路径，默认读取 SKILLS_INDEX_PATH，
+                未配置时只在内存中维护索引
+            scan_workers: 并行扫描线程数，默认读取 SKILLS_SCAN_WORKERS（8），
+                <= 1 表示顺序扫描
+            content_cache_bytes: Level 2 内容缓存容量（字节），默认读取
+                SKILLS_CONTENT_CACHE_BYTES（16MB），<= 0 表示禁用
+            negative_ttl: 未找到的 skill 名称在多少秒内不再触发重新扫描
+            bundle_path: 预编译的 Skills bundle（见 skill_bundle.py），默认读取
+                SKILLS_BUNDLE；设置后从 mmap 映射的 bundle 读取元数据和指令，
+                不再遍历 skill_paths
+            use_bundle: 为 False 时忽略 bundle_path 和 SKILLS_BUNDLE，总是扫描
+                skill_paths（构建 bundle 时使用）
         """
         self.skill_paths = skill_paths or DEFAULT_SKILL_PATHS
-        self._metadata_cache: dict[str, SkillMetadata] = {}
+        # 当前的元数据快照，扫描后整体替换（copy-on-write）
+        self._registry = SkillRegistry()
+        self._index = SkillIndex(index_path or default_index_path())
+        self.scan_workers = default_scan_workers() if scan_workers is None else scan_workers
+        if content_cache_bytes is None:
+            content_cache_bytes = _env_int("SKILLS_CONTENT_CACHE_BYTES", DEFAULT_CONTENT_CACHE_BYTES)
+        self._content_cache = SkillContentCache(content_cache_bytes)
+        self.negative_ttl = negative_ttl
+        self._negative_cache: dict[str, float] = {}
+        self._scan_lock = threading.Lock()
+        # 已开始的扫描次数，用于合并并发的扫描请求（见 _rescan）
+        self._scans_started = 0
+        self._watcher: Optional["SkillWatcher"] = None
+        self._search_index: Optional[tuple[SkillRegistry, SkillSearchIndex]] = None
+        if bundle_path is None and os.getenv("SKILLS_BUNDLE"):
+            bundle_path = Path(os.environ["SKILLS_BUNDLE"])
+        self.bundle_path = bundle_path if use_bundle else None
+        self._bundle: Optional["SkillBundle"] = None
+        self._reference_index: Optional["ReferenceIndex"] = None
+        # 异步接口：有界线程池（首次使用时创建）和进行中的任务（按参数合并）
+        self.async_workers = max(1, _env_int("SKILLS_ASYNC_WORKERS", DEFAULT_ASYNC_WORKERS))
+        self._executor: Optional["ThreadPoolExecutor"] = None
+        self._inflight: dict[tuple, "Future"] = {}
+        self._inflight_lock = threading.RLock()
 
     def scan_skills(self) -> list[SkillMetadata]:
         """
@@ -112,6 +334,10 @@ class SkillLoader:
         遍历 skill_paths，查找包含 SKILL.md 的目录，
         解析 YAML frontmatter 提取 name 和 description。
 
+        通过 SkillIndex 做 mtime/size 校验：只有变化过的 SKILL.md
+        才会被重新读取和解析。启用 watch() 后直接返回监听线程
+        维护的结果，不访问文件系统。
+
         Returns:
             所有发现的 Skills 元数据列表
 
@@ -121,31 +347,139 @@ class SkillLoader:
                 SkillMetadata(name='slides-generator', description='Generate slides...', ...),
             ]
         """
+        if self._watcher is not None and self._watcher.is_running:
+            return list(self._registry.skills)
+        return self._rescan()
+
+    @property
+    def registry(self) -> SkillRegistry:
+        """当前的元数据快照（不触发扫描）"""
+        return self._registry
+
+    def _ensure_registry(self) -> SkillRegistry:
+        """返回元数据快照，尚未扫描过时先扫描一次"""
+        registry = self._registry
+        if not registry.scanned:
+            self.scan_skills()
+            registry = self._registry
+        return registry
+
+    def _rescan(self) -> list[SkillMetadata]:
+        """
+        执行一次增量扫描，并用结果替换元数据快照
+
+        并发请求合并为一次扫描（single-flight）：等锁期间如果有一次在本次请求
+        之后才开始的扫描已经完成，直接共享它的结果。正在进行中的扫描可能早于
+        调用方看到的文件变化，因此不会被复用。
+        """
+        requested_after = self._scans_started
+        with self._scan_lock:
+            registry = self._registry
+            if registry.generation > requested_after:
+                return list(registry.skills)
+            return self._scan_locked()
+
+    def _scan_locked(self) -> list[SkillMetadata]:
+        """扫描实现，调用方需持有 _scan_lock"""
+        self._scans_started += 1
+        generation = self._scans_started
+
+        if self.bundle_path is not None:
+            skills = self._open_bundle().skills
+        elif self.scan_workers > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(self.scan_workers, thread_name_prefix="skill-scan") as pool:
+                skills = self._collect_skills(pool.map)
+        else:
+            skills = self._collect_skills(map)
+
+        if self.bundle_path is None:
+            # 清理已删除的条目并持久化索引
+            self._index.save()
+
+        # 整体替换快照而不是原地修改：读取方无锁，已删除的 skill 同时移除
+        self._registry = SkillRegistry.build(skills, generation)
+        # 新的扫描结果可能包含之前未找到的 skill
+        self._negative_cache = {}
+
+        return skills
+
+    def _open_bundle(self) -> "SkillBundle":
+        """
+        打开（或在文件被重新构建后重新打开）bundle
+
+        旧的映射不主动关闭：其他线程可能仍在从中切片，引用释放后自动解除映射。
+        """
+        from .skill_bundle import SkillBundle
+
+        if self._bundle is None or self._bundle.is_stale():
+            self._bundle = SkillBundle(self.bundle_path)
+        return self._bundle
+
+    def _collect_skills(self, map_fn) -> list[SkillMetadata]:
+        """
+        遍历所有根目录，按顺序收集元数据
+
+        map_fn 为内置 map（顺序）或线程池的 map（并行）。两者都按输入顺序
+        返回结果，因此根目录顺序（项目级优先）和目录顺序保持不变。
+        """
+        # 遍历 skills 目录下的每个子目录（根目录不存在时为空）
+        dir_lists = list(map_fn(self._index.list_skill_dirs, self.skill_paths))
+        candidates = [
+            (base_path, skill_dir)
+            for base_path, skill_dirs in zip(self.skill_paths, dir_lists)
+            for skill_dir in skill_dirs
+        ]
+
+        def probe(batch):
+            return [
+                self._index.get_metadata(base_path, skill_dir, self._parse_skill_metadata)
+                for base_path, skill_dir in batch
+            ]
+
+        # 解析元数据（没有 SKILL.md 的目录返回 None）
+        if map_fn is map or len(candidates) < PARALLEL_SCAN_THRESHOLD:
+            results = probe(candidates)
+        else:
+            # 按批提交，减少线程池调度开销
+            size = max(1, min(SCAN_BATCH_SIZE, len(candidates) // self.scan_workers))
+            batches = [candidates[i:i + size] for i in range(0, len(candidates), size)]
+            results = [metadata for batch in map_fn(probe, batches) for metadata in batch]
+
         skills = []
         seen_names = set()
+        for metadata in results:
+            if metadata and metadata.name not in seen_names:
+                skills.append(metadata)
+                seen_names.add(metadata.name)
+
+        return skills
+
+    def watch(self, **kwargs) -> "SkillWatcher":
+        """
+        启动目录监听，保持元数据缓存最新
 
-        for base_path in self.skill_paths:
-            if not base_path.exists():
-                continue
+        启动后 scan_skills() 和 load_skill() 的未命中重扫都直接使用
+        监听线程维护的结果。
 
-            # 遍历 skills 目录下的每个子目录
-            for skill_dir in base_path.iterdir():
-                if not skill_dir.is_dir():
-                    continue
+        Args:
+            **kwargs: 传给 SkillWatcher 的参数（debounce, poll_interval, use_inotify 等）
 
-                # 检查是否存在 SKILL.md
-                skill_md = skill_dir / "SKILL.md"
-                if not skill_md.exists():
-                    continue
+        Returns:
+            已启动的 SkillWatcher，可用于注册回调
+        """
+        from .skill_watcher import SkillWatcher
 
-                # 解析元数据
-                metadata = self._parse_skill_metadata(skill_md)
-                if metadata and metadata.name not in seen_names:
-                    skills.append(metadata)
-                    seen_names.add(metadata.name)
-                    self._metadata_cache[metadata.name] = metadata
+        if self._watcher is None or not self._watcher.is_running:
+            self._watcher = SkillWatcher(self, **kwargs).start()
+        return self._watcher
 
-        return skills
+    def unwatch(self) -> None:
+        """停止目录监听"""
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
 
     def _parse_skill_metadata(self, skill_md_path: Path) -> Optional[SkillMetadata]:
         """
@@ -158,6 +492,9 @@ class SkillLoader:
             ---
             # Instructions...
 
+        逐行读取，遇到结束的 --- 即停止，body 不会被读入内存；
+        同时记录 body 的字节偏移，供 load_skill 直接 seek。
+
         Args:
             skill_md_path: SKILL.md 文件路径
 
@@ -165,37 +502,58 @@ class SkillLoader:
             解析后的元数据，解析失败返回 None
         """
         try:
-            content = skill_md_path.read_text(encoding="utf-8")
-        except Exception:
+            with open(skill_md_path, "rb") as f:
+                st = os.fstat(f.fileno())
+                parsed = read_frontmatter(f)
+        except OSError:
             return None
 
-        # 使用正则提取 YAML frontmatter
-        # 格式: ---\n...yaml...\n---
-        frontmatter_match = re.match(
-            r'^---\s*\n(.*?)\n---\s*\n',
-            content,
-            re.DOTALL
-        )
+        if parsed is None:
+            return None
+
+        frontmatter, body_offset = parsed
+        name = as_text(frontmatter.get("name"))
+        description = as_text(frontmatter.get("description"))
 
-        if not frontmatter_match:
+        if not name:
             return None
 
-        try:
-            # 解析 YAML
-            frontmatter = yaml.safe_load(frontmatter_match.group(1))
+        return SkillMetadata(
+            name=name,
+            description=description,
+            skill_path=skill_md_path.parent,
+            body_offset=body_offset,
+            file_stamp=(st.st_mtime_ns, st.st_size),
+        )
 
-            name = frontmatter.get("name", "")
-            description = frontmatter.get("description", "")
+    def _read_body(self, metadata: SkillMetadata) -> Optional[str]:
+        """
+        读取 SKILL.md 的 body（去除 frontmatter）
 
-            if not name:
-                return None
+        文件自扫描以来未变化时直接 seek 到 body_offset，
+        否则重新解析 frontmatter 定位 body。
 
-            return SkillMetadata(
-                name=name,
-                description=description,
-                skill_path=skill_md_path.parent,
-            )
-        except yaml.YAMLError:
+        Args:
+            metadata: skill 元数据
+
+        Returns:
+            body 文本，读取失败返回 None
+        """
+        skill_md = metadata.skill_path / "SKILL.md"
+        try:
+            with open(skill_md, "rb") as f:
+                st = os.fstat(f.fileno())
+                if metadata.body_offset and metadata.file_stamp == (st.st_mtime_ns, st.st_size):
+                    f.seek(metadata.body_offset)
+                else:
+                    parsed = read_frontmatter(f)
+                    if parsed is None:
+                        # 没有合法 frontmatter 时返回整个文件
+                        f.seek(0)
+                        return f.read().decode("utf-8")
+                    f.seek(parsed[1])
+                return f.read().decode("utf-8").strip()
+        except (OSError, UnicodeDecodeError):
             return None
 
     def load_skill(self, skill_name: str) -> Optional[SkillContent]:
@@ -205,6 +563,10 @@ class SkillLoader:
         读取 SKILL.md 的完整指令，以及其他 .md 文件和脚本列表。
         这是 load_skill tool 的核心实现。
 
+        结果保存在按字节限额的 LRU 缓存中，命中时只需一次 stat
+        校验 SKILL.md 未被修改。未找到的名称会在 negative_ttl 秒内
+        直接返回 None，不再重复扫描。
+
         Args:
             skill_name: Skill 名称（如 "news-extractor"）
 
@@ -212,37 +574,172 @@ class SkillLoader:
             Skill 完整内容，未找到返回 None
         """
         # 先检查缓存
-        metadata = self._metadata_cache.get(skill_name)
+        metadata = self._registry.get(skill_name)
         if not metadata:
+            if self._is_known_missing(skill_name):
+                return None
+
             # 尝试重新扫描
             self.scan_skills()
-            metadata = self._metadata_cache.get(skill_name)
+            metadata = self._registry.get(skill_name)
 
         if not metadata:
+            self._remember_missing(skill_name)
             return None
 
-        # 读取 SKILL.md 完整内容
+        bundle = self._bundle
+        if bundle is not None:
+            # bundle 模式：直接从映射区域切片，无需 stat 和内容缓存
+            instructions = bundle.read_instructions(skill_name)
+            if instructions is None:
+                return None
+            return SkillContent(metadata=metadata, instructions=instructions)
+
         skill_md = metadata.skill_path / "SKILL.md"
         try:
-            content = skill_md.read_text(encoding="utf-8")
-        except Exception:
+            st = skill_md.stat()
+        except OSError:
             return None
 
-        # 提取 body（去除 frontmatter）
-        body_match = re.match(
-            r'^---\s*\n.*?\n---\s*\n(.*)$',
-            content,
-            re.DOTALL
-        )
-        instructions = body_match.group(1).strip() if body_match else content
+        stamp = (str(skill_md), st.st_mtime_ns, st.st_size)
+        cached = self._content_cache.get(skill_name, stamp)
+        if cached is not None:
+            return cached
+
+        # 读取 SKILL.md body（去除 frontmatter）
+        instructions = self._read_body(metadata)
+        if instructions is None:
+            return None
 
         # 只返回 instructions，让大模型从指令中自己发现脚本和文档
-        return SkillContent(
+        content = SkillContent(
             metadata=metadata,
             instructions=instructions,
         )
+        self._content_cache.put(skill_name, stamp, content)
+        return content
+
+    def _is_known_missing(self, skill_name: str) -> bool:
+        """名称是否在负缓存中且未过期"""
+        expires_at = self._negative_cache.get(skill_name)
+        return expires_at is not None and expires_at > time.monotonic()
+
+    def _remember_missing(self, skill_name: str) -> None:
+        """记录未找到的名称"""
+        if self.negative_ttl <= 0:
+            return
+
+        now = time.monotonic()
+        negative_cache = self._negative_cache
+        if len(negative_cache) >= NEGATIVE_CACHE_MAX_ENTRIES:
+            negative_cache = {k: v for k, v in negative_cache.items() if v > now}
+            if len(negative_cache) >= NEGATIVE_CACHE_MAX_ENTRIES:
+                negative_cache = {}
+        negative_cache[skill_name] = now + self.negative_ttl
+        self._negative_cache = negative_cache
+
+    def skill_names(self) -> list[str]:
+        """
+        已知的 skill 名称（来自内存中的元数据，不访问文件系统）
+
+        尚未扫描过时会先执行一次扫描。
+        """
+        return list(self._ensure_registry().by_name)
+
+    def suggest_skills(self, skill_name: str, limit: int = 3) -> list[str]:
+        """
+        为未找到的名称给出相近的 skill（"did you mean"）
 
-    def build_system_prompt(self, base_prompt: str = "") -> str:
+        基于内存中的名称做模糊匹配，不访问文件系统。
+
+        Args:
+            skill_name: 未找到的名称
+            limit: 最多返回的建议数
+
+        Returns:
+            相近的 skill 名称列表
+        """
+        import difflib
+
+        names = self.skill_names()
+        query = skill_name.strip().lower()
+        by_lower = {name.lower(): name for name in names}
+
+        # 子串匹配优先（如 "news" -> "news-extractor"），再做编辑距离匹配
+        suggestions = [
+            name for lower, name in by_lower.items()
+            if query and (query in lower or lower in query)
+        ]
+        for lower in difflib.get_close_matches(query, list(by_lower), n=limit, cutoff=0.6):
+            if by_lower[lower] not in suggestions:
+                suggestions.append(by_lower[lower])
+
+        return suggestions[:limit]
+
+    def search_skills(self, query: str, limit: int = 10) -> list[SkillMetadata]:
+        """
+        按相关度检索 Skills（BM25，基于名称和描述）
+
+        索引在内存中的元数据上构建，扫描结果变化后自动重建。
+
+        Args:
+            query: 查询文本
+            limit: 最多返回的结果数
+
+        Returns:
+            按相关度降序排列的 Skills 元数据
+        """
+        registry = self._ensure_registry()
+        return [skill for skill, _ in self._get_search_index(registry).search(query, limit)]
+
+    def _get_search_index(self, registry: SkillRegistry) -> SkillSearchIndex:
+        """返回与快照对应的检索索引（快照每次扫描都会整体替换）"""
+        cached = self._search_index
+        if cached is None or cached[0] is not registry:
+            cached = (registry, SkillSearchIndex(list(registry.skills)))
+            self._search_index = cached
+        return cached[1]
+
+    def search_references(
+        self,
+        query: str,
+        skill_name: Optional[str] = None,
+        limit: int = 5,
+    ) -> list[tuple["ReferencePassage", float]]:
+        """
+        在 Skills 的 references/ 和 assets/ 中检索段落（BM25）
+
+        索引首次调用时构建，之后按 (mtime_ns, size) 增量更新，
+        只重新切分变化过的文件。
+
+        Args:
+            query: 查询文本
+            skill_name: 只检索指定 skill 的参考文档
+            limit: 最多返回的段落数
+
+        Returns:
+            [(passage, score)]，按相关度降序
+        """
+        from .skill_references import ReferenceIndex
+
+        registry = self._ensure_registry()
+        index = self._reference_index
+        if index is None:
+            index = self._reference_index = ReferenceIndex()
+        index.maybe_refresh(registry.skills)
+        return index.search(query, limit, skill_name)
+
+    def cache_stats(self) -> CacheStats:
+        """返回 Level 2 内容缓存的统计信息（hits / misses / evictions 等）"""
+        return self._content_cache.stats()
+
+    def build_system_prompt(
+        self,
+        base_prompt: str = "",
+        query: Optional[str] = None,
+        top_k: Optional[int] = None,
+        token_budget: Optional[int] = None,
+    ) -> str:
         """
         构建包含 Skills 列表的 system prompt
 
@@ -251,35 +748,248 @@ class SkillLoader:
 
         Args:
             base_prompt: 基础 system prompt（可选）
+            query: 用户请求，用于挑选最相关的 Skills（见 top_k）
+            top_k: Skills 数量超过 top_k 时只注入与 query 最相关的 top_k 个，
+                其余由 search_skills 工具检索；None 或 <= 0 表示全部注入
+            token_budget: 整个 system prompt 的 token 上限，见 plan_system_prompt()
 
         Returns:
             完整的 system prompt
         """
+        return "\n\n".join(self.build_system_prompt_blocks(base_prompt, query, top_k, token_budget))
+
+    def build_system_prompt_blocks(
+        self,
+        base_prompt: str = "",
+        query: Optional[str] = None,
+        top_k: Optional[int] = None,
+        token_budget: Optional[int] = None,
+    ) -> list[str]:
+        """
+        构建 system prompt 的分块：[基础 prompt, Skills 部分]
+
+        分块后可以分别作为 system content block 发送，便于在 Skills 部分
+        设置 prompt cache 断点。两块以空行拼接即为 build_system_prompt() 的结果。
+
+        Args:
+            base_prompt: 基础 system prompt（可选）
+            query: 用户请求，用于挑选最相关的 Skills
+            top_k: 注入的 Skills 数量上限，None 或 <= 0 表示全部注入
+            token_budget: 整个 system prompt 的 token 上限
+
+        Returns:
+            [基础 prompt, Skills 部分]
+        """
+        return self.plan_system_prompt(base_prompt, query, top_k, token_budget).blocks
+
+    def plan_system_prompt(
+        self,
+        base_prompt: str = "",
+        query: Optional[str] = None,
+        top_k: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        count_tokens: TokenCounter = estimate_tokens,
+    ) -> PromptPlan:
+        """
+        按 token 预算构建 system prompt，并给出每个 skill 的成本
+
+        Skills 的优先级：指定 top_k 且发生筛选时按与 query 的相关度（相关的不足
+        top_k 个时按扫描顺序补足），否则按扫描顺序（项目级在前）。超出预算时从优先级最低的开始：
+        1. 把描述缩短为首句（最多 SHORT_DESCRIPTION_TOKENS）
+        2. 仍然超出时不再注入（可通过 search_skills 检索到）
+
+        Args:
+            base_prompt: 基础 system prompt（可选）
+            query: 用户请求，用于挑选最相关的 Skills
+            top_k: 注入的 Skills 数量上限，None 或 <= 0 表示不限
+            token_budget: 整个 system prompt 的 token 上限，None 或 <= 0 表示不限
+            count_tokens: token 计数函数，默认为离线估算器
+
+        Returns:
+            PromptPlan（blocks、每个 skill 的成本、总 token 数）
+        """
         skills = self.scan_skills()
+        total = len(skills)
+        if top_k and top_k > 0 and total > top_k:
+            ranked = self.search_skills(query or "", top_k)
+            # query 为空或与任何 skill 都不相关时检索结果不足 top_k 个，
+            # 按扫描顺序补足，保证开局总有 Skills 可见
+            if len(ranked) < top_k:
+                chosen = {skill.name for skill in ranked}
+                ranked += [skill for skill in skills if skill.name not in chosen][:top_k - len(ranked)]
+            skills = ranked
+
+        base_prompt = base_prompt or "You are a helpful coding assistant."
+        lines = [skill.to_prompt_line() + "\n" for skill in skills]
+        costs = [SkillCost(skill.name, count_tokens(line), count_tokens(line)) for skill, line in zip(skills, lines)]
+
+        if token_budget and token_budget > 0:
+            # 固定部分：基础 prompt、分块间的空行、Skills 部分的标题和说明
+            # （标题随注入数量变化，取几种情况的最大值）
+            chrome = max(
+                count_tokens(self._render_skills_section([], shown, total))
+                for shown in {len(skills), max(len(skills) - 1, 0), 0}
+            )
+            available = token_budget - count_tokens(base_prompt) - count_tokens("\n\n") - chrome
+            used = sum(cost.tokens for cost in costs)
+
+            # 优先级从低到高：先缩短描述，再整行移除
+            for i in reversed(range(len(skills))):
+                if used <= available:
+                    break
+                short_line = skills[i].to_prompt_line(short=True) + "\n"
+                short_tokens = count_tokens(short_line)
+                if short_tokens < costs[i].tokens:
+                    used -= costs[i].tokens - short_tokens
+                    lines[i] = short_line
+                    costs[i].tokens = short_tokens
+                    costs[i].mode = "short"
+
+            for i in reversed(range(len(skills))):
+                if used <= available:
+                    break
+                used -= costs[i].tokens
+                lines[i] = None
+                costs[i].tokens = 0
+                costs[i].mode = "dropped"
+
+        kept = [
+            line for _, line in sorted(
+                (skill.name, line) for skill, line in zip(skills, lines) if line is not None
+            )
+        ]
+        blocks = [base_prompt, self._render_skills_section(kept, len(kept), total)]
+        return PromptPlan(
+            blocks=blocks,
+            skills=costs,
+            total_tokens=count_tokens("\n\n".join(blocks)),
+            token_budget=token_budget,
+        )
+
+    def build_skills_section(self, skills: list[SkillMetadata], total: Optional[int] = None) -> str:
+        """
+        构建 system prompt 中的 Skills 部分
 
-        # 构建 Skills 部分
-        if skills:
-            skills_section = "## Available Skills\n\n"
+        Skills 按名称排序，保证同一组 Skills 在不同机器、不同启动之间
+        生成完全相同的文本（prompt cache 依赖前缀逐字节一致）。
+
+        Args:
+            skills: 要注入的 Skills 元数据
+            total: 已安装的 Skills 总数，大于 len(skills) 时提示使用 search_skills
+
+        Returns:
+            Skills 部分文本
+        """
+        lines = [skill.to_prompt_line() + "\n" for skill in sorted(skills, key=lambda s: s.name)]
+        return self._render_skills_section(lines, len(skills), len(skills) if total is None else total)
+
+    def _render_skills_section(self, lines: list[str], shown: int, total: int) -> str:
+        """
+        拼接 Skills 部分
+
+        Args:
+            lines: 已排序的 skill 描述行（含换行）
+            shown: 注入的 skill 数量
+            total: 已安装的 skill 总数
+        """
+        partial = total > shown
+
+        if not total:
+            return "## Skills\n\nNo skills currently available.\n"
+
+        skills_section = "## Available Skills\n\n"
+        if not partial:
             skills_section += "You have access to the following specialized skills:\n\n"
-            for skill in skills:
-                skills_section += skill.to_prompt_line() + "\n"
-            skills_section += "\n"
-            skills_section += "### How to Use Skills\n\n"
-            skills_section += "1. **Discover**: Review the skills list above\n"
-            skills_section += "2. **Load**: When a user request matches a skill's description, "
-            skills_section += "use `load_skill(skill_name)` to get detailed instructions\n"
-            skills_section += "3. **Execute**: Follow the skill's instructions, which may include "
-            skills_section += "running scripts via `bash`\n\n"
-            skills_section += "**Important**: Only load a skill when it's relevant to the user's request. "
-            skills_section += "Script code never enters the context - only their output does.\n"
+        elif shown:
+            skills_section += (
+                f"{total} skills are installed. The {shown} most relevant to this "
+                "conversation are listed below; use `search_skills(query)` to find the others:\n\n"
+            )
         else:
-            skills_section = "## Skills\n\nNo skills currently available.\n"
-
-        # 组合完整 prompt
-        if base_prompt:
-            return f"{base_prompt}\n\n{skills_section}"
+            skills_section += (
+                f"{total} skills are installed; use `search_skills(query)` "
+                "to find the ones relevant to the request.\n"
+            )
+        skills_section += "".join(lines)
+        skills_section += "\n"
+        skills_section += "### How to Use Skills\n\n"
+        if partial:
+            skills_section += "1. **Discover**: Review the skills list above, or call `search_skills` "
+            skills_section += "with keywords from the request when none of them fit\n"
         else:
-            return f"You are a helpful coding assistant.\n\n{skills_section}"
+            skills_section += "1. **Discover**: Review the skills list above\n"
+        skills_section += "2. **Load**: When a user request matches a skill's description, "
+        skills_section += "use `load_skill(skill_name)` to get detailed instructions\n"
+        skills_section += "3. **Execute**: Follow the skill's instructions, which may include "
+        skills_section += "running scripts via `bash`\n\n"
+        skills_section += "**Important**: Only load a skill when it's relevant to the user's request. "
+        skills_section += "Script code never enters the context - only their output does.\n"
+        return skills_section
+
+    # === 异步接口 ===
+    #
+    # 供 async FastAPI handler / 异步 agent 调用：阻塞的文件 I/O 在专用的有界线程池
+    # 中执行，不占用事件循环。参数相同的并发调用共享同一个任务和结果，
+    # 返回值与对应的同步方法完全相同。
+
+    async def ascan_skills(self) -> list[SkillMetadata]:
+        """scan_skills() 的异步版本"""
+        return list(await self._run_shared(("scan",), self.scan_skills))
+
+    async def aload_skill(self, skill_name: str) -> Optional[SkillContent]:
+        """load_skill() 的异步版本"""
+        return await self._run_shared(("load", skill_name), self.load_skill, skill_name)
+
+    async def abuild_system_prompt(
+        self,
+        base_prompt: str = "",
+        query: Optional[str] = None,
+        top_k: Optional[int] = None,
+        token_budget: Optional[int] = None,
+    ) -> str:
+        """build_system_prompt() 的异步版本"""
+        return await self._run_shared(
+            ("prompt", base_prompt, query, top_k, token_budget),
+            self.build_system_prompt, base_prompt, query, top_k, token_budget,
+        )
+
+    async def _run_shared(self, key: tuple, fn, *args):
+        """
+        在线程池中执行 fn(*args)；key 相同的任务仍在进行时直接等待它的结果
+
+        等待方被取消时不会取消共享的任务（其他等待方仍需要结果）。
+        """
+        import asyncio
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._get_executor().submit(fn, *args)
+                self._inflight[key] = future
+                # 任务已完成时回调会在当前线程立即执行，因此 _inflight_lock 是可重入锁
+                future.add_done_callback(lambda f: self._forget_inflight(key, f))
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def _forget_inflight(self, key: tuple, future: "Future") -> None:
+        """任务完成后移除，之后的调用重新执行（结果以当时的文件系统为准）"""
+        with self._inflight_lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _get_executor(self) -> "ThreadPoolExecutor":
+        """返回异步接口使用的线程池，调用方需持有 _inflight_lock"""
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor = ThreadPoolExecutor(self.async_workers, thread_name_prefix="skill-io")
+        return self._executor
+
+    def close(self) -> None:
+        """关闭异步接口的线程池（进行中的任务会执行完）"""
+        with self._inflight_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
 
 
 # 便捷函数
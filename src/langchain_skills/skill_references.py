@@ -0,0 +1,289 @@
+"""
+Skills 参考文档全文索引
+
+SKILL.md 之外，skill 的 references/ 和 assets/ 目录中常有较长的参考文档。
+通过 read_file / grep 查阅时，要么把整个文件读入上下文，要么需要多轮调用。
+ReferenceIndex 把这些文本文件切分为段落块，建立 BM25 倒排索引，
+search_references 工具一次调用即可返回最相关的段落及其 文件:行号 锚点：
+
+- 按行切块（最多 CHUNK_LINES 行），优先在 Markdown 标题和空行处断开
+- 分词与 skill_search 相同（中英文混合，不依赖词典）
+- 以 (mtime_ns, size) 校验文件，只重新切分变化过的文件
+- 跳过二进制文件和超过 MAX_FILE_BYTES 的文件
+
+使用示例：
+    index = ReferenceIndex()
+    index.refresh(loader.scan_skills())
+    for passage, score in index.search("分页参数", limit=5):
+        print(passage.anchor, score)
+"""
+
+import math
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Sequence, TYPE_CHECKING
+
+from .skill_search import BM25_B, BM25_K1, tokenize
+
+if TYPE_CHECKING:
+    from .skill_loader import SkillMetadata
+
+
+# 建立索引的 skill 子目录
+REFERENCE_DIRS = ("references", "assets")
+
+# 每个段落块的最大行数
+CHUNK_LINES = 40
+
+# 段落块达到该行数后，遇到标题或空行即断开
+CHUNK_MIN_LINES = 12
+
+# 超过该大小的文件不建立索引（字节）
+MAX_FILE_BYTES = 2 * 1024 * 1024
+
+# 判断二进制文件时读取的字节数
+BINARY_SNIFF_BYTES = 8192
+
+# 两次检查文件变化的最小间隔（秒）
+DEFAULT_REFRESH_INTERVAL = 2.0
+
+
+@dataclass
+class ReferencePassage:
+    """参考文档中的一个段落块"""
+    skill_name: str
+    path: Path
+    start_line: int         # 起始行号（从 1 开始）
+    end_line: int           # 结束行号（包含）
+    text: str
+    terms: Counter = field(default_factory=Counter, repr=False, compare=False)
+
+    @property
+    def anchor(self) -> str:
+        """文件:行号 锚点（如 /path/references/api.md:12-40）"""
+        return f"{self.path}:{self.start_line}-{self.end_line}"
+
+
+def _is_break(line: str) -> bool:
+    """是否为合适的断开位置（空行或 Markdown 标题）"""
+    stripped = line.strip()
+    return not stripped or stripped.startswith("#")
+
+
+def chunk_lines(lines: list[str]) -> list[tuple[int, int]]:
+    """
+    把文件的行切分为段落块
+
+    Args:
+        lines: 文件内容（不含换行符）
+
+    Returns:
+        [(起始下标, 结束下标)]，左闭右开
+    """
+    chunks = []
+    start = 0
+    for i, line in enumerate(lines):
+        size = i - start
+        if size >= CHUNK_LINES or (size >= CHUNK_MIN_LINES and _is_break(line)):
+            chunks.append((start, i))
+            start = i
+    if start < len(lines):
+        chunks.append((start, len(lines)))
+    return chunks
+
+
+def _read_text(path: Path) -> Optional[str]:
+    """读取文本文件，二进制或无法解码时返回 None"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(MAX_FILE_BYTES + 1)
+    except OSError:
+        return None
+    if len(data) > MAX_FILE_BYTES or b"\0" in data[:BINARY_SNIFF_BYTES]:
+        return None
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def parse_file(skill_name: str, path: Path) -> list[ReferencePassage]:
+    """
+    读取文件并切分为段落块
+
+    Args:
+        skill_name: 所属 skill
+        path: 文件路径
+
+    Returns:
+        段落块列表（跳过的文件返回空列表）
+    """
+    text = _read_text(path)
+    if text is None:
+        return []
+
+    lines = text.splitlines()
+    passages = []
+    for start, end in chunk_lines(lines):
+        body = "\n".join(lines[start:end])
+        terms = Counter(tokenize(body))
+        if not terms:
+            continue
+        passages.append(ReferencePassage(
+            skill_name=skill_name,
+            path=path,
+            start_line=start + 1,
+            end_line=end,
+            text=body,
+            terms=terms,
+        ))
+    return passages
+
+
+@dataclass
+class _Snapshot:
+    """某一时刻的索引（构建后不可变，检索无需加锁）"""
+    passages: list[ReferencePassage]
+    postings: dict[str, list[tuple[int, int]]]
+    lengths: list[int]
+    avg_length: float
+
+
+class ReferenceIndex:
+    """
+    Skills 参考文档上的 BM25 段落索引
+
+    refresh() 对比文件的 (mtime_ns, size)，只重新切分变化的文件；
+    有变化时重建倒排表并整体替换快照。
+    """
+
+    def __init__(self, refresh_interval: float = DEFAULT_REFRESH_INTERVAL):
+        """
+        Args:
+            refresh_interval: 两次检查文件变化的最小间隔（秒），
+                maybe_refresh() 在间隔内直接返回
+        """
+        self.refresh_interval = refresh_interval
+        # 文件路径 -> ((mtime_ns, size), skill 名称, 段落块)
+        self._files: dict[Path, tuple[tuple[int, int], str, list[ReferencePassage]]] = {}
+        self._snapshot = _Snapshot([], {}, [], 0.0)
+        self._lock = threading.Lock()
+        self._skills: Optional[Sequence["SkillMetadata"]] = None
+        self._checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._snapshot.passages)
+
+    def maybe_refresh(self, skills: Sequence["SkillMetadata"]) -> None:
+        """Skills 列表变化或超过 refresh_interval 时执行 refresh()"""
+        if skills is self._skills and time.monotonic() - self._checked_at < self.refresh_interval:
+            return
+        self.refresh(skills)
+
+    def refresh(self, skills: Sequence["SkillMetadata"]) -> bool:
+        """
+        同步索引与磁盘上的参考文档
+
+        Args:
+            skills: 当前的 Skills 元数据
+
+        Returns:
+            索引是否发生了变化
+        """
+        with self._lock:
+            files: dict[Path, tuple[tuple[int, int], str, list[ReferencePassage]]] = {}
+            changed = False
+            for skill in skills:
+                for path, stamp in _list_files(skill.skill_path):
+                    cached = self._files.get(path)
+                    if cached is not None and cached[:2] == (stamp, skill.name):
+                        files[path] = cached
+                    else:
+                        files[path] = (stamp, skill.name, parse_file(skill.name, path))
+                        changed = True
+
+            if changed or files.keys() != self._files.keys():
+                self._files = files
+                self._snapshot = _build_snapshot(files)
+                changed = True
+
+            self._skills = skills
+            self._checked_at = time.monotonic()
+            return changed
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        skill_name: Optional[str] = None,
+    ) -> list[tuple[ReferencePassage, float]]:
+        """
+        按相关度检索段落
+
+        Args:
+            query: 查询文本
+            limit: 最多返回的段落数
+            skill_name: 只在指定 skill 的参考文档中检索
+
+        Returns:
+            [(passage, score)]，按分数降序，分数相同时按锚点排序
+        """
+        snapshot = self._snapshot
+        if limit <= 0 or not snapshot.passages:
+            return []
+
+        n = len(snapshot.passages)
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = snapshot.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, freq in postings:
+                if skill_name and snapshot.passages[doc_id].skill_name != skill_name:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * snapshot.lengths[doc_id] / snapshot.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (BM25_K1 + 1) / (freq + norm)
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (-item[1], str(snapshot.passages[item[0]].path), snapshot.passages[item[0]].start_line),
+        )
+        return [(snapshot.passages[doc_id], score) for doc_id, score in ranked[:limit]]
+
+
+def _list_files(skill_path: Path) -> list[tuple[Path, tuple[int, int]]]:
+    """列出 skill 参考目录下的文件及其 (mtime_ns, size)，跳过隐藏文件和目录"""
+    results = []
+    for dir_name in REFERENCE_DIRS:
+        root = skill_path / dir_name
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for filename in sorted(filenames):
+                if filename.startswith("."):
+                    continue
+                path = Path(dirpath) / filename
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                if st.st_size <= MAX_FILE_BYTES:
+                    results.append((path, (st.st_mtime_ns, st.st_size)))
+    return results
+
+
+def _build_snapshot(files: dict[Path, tuple[tuple[int, int], str, list[ReferencePassage]]]) -> _Snapshot:
+    """从各文件的段落块构建倒排表"""
+    passages = [passage for _, _, file_passages in files.values() for passage in file_passages]
+    postings: dict[str, list[tuple[int, int]]] = {}
+    lengths = []
+    for doc_id, passage in enumerate(passages):
+        lengths.append(sum(passage.terms.values()))
+        for term, freq in passage.terms.items():
+            postings.setdefault(term, []).append((doc_id, freq))
+    avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+    return _Snapshot(passages, postings, lengths, avg_length)
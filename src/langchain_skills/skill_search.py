@@ -0,0 +1,135 @@
+"""
+Skills 检索（BM25）
+
+Skills 数量很多时（上千个），把全部元数据注入 system prompt 会让每次请求
+都携带约 100k tokens。SkillSearchIndex 在本地对 skill 名称和描述建立
+BM25 倒排索引：
+
+- Level 1 只注入与首条用户消息最相关的 top-k 个 skill
+- search_skills 工具让模型按需检索其余的 skill
+
+分词同时支持英文和中文（描述大多是中文）：
+- 英文/数字按非字母数字字符切分并转小写（news-extractor -> news, extractor）
+- 连续的 CJK 字符切分为单字 + 相邻二字组（"提取文章" -> 提, 取, 文, 章,
+  提取, 取文, 文章），不依赖分词词典
+
+使用示例：
+    index = SkillSearchIndex(loader.scan_skills())
+    for skill, score in index.search("提取公众号文章", limit=5):
+        print(skill.name, score)
+"""
+
+import functools
+import math
+import re
+from collections import Counter
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .skill_loader import SkillMetadata
+
+
+# BM25 参数
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# 名称中的词项权重（名称比描述更能代表 skill 的用途）
+NAME_WEIGHT = 3
+
+# CJK 统一表意文字、扩展 A、兼容表意文字，以及日文假名和韩文音节
+_CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+
+
+@functools.cache
+def _patterns() -> tuple[re.Pattern, re.Pattern]:
+    """(词项正则, CJK 判断正则)，首次使用时才编译"""
+    return re.compile(f"[{_CJK_RANGES}]+|[0-9a-z]+"), re.compile(f"[{_CJK_RANGES}]")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    将文本切分为检索词项
+
+    Args:
+        text: 待切分的文本（中英文混合）
+
+    Returns:
+        词项列表（保留重复，用于计算词频）
+    """
+    token_re, cjk_re = _patterns()
+    tokens: list[str] = []
+    for run in token_re.findall(text.lower()):
+        if not cjk_re.match(run):
+            tokens.append(run)
+            continue
+        # CJK 连续片段：单字 + 二字组
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class SkillSearchIndex:
+    """
+    Skill 名称和描述上的 BM25 索引
+
+    索引在构建后不可变；Skills 变化时由 SkillLoader 重新构建。
+    """
+
+    def __init__(self, skills: list["SkillMetadata"]):
+        """
+        Args:
+            skills: 要建立索引的 Skills 元数据
+        """
+        self.skills = list(skills)
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._doc_lengths: list[int] = []
+
+        for doc_id, skill in enumerate(self.skills):
+            terms = Counter(tokenize(skill.description))
+            for term in tokenize(skill.name):
+                terms[term] += NAME_WEIGHT
+            self._doc_lengths.append(sum(terms.values()))
+            for term, freq in terms.items():
+                self._postings.setdefault(term, []).append((doc_id, freq))
+
+        total = sum(self._doc_lengths)
+        self._avg_length = total / len(self._doc_lengths) if self._doc_lengths else 0.0
+
+    def __len__(self) -> int:
+        return len(self.skills)
+
+    def _idf(self, term: str) -> float:
+        """BM25 IDF（加 1 平滑，保证非负）"""
+        doc_freq = len(self._postings.get(term, ()))
+        n = len(self.skills)
+        return math.log(1 + (n - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def search(self, query: str, limit: int = 10) -> list[tuple["SkillMetadata", float]]:
+        """
+        按相关度检索 Skills
+
+        只遍历查询词项的倒排表，开销与命中的文档数成正比，与库的大小无关。
+
+        Args:
+            query: 查询文本（如用户消息）
+            limit: 最多返回的结果数
+
+        Returns:
+            [(skill, score)]，按分数降序，分数相同时按名称排序；
+            没有任何词项命中时返回空列表
+        """
+        if limit <= 0 or not self.skills:
+            return []
+
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for doc_id, freq in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[doc_id] / self._avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (BM25_K1 + 1) / (freq + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self.skills[item[0]].name))
+        return [(self.skills[doc_id], score) for doc_id, score in ranked[:limit]]
@@ -0,0 +1,173 @@
+"""
+SKILL.md 章节解析
+
+完整的 SKILL.md 约 5k tokens，很多任务只需要其中一节。这里把 body 解析为
+标题树，每个章节记录 token 数，供 load_skill 返回目录（TOC）或按名称
+只返回指定章节：
+
+- 只识别 ATX 标题（# ~ ######），忽略代码块（``` / ~~~）中的 # 行
+- 章节范围：从标题行到下一个同级或更高级标题之前（包含子章节）
+- 第一个标题之前的内容作为 "Overview" 章节
+- 按标题名称（不区分大小写）或路径（"Usage > Options" / "Usage/Options"）查找
+
+使用示例：
+    sections = parse_sections(content.instructions)
+    print(format_toc(sections))
+    print(find_section(sections, "Usage > Options").text)
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .token_budget import estimate_tokens
+
+
+# 标题前内容的章节名
+PREAMBLE_TITLE = "Overview"
+
+_HEADING_RE = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$")
+_FENCE_RE = re.compile(r"^[ \t]{0,3}(```|~~~)")
+_PATH_SEPARATOR_RE = re.compile(r"\s*(?:>|/)\s*")
+
+
+@dataclass
+class SkillSection:
+    """SKILL.md 中的一个章节"""
+    title: str
+    level: int                  # 标题级别（1~6），Overview 为 0
+    path: list[str]             # 从顶层到本章节的标题路径
+    text: str                   # 章节全文（含标题行和子章节）
+    tokens: int = 0             # 估算的 token 数
+    children: list["SkillSection"] = field(default_factory=list, repr=False)
+
+    @property
+    def path_str(self) -> str:
+        return " > ".join(self.path)
+
+
+def parse_sections(markdown: str) -> list[SkillSection]:
+    """
+    把 Markdown 解析为章节列表（按出现顺序，扁平列表；children 描述树结构）
+
+    Args:
+        markdown: SKILL.md body
+
+    Returns:
+        章节列表
+    """
+    lines = markdown.splitlines(keepends=True)
+
+    # 1. 找出所有标题行（跳过代码块）
+    headings: list[tuple[int, int, str]] = []   # (行号, 级别, 标题)
+    fence: Optional[str] = None
+    for number, line in enumerate(lines):
+        fence_match = _FENCE_RE.match(line)
+        if fence_match:
+            marker = fence_match.group(1)
+            if fence is None:
+                fence = marker
+            elif marker == fence:
+                fence = None
+            continue
+        if fence is not None:
+            continue
+        match = _HEADING_RE.match(line)
+        if match:
+            headings.append((number, len(match.group(1)), match.group(2)))
+
+    sections: list[SkillSection] = []
+
+    # 2. 第一个标题之前的内容
+    first_line = headings[0][0] if headings else len(lines)
+    preamble = "".join(lines[:first_line]).strip("\n")
+    if preamble.strip():
+        sections.append(SkillSection(
+            title=PREAMBLE_TITLE,
+            level=0,
+            path=[PREAMBLE_TITLE],
+            text=preamble,
+            tokens=estimate_tokens(preamble),
+        ))
+
+    # 3. 每个标题的范围：到下一个同级或更高级标题为止
+    stack: list[SkillSection] = []
+    for i, (number, level, title) in enumerate(headings):
+        end = len(lines)
+        for next_number, next_level, _ in headings[i + 1:]:
+            if next_level <= level:
+                end = next_number
+                break
+
+        while stack and stack[-1].level >= level:
+            stack.pop()
+
+        text = "".join(lines[number:end]).strip("\n")
+        section = SkillSection(
+            title=title,
+            level=level,
+            path=[s.title for s in stack] + [title],
+            text=text,
+            tokens=estimate_tokens(text),
+        )
+        if stack:
+            stack[-1].children.append(section)
+        sections.append(section)
+        stack.append(section)
+
+    return sections
+
+
+def find_section(sections: list[SkillSection], name: str) -> Optional[SkillSection]:
+    """
+    按名称查找章节
+
+    依次尝试：标题完全匹配、完整路径、路径后缀匹配（均不区分大小写）。
+    标题可以带或不带前导的 #。
+
+    Args:
+        sections: parse_sections() 的结果
+        name: 章节标题或路径（"Usage > Options" / "Usage/Options"）
+
+    Returns:
+        匹配的第一个章节，未找到返回 None
+    """
+    title = name.strip().lstrip("#").strip().lower()
+    if not title:
+        return None
+
+    # 标题本身可能包含 / 或 >（如 "Input/Output"），先按完整标题匹配
+    for section in sections:
+        if section.title.lower() == title:
+            return section
+
+    wanted = [part for part in _PATH_SEPARATOR_RE.split(title) if part]
+    for section in sections:
+        if [p.lower() for p in section.path] == wanted:
+            return section
+    for section in sections:
+        path = [p.lower() for p in section.path]
+        if path[-len(wanted):] == wanted:
+            return section
+    return None
+
+
+def format_toc(sections: list[SkillSection]) -> str:
+    """
+    生成带 token 数的目录
+
+    Args:
+        sections: parse_sections() 的结果
+
+    Returns:
+        Markdown 列表，按标题级别缩进
+    """
+    if not sections:
+        return "(no sections)"
+
+    min_level = min(s.level for s in sections if s.level) if any(s.level for s in sections) else 1
+    lines = []
+    for section in sections:
+        indent = "  " * max(section.level - min_level, 0)
+        lines.append(f"{indent}- {section.title} (~{section.tokens} tokens)")
+    return "\n".join(lines)
@@ -0,0 +1,345 @@
+"""
+Skills 目录监听
+
+为长期运行的进程（如 langchain-skills-web）保持 SkillLoader 的元数据最新，
+请求路径上不再需要执行 scan_skills() 全量扫描：
+
+- Linux: 通过 inotify 监听每个 Skills 根目录及其子目录
+- 其他平台 / inotify 不可用: 定时轮询（依赖 SkillIndex，轮询只需 stat）
+
+事件合并：一次 `git pull` 可能产生上百个文件事件，监听线程会等待事件
+静默 debounce 秒后才执行一次增量扫描，并以一个批次（SkillChangeBatch）
+通知回调。
+
+使用示例：
+    loader = SkillLoader()
+    watcher = loader.watch()
+    watcher.on_added(lambda skill: print("added", skill.name))
+    watcher.on_batch(lambda batch: print(batch.added, batch.modified, batch.removed))
+    ...
+    watcher.stop()
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .skill_loader import SkillLoader, SkillMetadata
+
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+
+# 默认参数
+DEFAULT_DEBOUNCE = 0.3          # 事件静默多久后执行扫描（秒）
+DEFAULT_MAX_DELAY = 2.0         # 持续有事件时最长等待（秒）
+DEFAULT_POLL_INTERVAL = 2.0     # 轮询模式的扫描间隔（秒）
+
+
+@dataclass
+class SkillChangeBatch:
+    """一次合并后的 Skills 变化"""
+    added: list["SkillMetadata"] = field(default_factory=list)
+    modified: list["SkillMetadata"] = field(default_factory=list)
+    removed: list["SkillMetadata"] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+
+def diff_skills(
+    old: list["SkillMetadata"],
+    new: list["SkillMetadata"],
+) -> SkillChangeBatch:
+    """
+    比较两次扫描结果
+
+    同名 skill 的描述、路径或 SKILL.md 的 (mtime, size) 变化视为修改。
+    """
+    old_by_name = {s.name: s for s in old}
+    new_by_name = {s.name: s for s in new}
+    batch = SkillChangeBatch()
+
+    for name, skill in new_by_name.items():
+        previous = old_by_name.get(name)
+        if previous is None:
+            batch.added.append(skill)
+        elif (
+            previous.description != skill.description
+            or previous.skill_path != skill.skill_path
+            or previous.file_stamp != skill.file_stamp
+        ):
+            batch.modified.append(skill)
+
+    for name, skill in old_by_name.items():
+        if name not in new_by_name:
+            batch.removed.append(skill)
+
+    return batch
+
+
+class _Inotify:
+    """基于 ctypes 的最小 inotify 封装"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._add_watch.restype = ctypes.c_int
+
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: Path) -> bool:
+        """添加监听（重复添加同一路径是幂等的）"""
+        return self.watch(path) >= 0
+
+    def watch(self, path: Path) -> int:
+        """添加监听，返回监听描述符（已在监听时返回原描述符），失败时返回 -1"""
+        return self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+
+    def wait(self, timeout: float) -> bool:
+        """等待事件，有事件时读空缓冲区并返回 True"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def inotify_available() -> bool:
+    """当前平台是否支持 inotify"""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        _Inotify().close()
+    except (OSError, AttributeError):
+        return False
+    return True
+
+
+class SkillWatcher:
+    """
+    Skills 目录监听器
+
+    后台线程监听 loader.skill_paths，变化时执行增量扫描并更新
+    loader 的元数据缓存，然后按批次通知回调。
+    """
+
+    def __init__(
+        self,
+        loader: "SkillLoader",
+        debounce: float = DEFAULT_DEBOUNCE,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        use_inotify: Optional[bool] = None,
+    ):
+        """
+        Args:
+            loader: 要保持更新的 SkillLoader
+            debounce: 事件静默多久后执行扫描（秒）
+            max_delay: 事件持续不断时，最多等待多久执行扫描（秒）
+            poll_interval: 轮询模式的扫描间隔（秒）
+            use_inotify: 是否使用 inotify，默认自动检测
+        """
+        self.loader = loader
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.use_inotify = inotify_available() if use_inotify is None else use_inotify
+
+        self._batch_callbacks: list[Callable[[SkillChangeBatch], None]] = []
+        self._added_callbacks: list[Callable[["SkillMetadata"], None]] = []
+        self._modified_callbacks: list[Callable[["SkillMetadata"], None]] = []
+        self._removed_callbacks: list[Callable[["SkillMetadata"], None]] = []
+
+        self._skills: list["SkillMetadata"] = []
+        self._inotify: Optional[_Inotify] = None
+        self._watched: dict[Path, int] = {}
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # === 回调注册 ===
+
+    def on_added(self, callback: Callable[["SkillMetadata"], None]) -> Callable[["SkillMetadata"], None]:
+        """注册新增 skill 回调（可作为装饰器使用）"""
+        self._added_callbacks.append(callback)
+        return callback
+
+    def on_modified(self, callback: Callable[["SkillMetadata"], None]) -> Callable[["SkillMetadata"], None]:
+        """注册 skill 修改回调（可作为装饰器使用）"""
+        self._modified_callbacks.append(callback)
+        return callback
+
+    def on_removed(self, callback: Callable[["SkillMetadata"], None]) -> Callable[["SkillMetadata"], None]:
+        """注册 skill 删除回调（可作为装饰器使用）"""
+        self._removed_callbacks.append(callback)
+        return callback
+
+    def on_batch(self, callback: Callable[[SkillChangeBatch], None]) -> Callable[[SkillChangeBatch], None]:
+        """注册批次回调，每次合并后的变化只调用一次（可作为装饰器使用）"""
+        self._batch_callbacks.append(callback)
+        return callback
+
+    # === 生命周期 ===
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "SkillWatcher":
+        """执行一次初始扫描并启动后台监听线程"""
+        if self.is_running:
+            return self
+
+        self._stop_event.clear()
+
+        # 先建立监听再做初始扫描，避免遗漏两者之间发生的变化
+        if self.use_inotify:
+            try:
+                self._inotify = _Inotify()
+                self._sync_watches()
+            except OSError:
+                self._inotify = None
+
+        self._skills = self.loader._rescan()
+
+        target = self._run_inotify if self._inotify is not None else self._run_polling
+        self._thread = threading.Thread(target=target, name="skill-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """停止后台线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def refresh(self) -> SkillChangeBatch:
+        """
+        立即执行一次增量扫描并分发变化
+
+        Returns:
+            本次扫描发现的变化
+        """
+        with self._refresh_lock:
+            skills = self.loader._rescan()
+            batch = diff_skills(self._skills, skills)
+            self._skills = skills
+
+        if batch:
+            self._dispatch(batch)
+        return batch
+
+    def _dispatch(self, batch: SkillChangeBatch) -> None:
+        """调用回调，单个回调异常不影响其他回调"""
+        calls = (
+            [(cb, skill) for skill in batch.added for cb in self._added_callbacks]
+            + [(cb, skill) for skill in batch.modified for cb in self._modified_callbacks]
+            + [(cb, skill) for skill in batch.removed for cb in self._removed_callbacks]
+            + [(cb, batch) for cb in self._batch_callbacks]
+        )
+        for callback, arg in calls:
+            try:
+                callback(arg)
+            except Exception:
+                continue
+
+    # === 监听循环 ===
+
+    def _run_polling(self) -> None:
+        """轮询模式：定期增量扫描（SkillIndex 保证未变化的文件只需 stat）"""
+        while not self._stop_event.wait(self.poll_interval):
+            self.refresh()
+
+    def _run_inotify(self) -> None:
+        """inotify 模式：等待事件，合并突发事件后扫描一次"""
+        inotify = self._inotify
+        try:
+            while not self._stop_event.is_set():
+                if not inotify.wait(0.5):
+                    continue
+
+                # 合并突发事件：静默 debounce 秒或累计等待 max_delay 秒
+                deadline = time.monotonic() + self.max_delay
+                while time.monotonic() < deadline and not self._stop_event.is_set():
+                    if not inotify.wait(self.debounce):
+                        break
+
+                self.refresh()
+                # 新增的 skill 目录需要补充监听；补充前目录内可能已有变化，再扫描一次
+                if self._sync_watches():
+                    self.refresh()
+        finally:
+            self._inotify = None
+            self._watched = {}
+            inotify.close()
+
+    def _sync_watches(self) -> bool:
+        """
+        为所有根目录和 skill 子目录添加监听
+
+        目录被删除后内核自动移除监听，同名目录重建后需要重新添加，因此每次都对
+        所有目录调用 inotify_add_watch（已监听时返回原描述符），描述符变化即为新增。
+
+        Returns:
+            是否新增了监听
+        """
+        paths = []
+        for base_path in self.loader.skill_paths:
+            if not base_path.is_dir():
+                # 根目录尚不存在时监听其父目录，以便感知目录创建
+                if base_path.parent.is_dir():
+                    paths.append(base_path.parent)
+                continue
+
+            paths.append(base_path)
+            try:
+                with os.scandir(base_path) as it:
+                    paths.extend(Path(entry.path) for entry in it if entry.is_dir())
+            except OSError:
+                continue
+
+        watched = {}
+        added = False
+        for path in paths:
+            wd = self._inotify.watch(path)
+            if wd < 0:
+                continue
+            added = added or self._watched.get(path) != wd
+            watched[path] = wd
+        self._watched = watched
+        return added
@@ -34,13 +34,25 @@ class StreamEventEmitter:
         return StreamEvent("tool_call", {"type": "tool_call", "name": name, "args": args, "id": tool_id})
 
     @staticmethod
-    def tool_result(name: str, content: str, success: bool = True) -> StreamEvent:
-        """工具结果事件"""
+    def tool_progress(name: str, content: str, tool_id: str = "", stream: str = "stdout") -> StreamEvent:
+        """工具执行中的增量输出事件（如 bash 命令的 stdout / stderr 片段）"""
+        return StreamEvent("tool_progress", {
+            "type": "tool_progress",
+            "name": name,
+            "id": tool_id,
+            "stream": stream,
+            "content": content,
+        })
+
+    @staticmethod
+    def tool_result(name: str, content: str, success: bool = True, tool_id: str = "") -> StreamEvent:
+        """工具结果事件（并行工具调用的结果按完成顺序到达，用 id 与调用配对）"""
         return StreamEvent("tool_result", {
             "type": "tool_result",
             "name": name,
             "content": content,
             "success": success,
+            "id": tool_id,
         })
 
     @staticmethod
@@ -10,9 +10,7 @@ from enum import Enum
 from typing import Any, List
 
 from rich.panel import Panel
-from rich.syntax import Syntax
 from rich.text import Text
-from rich.markdown import Markdown
 
 from .utils import SUCCESS_PREFIX, FAILURE_PREFIX, is_success as _is_success, truncate
 
@@ -153,6 +151,8 @@ class ToolResultFormatter:
 
     def _format_json(self, name: str, content: str, max_length: int) -> List[Any]:
         """格式化 JSON 输出"""
+        from rich.syntax import Syntax  # 依赖 pygments，按需导入
+
         # 提取 JSON 内容
         json_content = content
         if content.startswith(SUCCESS_PREFIX):
@@ -171,6 +171,8 @@ class ToolResultFormatter:
 
     def _format_markdown(self, name: str, content: str, max_length: int) -> List[Any]:
         """格式化 Markdown 输出"""
+        from rich.markdown import Markdown  # 依赖 markdown-it，按需导入
+
         display = self._truncate(content, max_length)
         return [Panel(
             Markdown(display),
@@ -68,6 +68,8 @@ class DisplayLimits:
     TOOL_RESULT_STREAM = 500    # 流式显示时的工具结果长度
     TOOL_RESULT_FINAL = 800     # 最终显示时的工具结果长度
     TOOL_RESULT_MAX = 2000      # 工具结果最大长度
+    TOOL_PROGRESS_TAIL = 2000   # 工具执行中保留的输出长度（只保留最新部分）
+    TOOL_PROGRESS_LINES = 5     # 工具执行中显示的输出行数
 
 
 def has_args(args) -> bool:
@@ -0,0 +1,151 @@
+"""
+System prompt 的 token 预算
+
+`len(text) // 4` 只适用于英文：中文描述每个汉字通常就是一个 token，
+按字符数除以 4 会把 Skills 部分低估 3~4 倍。这里提供一个离线的
+token 估算器（不依赖 tokenizer 或网络请求），以及预算分配结果的数据结构。
+
+估算规则（按连续片段计数，各片段之间可加和）：
+- CJK 字符（含全角标点）：每个字符 1 token
+- 英文单词：每 6 个字母 1 token（常见短词为 1 token）
+- 数字：每 3 位 1 token
+- 其他符号：每 2 个 1 token（如 Markdown 的 `**`）
+- 空格不计，连续换行计 1 token
+
+Skills 列表逐行累加，因此每个 skill 的成本可以单独计算，
+并且各行之和与整段文本的估算一致（最多相差分隔换行）。
+"""
+
+import functools
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+
+# 预算不足时，描述缩短到的 token 数
+SHORT_DESCRIPTION_TOKENS = 24
+
+# token 计数函数：离线估算器，或由调用方传入的精确 tokenizer
+TokenCounter = Callable[[str], int]
+
+_CJK = "\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef"
+
+
+@functools.cache
+def _piece_re() -> re.Pattern:
+    """片段正则（大范围字符集编译约需数毫秒，首次使用时才编译）"""
+    return re.compile(
+        f"(?P<cjk>[{_CJK}])"
+        "|(?P<word>[A-Za-z]+)"
+        "|(?P<digits>[0-9]+)"
+        "|(?P<newline>\\n+)"
+        "|(?P<space>[^\\S\\n]+)"
+        f"|(?P<symbols>[^A-Za-z0-9\\s{_CJK}]+)"
+    )
+
+
+# 描述在这些标点处截断为首句
+_SENTENCE_END_RE = re.compile(r"[。！？；!?;]|\.(?:\s|$)")
+
+
+def _piece_tokens(match: re.Match) -> int:
+    """单个片段的 token 数"""
+    kind = match.lastgroup
+    length = match.end() - match.start()
+    if kind == "cjk" or kind == "newline":
+        return 1
+    if kind == "word":
+        return (length + 5) // 6
+    if kind == "digits":
+        return (length + 2) // 3
+    if kind == "symbols":
+        return (length + 1) // 2
+    return 0
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    离线估算文本的 token 数
+
+    Args:
+        text: 任意文本（中英文混合）
+
+    Returns:
+        估算的 token 数
+    """
+    return sum(_piece_tokens(match) for match in _piece_re().finditer(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, ellipsis: str = "…") -> str:
+    """
+    按估算 token 数截断文本
+
+    Args:
+        text: 原文本
+        max_tokens: 保留的 token 数上限（不含省略号）
+        ellipsis: 截断时追加的省略号
+
+    Returns:
+        截断后的文本；未超出时原样返回
+    """
+    used = 0
+    for match in _piece_re().finditer(text):
+        used += _piece_tokens(match)
+        if used > max_tokens:
+            return text[:match.start()].rstrip() + ellipsis
+    return text
+
+
+def shorten_description(description: str, max_tokens: int = SHORT_DESCRIPTION_TOKENS) -> str:
+    """
+    缩短 skill 描述：保留首句，仍然过长时按 token 截断
+
+    Args:
+        description: 完整描述（非 str 时先转换为 str，None 视为空字符串）
+        max_tokens: 缩短后的 token 上限
+
+    Returns:
+        缩短后的描述
+    """
+    # frontmatter 中的描述可能被 YAML 解析为 None 或数字
+    if not isinstance(description, str):
+        description = "" if description is None else str(description)
+    match = _SENTENCE_END_RE.search(description)
+    if match and match.end() < len(description.rstrip()):
+        description = description[:match.end()].rstrip()
+    return truncate_to_tokens(description, max_tokens)
+
+
+@dataclass
+class SkillCost:
+    """单个 skill 在 system prompt 中的成本"""
+    name: str
+    full_tokens: int        # 完整描述行的 token 数
+    tokens: int             # 实际注入的 token 数
+    mode: str = "full"      # full: 完整描述 / short: 缩短描述 / dropped: 未注入
+
+
+@dataclass
+class PromptPlan:
+    """
+    按预算构建的 system prompt
+
+    blocks 与 build_system_prompt_blocks() 的返回值相同，
+    skills 按优先级排列（高优先级在前）。
+    """
+    blocks: list[str]
+    skills: list[SkillCost] = field(default_factory=list)
+    total_tokens: int = 0
+    token_budget: Optional[int] = None
+
+    @property
+    def prompt(self) -> str:
+        return "\n\n".join(self.blocks)
+
+    @property
+    def within_budget(self) -> bool:
+        return not self.token_budget or self.total_tokens <= self.token_budget
+
+    def count(self, mode: str) -> int:
+        """指定处理方式（full / short / dropped）的 skill 数量"""
+        return sum(1 for cost in self.skills if cost.mode == mode)
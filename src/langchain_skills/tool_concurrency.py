@@ -0,0 +1,153 @@
+"""
+并行工具调用的并发控制
+
+模型在一次回复中发出多个 tool_use 时，create_agent 把每个调用作为独立任务
+并发执行（结果按原始调用顺序写回对话，流式事件按完成顺序推送）。并发本身
+没有上限，写文件的工具也可能同时修改同一个文件，导致其中一次修改丢失。
+
+ToolConcurrencyMiddleware 按工具的 metadata 决定如何加锁：
+
+- {"parallel_safe": True}：只读工具（read_file / grep / glob ...），直接并发执行
+- {"lock_path_arg": "file_path"}：按该参数解析出的路径加锁，同一文件的写入串行，
+  不同文件的写入仍可并发
+- 其余工具（如 bash，无法确定会写哪些文件）：同一对话线程内串行执行
+
+并发上限通过 LangGraph 的 config["max_concurrency"] 设置，默认读取
+SKILLS_TOOL_CONCURRENCY（见 default_tool_concurrency()）。
+"""
+
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import ToolCallRequest
+
+from .stream import resolve_path
+
+
+# 同一轮中并发执行的工具调用数上限
+DEFAULT_TOOL_CONCURRENCY = 8
+
+# 工具 metadata 中的并发声明
+PARALLEL_SAFE = "parallel_safe"
+LOCK_PATH_ARG = "lock_path_arg"
+
+
+def default_tool_concurrency() -> int:
+    """并发执行的工具调用数上限，读取 SKILLS_TOOL_CONCURRENCY，非法值回退到默认值"""
+    try:
+        return max(1, int(os.getenv("SKILLS_TOOL_CONCURRENCY", str(DEFAULT_TOOL_CONCURRENCY))))
+    except ValueError:
+        return DEFAULT_TOOL_CONCURRENCY
+
+
+class _KeyedLocks:
+    """
+    按 key 分配的锁
+
+    记录每个 key 的使用者数量，无人使用时删除，锁的数量不会随路径数增长。
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._locks: dict[str, tuple[Any, int]] = {}
+        self._guard = threading.Lock()
+
+    def checkout(self, key: str) -> Any:
+        """取得 key 对应的锁（使用完毕后调用 release_ref）"""
+        with self._guard:
+            lock, refs = self._locks.get(key, (None, 0))
+            if lock is None:
+                lock = self._factory()
+            self._locks[key] = (lock, refs + 1)
+            return lock
+
+    def release_ref(self, key: str) -> None:
+        """释放对 key 的引用"""
+        with self._guard:
+            lock, refs = self._locks[key]
+            if refs <= 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, refs - 1)
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+class ToolConcurrencyMiddleware(AgentMiddleware):
+    """
+    串行化同一路径上的写工具
+
+    同步执行使用线程锁，异步执行使用 asyncio 锁（两种模式各自独立）。
+    """
+
+    def __init__(self, working_directory: Optional[Path] = None):
+        """
+        Args:
+            working_directory: 解析相对路径的目录，默认为当前目录
+        """
+        super().__init__()
+        self.working_directory = working_directory or Path.cwd()
+        self._thread_locks = _KeyedLocks(threading.Lock)
+        self._async_locks = _KeyedLocks(asyncio.Lock)
+
+    def lock_key(self, request: ToolCallRequest) -> Optional[str]:
+        """
+        工具调用需要持有的锁
+
+        Returns:
+            锁的 key，可并发执行时返回 None
+        """
+        tool = request.tool
+        metadata = (tool.metadata if tool is not None else None) or {}
+        if metadata.get(PARALLEL_SAFE):
+            return None
+
+        args = request.tool_call.get("args") or {}
+        path_arg = metadata.get(LOCK_PATH_ARG)
+        if path_arg and isinstance(args.get(path_arg), str):
+            return f"path:{resolve_path(args[path_arg], self.working_directory)}"
+
+        configurable = (getattr(request.runtime, "config", None) or {}).get("configurable", {})
+        return f"thread:{configurable.get('thread_id', 'default')}"
+
+    @contextmanager
+    def _hold(self, key: Optional[str]) -> Iterator[None]:
+        if key is None:
+            yield
+            return
+        lock = self._thread_locks.checkout(key)
+        try:
+            with lock:
+                yield
+        finally:
+            self._thread_locks.release_ref(key)
+
+    @asynccontextmanager
+    async def _ahold(self, key: Optional[str]) -> AsyncIterator[None]:
+        if key is None:
+            yield
+            return
+        lock = self._async_locks.checkout(key)
+        try:
+            async with lock:
+                yield
+        finally:
+            self._async_locks.release_ref(key)
+
+    def wrap_tool_call(self, request: ToolCallRequest, handler: Callable[[ToolCallRequest], Any]) -> Any:
+        with self._hold(self.lock_key(request)):
+            return handler(request)
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[Any]],
+    ) -> Any:
+        async with self._ahold(self.lock_key(request)):
+            return await handler(request)
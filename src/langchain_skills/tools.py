@@ -3,24 +3,53 @@ LangChain Tools 定义
 
 使用 LangChain 1.0 的 @tool 装饰器和 ToolRuntime 定义工具：
 - load_skill: 加载 Skill 详细指令（Level 2）
+- search_skills: 检索未注入 system prompt 的 Skills（Level 1 补充）
+- search_references: 检索 Skills 参考文档中的段落（Level 3 补充）
 - bash: 执行命令/脚本（Level 3）
 - read_file: 读取文件
 
 ToolRuntime 提供访问运行时信息的统一接口：
 - state: 可变的执行状态
 - context: 不可变的配置（如 skill_loader）
+
+每个工具同时注册了异步版本（StructuredTool.coroutine），Agent 以异步方式
+运行（astream / ainvoke）时自动使用：bash 使用 asyncio 子进程，load_skill
+使用 SkillLoader.aload_skill，其余文件工具在有界线程池中执行 I/O。
+
+SkillAgentContext.read_cache 不为 None 时，同一对话线程中重复读取未变化的
+文件只返回简短提示，少量变化时返回 diff（见 read_cache.py）；grep_index 不为
+None 时 grep 先用三元组索引筛选候选文件（见 trigram_index.py）；tree_snapshot
+不为 None 时 glob / grep / list_dir 共用一份遵循 .gitignore 的目录树快照，
+只重新列出 mtime 变化的目录（见 tree_snapshot.py）。
 """
 
-import subprocess
+import asyncio
 import fnmatch
+import functools
+import os
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dataclasses import dataclass, field
+from typing import Callable, Optional
 
 from langchain.tools import tool, ToolRuntime
-
-from .skill_loader import SkillLoader
+from langchain_core.tools import BaseTool
+
+from .file_reader import (
+    DEFAULT_BYTE_RANGE, DEFAULT_READ_LINES, BinaryFileError, read_bytes, read_lines, read_tail,
+)
+from .file_search import DEFAULT_MAX_RESULTS, Matcher, iter_files, search_files
+from .read_cache import ReadCache, ReadRecord, render_diff
+from .shell import DEFAULT_TIMEOUT, CommandResult, OutputCallback, arun_command, run_command
+from .shell_session import ShellSessionPool
+from .skill_loader import DEFAULT_ASYNC_WORKERS, SkillLoader, _env_int
 from .stream import resolve_path
+from .token_budget import estimate_tokens
+from .tool_concurrency import LOCK_PATH_ARG, PARALLEL_SAFE
+from .tree_snapshot import TreeSnapshot
+from .trigram_index import TrigramIndex
 
 
 @dataclass
@@ -32,10 +61,23 @@ class SkillAgentContext:
     """
     skill_loader: SkillLoader
     working_directory: Path = field(default_factory=Path.cwd)
+    # 按对话线程保留的常驻 shell，None 时每次 bash 调用启动新进程
+    shell_sessions: Optional[ShellSessionPool] = None
+    # 按对话线程记录 read_file 读取过的内容，None 时每次都返回完整内容
+    read_cache: Optional[ReadCache] = None
+    # 工作目录的三元组索引，grep 用来筛选候选文件，None 时全量搜索
+    grep_index: Optional[TrigramIndex] = None
+    # 工作目录树快照（遵循 .gitignore），None 时 glob / grep / list_dir 每次直接遍历
+    tree_snapshot: Optional[TreeSnapshot] = None
 
 
 @tool
-def load_skill(skill_name: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
+def load_skill(
+    skill_name: str,
+    runtime: ToolRuntime[SkillAgentContext],
+    sections: Optional[list[str]] = None,
+    toc: bool = False,
+) -> str:
     """
     Load a skill's detailed instructions.
 
@@ -46,20 +88,84 @@ def load_skill(skill_name: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
     The skill's instructions will guide you on how to complete the task,
     which may include running scripts via the bash tool.
 
+    Large skills can be loaded piece by piece to save context:
+    - toc=True returns only the table of contents, with the token size of
+      each section
+    - sections=["Usage", "Troubleshooting > Errors"] returns only those
+      sections (matched by heading title or path)
+    - Several skills can be loaded in one call with a comma-separated
+      skill_name (e.g., 'news-extractor, pdf-tools'); prefix a section with
+      'skill-name#' to target one skill (e.g., 'pdf-tools#Installation')
+
     Args:
-        skill_name: Name of the skill to load (e.g., 'news-extractor')
+        skill_name: Name of the skill to load (e.g., 'news-extractor'), or several comma-separated names
+        sections: Section titles or paths to return instead of the full instructions
+        toc: Return the table of contents instead of the instructions
     """
     loader = runtime.context.skill_loader
+    names = [name.strip() for name in skill_name.split(",") if name.strip()] or [skill_name]
+
+    results = [
+        _format_skill(loader, name, loader.load_skill(name), _sections_for(name, names, sections), toc)
+        for name in names
+    ]
+    return "\n---\n\n".join(results)
+
+
+async def _aload_skill(
+    skill_name: str,
+    runtime: ToolRuntime[SkillAgentContext],
+    sections: Optional[list[str]] = None,
+    toc: bool = False,
+) -> str:
+    """load_skill 的异步版本：多个 skill 并发读取，同一文件的并发请求共享一次读取"""
+    loader = runtime.context.skill_loader
+    names = [name.strip() for name in skill_name.split(",") if name.strip()] or [skill_name]
+
+    contents = await asyncio.gather(*(loader.aload_skill(name) for name in names))
+    results = [
+        _format_skill(loader, name, content, _sections_for(name, names, sections), toc)
+        for name, content in zip(names, contents)
+    ]
+    return "\n---\n\n".join(results)
+
+
+def _sections_for(name: str, names: list[str], sections: Optional[list[str]]) -> list[str]:
+    """
+    选出属于某个 skill 的章节
 
-    # 尝试加载 skill
-    skill_content = loader.load_skill(skill_name)
+    "skill-name#Section" 只作用于对应的 skill，其余章节名作用于所有 skill。
+    """
+    selected = []
+    for section in sections or []:
+        prefix, sep, rest = section.partition("#")
+        if sep and prefix.strip() in names:
+            if prefix.strip() == name:
+                selected.append(rest)
+        else:
+            selected.append(section)
+    return selected
 
+
+def _format_skill(loader: SkillLoader, skill_name: str, skill_content, sections: list[str], toc: bool) -> str:
+    """格式化单个 skill 的 load_skill 输出（完整指令 / 目录 / 指定章节）"""
     if not skill_content:
-        # 列出可用的 skills（从已扫描的元数据中获取）
-        skills = loader.scan_skills()
-        if skills:
-            available = [s.name for s in skills]
-            return f"Skill '{skill_name}' not found. Available skills: {', '.join(available)}"
+        # 只给出相近的名称和其余 skill 的数量（从内存中的元数据获取，不重新扫描），
+        # 大型 skill 库中一次拼写错误不会把全部名称带入上下文
+        total = len(loader.skill_names())
+        if total:
+            message = f"Skill '{skill_name}' not found."
+            suggestions = loader.suggest_skills(skill_name)
+            if suggestions:
+                message += f" Did you mean: {', '.join(suggestions)}?"
+            others = total - len(suggestions)
+            if others:
+                more = " more" if suggestions else ""
+                message += (
+                    f" {others}{more} skill(s) installed; "
+                    "use search_skills(query) to find one by keywords."
+                )
+            return message
         else:
             return f"Skill '{skill_name}' not found. No skills are currently available."
 
@@ -78,6 +184,44 @@ def load_skill(skill_name: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
 ```bash
 uv run {scripts_dir}/script_name.py [args]
 ```
+"""
+
+    if toc:
+        total = estimate_tokens(skill_content.instructions)
+        return f"""# Skill: {skill_name}
+
+## Table of Contents (~{total} tokens in full)
+
+{skill_content.table_of_contents()}
+
+Load specific sections with `load_skill(skill_name, sections=[...])`.
+{path_info}
+"""
+
+    if sections:
+        found = []
+        missing = []
+        for name in sections:
+            section = skill_content.get_section(name)
+            if section is None:
+                missing.append(name)
+            elif not any(section.path[:len(f.path)] == f.path for f in found):
+                # 已包含在先前选中的父章节中的子章节不重复返回
+                found.append(section)
+
+        parts = [section.text for section in found]
+        if missing:
+            available = ", ".join(s.path_str for s in skill_content.sections)
+            parts.append(
+                f"Section(s) not found: {', '.join(missing)}. Available sections: {available}"
+            )
+        body = "\n\n".join(parts)
+        return f"""# Skill: {skill_name}
+
+## Sections: {', '.join(s.title for s in found) or '(none)'}
+
+{body}
+{path_info}
 """
 
     # 返回 instructions 和路径信息
@@ -90,6 +234,65 @@ uv run {scripts_dir}/script_name.py [args]
 """
 
 
+@tool
+def search_skills(query: str, runtime: ToolRuntime[SkillAgentContext], limit: int = 10) -> str:
+    """
+    Search the installed skills by name and description.
+
+    The system prompt lists only the skills most relevant to the start of
+    the conversation. Use this tool to find other skills when none of the
+    listed ones fit the task, then load the best match with load_skill.
+
+    Args:
+        query: Keywords describing the task (English or Chinese)
+        limit: Maximum number of skills to return (default 10)
+    """
+    loader = runtime.context.skill_loader
+    skills = loader.search_skills(query, max(1, min(limit, 50)))
+
+    if not skills:
+        return f"No skills matched '{query}'. Try different keywords."
+
+    lines = [f"Found {len(skills)} skill(s) matching '{query}':", ""]
+    lines.extend(skill.to_prompt_line() for skill in skills)
+    return "\n".join(lines)
+
+
+@tool
+def search_references(
+    query: str,
+    runtime: ToolRuntime[SkillAgentContext],
+    skill_name: Optional[str] = None,
+    limit: int = 5,
+) -> str:
+    """
+    Search the reference documents bundled with skills (references/ and assets/).
+
+    Returns the best-matching passages with file:line anchors, so a single
+    call answers most lookups without reading whole documents. Use read_file
+    on an anchor's file when more surrounding context is needed.
+
+    Args:
+        query: Keywords to look up (English or Chinese)
+        skill_name: Only search this skill's documents (default: all skills)
+        limit: Maximum number of passages to return (default 5)
+    """
+    loader = runtime.context.skill_loader
+    hits = loader.search_references(query, skill_name or None, max(1, min(limit, 20)))
+
+    if not hits:
+        scope = f" in skill '{skill_name}'" if skill_name else ""
+        return f"No reference passages matched '{query}'{scope}. Try different keywords."
+
+    lines = [f"Found {len(hits)} passage(s) matching '{query}':"]
+    for passage, _ in hits:
+        lines.append("")
+        lines.append(f"### {passage.anchor} ({passage.skill_name})")
+        for number, line in enumerate(passage.text.split("\n"), passage.start_line):
+            lines.append(f"{number:4d}| {line}")
+    return "\n".join(lines)
+
+
 @tool
 def bash(command: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
     """
@@ -106,60 +309,178 @@ def bash(command: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
     - This is Level 3 of the Skills loading mechanism
     - Follow the skill's instructions for exact command syntax
 
+    Large Output:
+    - Only the beginning and end of a long output are returned
+    - The full output is saved to a file whose path is given in the result;
+      use read_file on that path to page through it (offset / limit, or tail)
+
     Cross-platform Note:
     - On Unix/macOS: Uses /bin/sh (bash-compatible)
     - On Windows: Uses cmd.exe (different syntax, e.g., use 'dir' instead of 'ls')
     - For portable scripts, use Python scripts via `uv run script.py`
 
+    Persistent Shell (when enabled):
+    - The working directory, exported variables and activated environments
+      persist between calls in the same conversation, so `cd` once
+    - A timed-out command restarts the shell in the initial directory
+    - If a new shell had to be started (after a timeout, `exit`, or when an
+      idle conversation's shell was closed), the result says so; redo any
+      `cd` / `export` / `source` you still need
+
     Args:
         command: The shell command to execute
     """
     cwd = str(runtime.context.working_directory)
+    on_output = _progress_callback(runtime)
 
     try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            cwd=cwd,
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-            timeout=300,  # 5 分钟超时
-        )
+        pool = getattr(runtime.context, "shell_sessions", None)
+        if pool is not None:
+            session = pool.get(_thread_id(runtime), cwd)
+            result = session.run(command, timeout=DEFAULT_TIMEOUT, on_output=on_output)
+        else:
+            result = run_command(command, cwd, timeout=DEFAULT_TIMEOUT, on_output=on_output)
+        return _format_command_result(result, restarted=pool is not None)
+
+    except Exception as e:
+        return f"[FAILED] {str(e)}"
+    finally:
+        _invalidate_caches(runtime)
 
-        parts = []
 
-        # 状态标记（与 ToolResultFormatter 配合）
-        if result.returncode == 0:
-            parts.append("[OK]")
+async def _abash(command: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
+    """bash 的异步版本：使用 asyncio 子进程，不占用工作线程"""
+    cwd = str(runtime.context.working_directory)
+    on_output = _progress_callback(runtime)
+
+    try:
+        pool = getattr(runtime.context, "shell_sessions", None)
+        if pool is not None:
+            # 常驻 shell 基于线程读取输出，在线程中执行，回调转回事件循环
+            session = pool.get(_thread_id(runtime), cwd)
+            loop = asyncio.get_running_loop()
+            threadsafe = None
+            if on_output is not None:
+                def threadsafe(stream: str, text: str) -> None:
+                    loop.call_soon_threadsafe(on_output, stream, text)
+            result = await asyncio.to_thread(session.run, command, DEFAULT_TIMEOUT, threadsafe)
         else:
-            parts.append(f"[FAILED] Exit code: {result.returncode}")
+            result = await arun_command(command, cwd, timeout=DEFAULT_TIMEOUT, on_output=on_output)
+        return _format_command_result(result, restarted=pool is not None)
 
-        parts.append("")  # 空行分隔
+    except Exception as e:
+        return f"[FAILED] {str(e)}"
+    finally:
+        _invalidate_caches(runtime)
 
-        if result.stdout:
-            parts.append(result.stdout.rstrip())
 
-        if result.stderr:
-            if result.stdout:
-                parts.append("")
-            parts.append("--- stderr ---")
-            parts.append(result.stderr.rstrip())
+def _invalidate_caches(runtime: ToolRuntime[SkillAgentContext], path: Optional[Path] = None) -> None:
+    """
+    通知 read_cache 和 grep_index 文件已被修改
 
-        if not result.stdout and not result.stderr:
-            parts.append("(no output)")
+    Args:
+        runtime: 工具运行时
+        path: 被修改的文件；None 表示可能修改了任意文件（bash），
+            使当前线程的 read_cache 记录失效，grep_index 下次查询前重新检查
+    """
+    cache = getattr(runtime.context, "read_cache", None)
+    index = getattr(runtime.context, "grep_index", None)
+    if path is None:
+        if cache is not None:
+            cache.invalidate_thread(_thread_id(runtime))
+        if index is not None:
+            index.mark_stale()
+        return
+    if cache is not None:
+        cache.invalidate_path(str(path))
+    if index is not None:
+        index.invalidate(path)
+
+
+def _thread_id(runtime: ToolRuntime[SkillAgentContext]) -> str:
+    """当前对话线程 ID（常驻 shell 按线程区分）"""
+    configurable = (getattr(runtime, "config", None) or {}).get("configurable", {})
+    return str(configurable.get("thread_id", "default"))
+
+
+def _progress_callback(runtime: ToolRuntime[SkillAgentContext]) -> Optional[OutputCallback]:
+    """把命令输出实时推送为 tool_progress 事件（stream_mode 包含 "custom" 时可见）"""
+    writer = getattr(runtime, "stream_writer", None)
+    if writer is None:
+        return None
+    tool_call_id = getattr(runtime, "tool_call_id", None) or ""
+
+    def on_output(stream: str, text: str) -> None:
+        writer({
+            "type": "tool_progress",
+            "name": "bash",
+            "id": tool_call_id,
+            "stream": stream,
+            "content": text,
+        })
+
+    return on_output
+
+
+def _format_command_result(result: CommandResult, restarted: bool = False) -> str:
+    """
+    格式化 bash 工具的输出
 
-        return "\n".join(parts)
+    Args:
+        result: 命令执行结果
+        restarted: 超时后是否重启了常驻 shell
+    """
+    if result.timed_out:
+        if restarted:
+            return (
+                f"[FAILED] Command timed out after {DEFAULT_TIMEOUT} seconds. "
+                "The shell was restarted in the initial working directory."
+            )
+        return f"[FAILED] Command timed out after {DEFAULT_TIMEOUT} seconds."
 
-    except subprocess.TimeoutExpired:
-        return "[FAILED] Command timed out after 300 seconds."
-    except Exception as e:
-        return f"[FAILED] {str(e)}"
+    parts = []
+
+    # 状态标记（与 ToolResultFormatter 配合）
+    if result.returncode == 0:
+        parts.append("[OK]")
+    else:
+        parts.append(f"[FAILED] Exit code: {result.returncode}")
+
+    parts.append("")  # 空行分隔
+
+    if result.stdout:
+        parts.append(result.stdout.rstrip())
+
+    if result.stderr:
+        if result.stdout:
+            parts.append("")
+        parts.append("--- stderr ---")
+        parts.append(result.stderr.rstrip())
+
+    if not result.stdout and not result.stderr:
+        parts.append("(no output)")
+
+    if result.shell_restarted:
+        # 常驻 shell 在本条命令前重新启动（上次超时、执行了 exit，或空闲会话被关闭）
+        parts.append("")
+        parts.append(
+            "Note: a new shell was started for this command in the initial working directory; "
+            "earlier cd / export / activated environments no longer apply."
+        )
+
+    return "\n".join(parts)
 
 
 @tool
-def read_file(file_path: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
+def read_file(
+    file_path: str,
+    runtime: ToolRuntime[SkillAgentContext],
+    offset: int = 1,
+    limit: int = DEFAULT_READ_LINES,
+    tail: Optional[int] = None,
+    byte_offset: Optional[int] = None,
+    byte_length: int = DEFAULT_BYTE_RANGE,
+) -> str:
     """
     Read the contents of a file.
 
@@ -168,8 +489,25 @@ def read_file(file_path: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
     - View script output files
     - Inspect any text file
 
+    Large files are read page by page; only the requested page is loaded:
+    - offset / limit: start at line `offset` (1-based) and return up to `limit` lines;
+      the result ends with the offset to continue from when more lines follow
+    - tail: return the last N lines instead (e.g., tail=100 for the end of a log)
+    - byte_offset / byte_length: return a raw byte range instead of lines
+      (negative byte_offset counts from the end of the file)
+
+    Repeated reads in the same conversation:
+    - If the file has not changed since you last read the same range, only a short
+      "[Unchanged]" notice is returned; the earlier output is still current
+    - If it changed a little, a "[Changed]" diff against that read is returned
+
     Args:
         file_path: Path to the file (absolute or relative to working directory)
+        offset: Line number to start reading from (default 1)
+        limit: Maximum number of lines to return (default 2000)
+        tail: Return the last N lines of the file
+        byte_offset: Start of a byte range to return (switches to byte mode)
+        byte_length: Number of bytes to return in byte mode (default 65536, max 262144)
     """
     path = resolve_path(file_path, runtime.context.working_directory)
 
@@ -179,26 +517,94 @@ def read_file(file_path: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
     if not path.is_file():
         return f"[Error] Not a file: {file_path}"
 
+    cache = getattr(runtime.context, "read_cache", None)
+    thread_id = _thread_id(runtime)
+    if byte_offset is not None:
+        key = (str(path), "bytes", byte_offset, byte_length)
+    elif tail is not None:
+        key = (str(path), "tail", max(1, tail))
+    else:
+        key = (str(path), "lines", offset, max(1, limit))
+
     try:
-        content = path.read_text(encoding="utf-8")
-        lines = content.split("\n")
+        # 在读取之前取文件状态：读取期间文件被修改时，下次读取的状态不会匹配
+        st = path.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+        previous = cache.get(thread_id, key) if cache is not None else None
+        if previous is not None and previous.stamp == stamp:
+            return _unchanged_notice(file_path, previous.turn)
+
+        if byte_offset is not None:
+            text, start, end, size = read_bytes(path, byte_offset, byte_length)
+            header = f"[bytes {start}-{end} of {size}]"
+            if end < size:
+                header += f" (continue with byte_offset={end})"
+            if cache is not None:
+                cache.put(thread_id, key, ReadRecord(stamp, _current_turn(runtime), 1))
+            return f"{header}\n{text}"
+
+        if tail is not None:
+            page = read_tail(path, max(1, tail))
+        else:
+            page = read_lines(path, offset, max(1, limit))
+
+        if not page.lines:
+            if page.file_size == 0:
+                return "(empty file)"
+            return f"[Error] Line {offset} is past the end of the file ({page.total_lines} lines)"
+
+        footer = []
+        if page.has_more:
+            last = page.lines[-1][0]
+            if page.total_lines is not None:
+                footer.append(f"... ({page.total_lines - last} more lines; continue with offset={page.next_offset})")
+            else:
+                footer.append(f"... (more lines; continue with offset={page.next_offset})")
+
+        if cache is not None:
+            first = page.lines[0][0]
+            lines = tuple(line for _, line in page.lines)
+            turn = _current_turn(runtime)
+            if previous is not None and previous.lines is not None:
+                if previous.lines == lines and previous.first_line == first:
+                    cache.put(thread_id, key, ReadRecord(stamp, previous.turn, first, lines))
+                    return _unchanged_notice(file_path, previous.turn)
+                diff = render_diff(previous.lines, list(lines), previous.first_line, first)
+                if diff is not None:
+                    cache.put(thread_id, key, ReadRecord(stamp, turn, first, lines))
+                    since = f"turn {previous.turn}" if previous.turn is not None else "the last read"
+                    header = f"[Changed] {file_path} changed since {since}; diff against that read:"
+                    return "\n".join([header, diff, *footer])
+            cache.put(thread_id, key, ReadRecord(stamp, turn, first, lines))
 
         # 添加行号
-        numbered_lines = []
-        for i, line in enumerate(lines[:2000], 1):  # 限制行数
-            numbered_lines.append(f"{i:4d}| {line}")
-
-        if len(lines) > 2000:
-            numbered_lines.append(f"... ({len(lines) - 2000} more lines)")
+        numbered_lines = [f"{number:4d}| {line}" for number, line in page.lines]
+        return "\n".join(numbered_lines + footer)
 
-        return "\n".join(numbered_lines)
-
-    except UnicodeDecodeError:
+    except BinaryFileError:
         return f"[Error] Cannot read file (binary or unknown encoding): {file_path}"
     except Exception as e:
         return f"[Error] Failed to read file: {str(e)}"
 
 
+def _current_turn(runtime: ToolRuntime[SkillAgentContext]) -> Optional[int]:
+    """当前对话轮次（state 中用户消息的数量），无法取得时返回 None"""
+    state = getattr(runtime, "state", None)
+    messages = state.get("messages") if isinstance(state, dict) else getattr(state, "messages", None)
+    if not isinstance(messages, list):
+        return None
+    return sum(1 for message in messages if getattr(message, "type", None) == "human") or None
+
+
+def _unchanged_notice(file_path: str, turn: Optional[int]) -> str:
+    """文件与上次读取时相同的提示"""
+    since = f"turn {turn}" if turn is not None else "the last read"
+    return (
+        f"[Unchanged] {file_path} has not changed since {since}; "
+        "the content shown then is still current."
+    )
+
+
 @tool
 def write_file(file_path: str, content: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
     """
@@ -220,6 +626,7 @@ def write_file(file_path: str, content: str, runtime: ToolRuntime[SkillAgentCont
         path.parent.mkdir(parents=True, exist_ok=True)
 
         path.write_text(content, encoding="utf-8")
+        _invalidate_caches(runtime, path)
         return f"[Success] File written: {path}"
 
     except Exception as e:
@@ -240,10 +647,15 @@ def glob(pattern: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
         pattern: Glob pattern (e.g., "**/*.py", "src/**/*.ts", "*.md")
     """
     cwd = runtime.context.working_directory
+    snapshot = getattr(runtime.context, "tree_snapshot", None)
 
     try:
-        # 使用 Path.glob 进行匹配
-        matches = sorted(cwd.glob(pattern))
+        # 优先在快照中匹配（不包含被 .gitignore 忽略的路径），
+        # 模式指向被忽略的目录等情况使用 Path.glob
+        matches = snapshot.glob(pattern, cwd) if snapshot is not None else None
+        if matches is None:
+            # 使用 Path.glob 进行匹配
+            matches = sorted(cwd.glob(pattern))
 
         if not matches:
             return f"No files matching pattern: {pattern}"
@@ -253,6 +665,7 @@ def glob(pattern: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
         result_lines = []
 
         for path in matches[:max_results]:
+            path = cwd / path  # 快照返回相对 cwd 的路径
             try:
                 rel_path = path.relative_to(cwd)
                 result_lines.append(str(rel_path))
@@ -288,56 +701,41 @@ def grep(pattern: str, path: str, runtime: ToolRuntime[SkillAgentContext]) -> st
     search_path = resolve_path(path, cwd)
 
     try:
-        regex = re.compile(pattern)
+        matcher = Matcher(pattern)
     except re.error as e:
         return f"[FAILED] Invalid regex pattern: {e}"
 
-    results = []
-    max_results = 50
-    files_searched = 0
+    max_results = DEFAULT_MAX_RESULTS
 
     try:
+        index = getattr(runtime.context, "grep_index", None)
+        found = None
         if search_path.is_file():
-            files = [search_path]
-        else:
-            # 搜索所有文本文件，排除常见的二进制/隐藏目录
-            files = []
-            for p in search_path.rglob("*"):
-                if p.is_file():
-                    # 排除隐藏文件和常见的非代码目录
-                    parts = p.parts
-                    if any(part.startswith(".") or part in ("node_modules", "__pycache__", ".git", "venv", ".venv") for part in parts):
-                        continue
-                    files.append(p)
-
-        for file_path in files:
-            if len(results) >= max_results:
-                break
-
+            found = search_files(matcher, [search_path], max_results, parallel=False)
+        elif index is not None:
+            # 索引未就绪、目录不在索引范围内或模式无法筛选时返回 None
+            found = index.search(matcher, search_path, max_results)
+        if found is None:
+            # 遍历时跳过隐藏目录和 node_modules 等（有快照时还跳过 .gitignore 忽略的路径），
+            # 二进制文件不搜索
+            snapshot = getattr(runtime.context, "tree_snapshot", None)
+            keys = snapshot.files(search_path) if snapshot is not None else None
+            files = map(Path, keys) if keys is not None else iter_files(search_path)
+            found = search_files(matcher, files, max_results)
+
+        results = []
+        for file_path, line_num, line in found.matches:
             try:
-                content = file_path.read_text(encoding="utf-8", errors="ignore")
-                lines = content.split("\n")
-                files_searched += 1
-
-                for line_num, line in enumerate(lines, 1):
-                    if regex.search(line):
-                        try:
-                            rel_path = file_path.relative_to(cwd)
-                        except ValueError:
-                            rel_path = file_path
-                        results.append(f"{rel_path}:{line_num}: {line.strip()[:100]}")
-
-                        if len(results) >= max_results:
-                            break
-
-            except (UnicodeDecodeError, PermissionError, IsADirectoryError):
-                continue
+                rel_path = file_path.relative_to(cwd)
+            except ValueError:
+                rel_path = file_path
+            results.append(f"{rel_path}:{line_num}: {line.strip()[:100]}")
 
         if not results:
-            return f"No matches found for pattern: {pattern} (searched {files_searched} files)"
+            return f"No matches found for pattern: {pattern} (searched {found.files_searched} files)"
 
         output = "\n".join(results)
-        if len(results) >= max_results:
+        if found.truncated:
             output += f"\n... (truncated, showing first {max_results} matches)"
 
         return f"[OK]\n\n{output}"
@@ -392,6 +790,7 @@ def edit(
         # 执行替换
         new_content = content.replace(old_string, new_string, 1)
         path.write_text(new_content, encoding="utf-8")
+        _invalidate_caches(runtime, path)
 
         # 计算变化的行数
         old_lines = len(old_string.split("\n"))
@@ -427,22 +826,28 @@ def list_dir(path: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
         return f"[FAILED] Not a directory: {path}"
 
     try:
-        entries = sorted(dir_path.iterdir(), key=lambda p: (not p.is_dir(), p.name.lower()))
+        # 快照中的目录直接使用缓存的目录项；只 stat 显示出来的文件
+        snapshot = getattr(runtime.context, "tree_snapshot", None)
+        listed = snapshot.entries(dir_path) if snapshot is not None else None
+        if listed is None:
+            with os.scandir(dir_path) as it:
+                listed = [(entry.name, entry.is_dir()) for entry in it]
+        entries = sorted(listed, key=lambda item: (not item[1], item[0].lower()))
 
         result_lines = []
-        for entry in entries[:100]:  # 限制数量
-            if entry.is_dir():
-                result_lines.append(f"📁 {entry.name}/")
+        for name, is_dir in entries[:100]:  # 限制数量
+            if is_dir:
+                result_lines.append(f"📁 {name}/")
             else:
                 # 显示文件大小
-                size = entry.stat().st_size
+                size = (dir_path / name).stat().st_size
                 if size < 1024:
                     size_str = f"{size}B"
                 elif size < 1024 * 1024:
                     size_str = f"{size // 1024}KB"
                 else:
                     size_str = f"{size // (1024 * 1024)}MB"
-                result_lines.append(f"   {entry.name} ({size_str})")
+                result_lines.append(f"   {name} ({size_str})")
 
         if len(entries) > 100:
             result_lines.append(f"... and {len(entries) - 100} more entries")
@@ -455,4 +860,49 @@ def list_dir(path: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
         return f"[FAILED] {str(e)}"
 
 
-ALL_TOOLS = [load_skill, bash, read_file, write_file, glob, grep, edit, list_dir]
+# === 异步版本 ===
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_io_executor_lock = threading.Lock()
+
+
+def _get_io_executor() -> ThreadPoolExecutor:
+    """异步工具执行文件 I/O 的有界线程池（大小读取 SKILLS_ASYNC_WORKERS）"""
+    global _io_executor
+    with _io_executor_lock:
+        if _io_executor is None:
+            _io_executor = ThreadPoolExecutor(
+                max_workers=max(1, _env_int("SKILLS_ASYNC_WORKERS", DEFAULT_ASYNC_WORKERS)),
+                thread_name_prefix="tool-io",
+            )
+        return _io_executor
+
+
+def _register_offloaded(sync_tool: BaseTool) -> None:
+    """为同步工具注册异步版本：原函数在 I/O 线程池中执行"""
+    func: Callable[..., str] = sync_tool.func
+
+    @functools.wraps(func)
+    async def coroutine(*args, **kwargs) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_io_executor(), functools.partial(func, *args, **kwargs))
+
+    sync_tool.coroutine = coroutine
+
+
+load_skill.coroutine = _aload_skill
+bash.coroutine = _abash
+for _tool in (search_skills, search_references, read_file, write_file, glob, grep, edit, list_dir):
+    _register_offloaded(_tool)
+
+
+# === 并发声明（见 tool_concurrency.py）===
+
+# 只读工具可与其他调用并发；写文件的工具按路径串行；bash 未声明，同一对话内串行
+for _tool in (load_skill, search_skills, search_references, read_file, glob, grep, list_dir):
+    _tool.metadata = {**(_tool.metadata or {}), PARALLEL_SAFE: True}
+for _tool in (write_file, edit):
+    _tool.metadata = {**(_tool.metadata or {}), LOCK_PATH_ARG: "file_path"}
+
+
+ALL_TOOLS = [load_skill, search_skills, search_references, bash, read_file, write_file, glob, grep, edit, list_dir]
@@ -0,0 +1,469 @@
+"""
+工作目录树快照（glob / grep / list_dir 共用）
+
+原先 glob 每次 Path.glob 整棵树并对全部匹配排序，grep 每次重新遍历，list_dir
+逐个 stat 目录项，而且都不理会 .gitignore，node_modules、.venv 和构建产物在一次
+会话中被反复遍历。TreeSnapshot 遍历一次工作目录并保存每个目录的列表：
+
+- 忽略规则：隐藏文件和目录、SKIP_DIRS（与 file_search.iter_files 相同），以及
+  .gitignore。工作目录在 git 仓库中时，一次 `git ls-files --others --ignored
+  --exclude-standard --directory` 得到全部被忽略的路径（与 git 的语义一致，包括
+  .git/info/exclude、全局 excludesFile 和已跟踪的文件）；否则解析各级 .gitignore
+- 查询前只 stat 快照中的目录（不 stat 文件），重新列出 mtime 变化的目录；
+  目录在扫描前 RACY_WINDOW_NS 内被修改过时，同一 mtime 精度内可能还有没看到的
+  变化，下次查询时再列出一次（同 git 的 racy 检查）
+- .gitignore 新增或变化时重新建立快照
+
+快照中没有的目录（被忽略的目录、工作目录之外的路径）返回 None，由调用方回退到
+直接遍历，因此显式搜索 node_modules 下的文件仍然有效。
+
+使用示例：
+    snapshot = TreeSnapshot(Path.cwd())
+    files = snapshot.files(Path.cwd() / "src")    # 顺序与 iter_files 相同
+    matches = snapshot.glob("**/*.py", Path.cwd())
+    entries = snapshot.entries(Path.cwd())        # [(名称, 是否目录)]
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from .file_search import SKIP_DIRS
+
+
+# 扫描前该时间内被修改过的目录，下次查询时重新列出（纳秒）
+RACY_WINDOW_NS = 2_000_000_000
+
+# git ls-files 的超时（秒），超时后改为解析 .gitignore
+GIT_TIMEOUT = 10
+
+# glob 通配字符
+_GLOB_MAGIC = frozenset("*?[")
+
+
+@dataclass(frozen=True)
+class IgnoreRule:
+    """.gitignore 中的一条规则"""
+    base: str             # .gitignore 所在目录（相对根目录，"/" 分隔，根目录为 ""）
+    regex: re.Pattern     # 匹配相对 base 的路径
+    negate: bool          # ! 开头：重新包含
+    dir_only: bool        # / 结尾：只匹配目录
+
+    def matches(self, rel: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            rel = rel[len(self.base) + 1:]
+        return self.regex.fullmatch(rel) is not None
+
+
+def _translate_segment(segment: str) -> str:
+    """路径中的一级（* ? [...]，不匹配 /）转换为正则"""
+    out = []
+    i, n = 0, len(segment)
+    while i < n:
+        c = segment[i]
+        i += 1
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "\\" and i < n:
+            out.append(re.escape(segment[i]))
+            i += 1
+        elif c == "[":
+            j = i
+            if j < n and segment[j] in "!^":
+                j += 1
+            if j < n and segment[j] == "]":
+                j += 1
+            j = segment.find("]", j)
+            if j < 0:
+                out.append("\\[")
+                continue
+            body = segment[i:j]
+            i = j + 1
+            negate = body[:1] in ("!", "^")
+            if negate:
+                body = body[1:]
+            body = "".join(ch if ch == "-" else re.escape(ch) for ch in body)
+            out.append(f"[^/{body}]" if negate else f"[{body}]")
+        else:
+            out.append(re.escape(c))
+    return "".join(out)
+
+
+def _translate(segments: list[str]) -> str:
+    """按 / 分隔的模式转换为正则，单独的 ** 匹配任意多级目录"""
+    parts = []
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == "**":
+            parts.append(".*" if last else "(?:[^/]+/)*")
+        else:
+            parts.append(_translate_segment(segment) + ("" if last else "/"))
+    return "".join(parts)
+
+
+def parse_gitignore(text: str, base: str = "") -> list[IgnoreRule]:
+    """
+    解析 .gitignore
+
+    Args:
+        text: 文件内容
+        base: .gitignore 所在目录（相对根目录，"/" 分隔）
+
+    Returns:
+        规则列表（后面的规则优先）
+    """
+    rules = []
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        # 行尾未转义的空格不属于模式
+        stripped = line.rstrip(" ")
+        if stripped.endswith("\\") and len(stripped) < len(line):
+            stripped += " "
+        line = stripped
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # 包含 / 的模式相对 .gitignore 所在目录，否则匹配任意一级中的名称
+        anchored = "/" in line
+        body = _translate(line.lstrip("/").split("/"))
+        regex = re.compile(body if anchored else f"(?:.*/)?{body}", re.DOTALL)
+        rules.append(IgnoreRule(base, regex, negate, dir_only))
+    return rules
+
+
+def _stamp(path: str) -> Optional[tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+@dataclass
+class _Directory:
+    """快照中的一个目录"""
+    path: str                           # 绝对路径
+    stamp: int                          # 列出时目录的 mtime_ns
+    scanned: int                        # 开始列出的时间（time_ns）
+    entries: list[tuple[str, bool]]     # 全部目录项 [(名称, 是否目录)]，按名称排序
+    files: list[str]                    # 未被忽略的文件
+    subdirs: list[str]                  # 未被忽略的子目录（不含目录的符号链接）
+    rules: tuple[IgnoreRule, ...]       # 从上级目录继承的 .gitignore 规则
+
+
+class TreeSnapshot:
+    """
+    工作目录树快照
+
+    目录以相对根目录、"/" 分隔的路径为 key（根目录为 ""）。所有查询都先检查
+    相关目录的 mtime，因此总是反映文件系统的当前状态。
+    """
+
+    def __init__(self, root: Path, use_git: Optional[bool] = None):
+        """
+        Args:
+            root: 根目录（通常是工作目录）
+            use_git: 是否用 git ls-files 获取被忽略的路径，默认在安装了 git 时使用
+        """
+        self.root = Path(root)
+        self.use_git = shutil.which("git") is not None if use_git is None else use_git
+        # 列出目录的次数
+        self.scans = 0
+
+        self._root_path = str(self.root)
+        self._dirs: dict[str, _Directory] = {}
+        self._gitignores: dict[str, Optional[tuple[int, int]]] = {}
+        self._git = False
+        self._git_ignored: set[str] = set()
+        self._built = False
+        self._rebuild = False
+        self._lock = threading.Lock()
+
+    @property
+    def git(self) -> bool:
+        """当前快照是否使用 git 的忽略列表"""
+        return self._git
+
+    # === 查询 ===
+
+    def files(self, base: Path, directories: Optional[list[str]] = None) -> Optional[list[str]]:
+        """
+        base 下未被忽略的文件，顺序与 file_search.iter_files 相同
+
+        Args:
+            base: 目录
+            directories: 不为 None 时，遍历到的目录（包括 base）追加到该列表
+
+        Returns:
+            文件的绝对路径；base 不是快照中的目录时返回 None
+        """
+        key = self._key(base)
+        if key is None:
+            return None
+        with self._lock:
+            self._refresh(key)
+            if key not in self._dirs:
+                return None
+            result = []
+            stack = [key]
+            while stack:
+                current = stack.pop()
+                directory = self._dirs[current]
+                if directories is not None:
+                    directories.append(directory.path)
+                result.extend(os.path.join(directory.path, name) for name in directory.files)
+                stack.extend(self._child(current, name) for name in reversed(directory.subdirs))
+            return result
+
+    def entries(self, directory: Path) -> Optional[list[tuple[str, bool]]]:
+        """
+        目录的全部目录项（包括隐藏和被忽略的）
+
+        Returns:
+            [(名称, 是否目录)]，按名称排序；目录不在快照中时返回 None
+        """
+        key = self._key(directory)
+        if key is None:
+            return None
+        with self._lock:
+            self._refresh(key, subtree=False)
+            node = self._dirs.get(key)
+            return list(node.entries) if node is not None else None
+
+    def glob(self, pattern: str, directory: Path) -> Optional[list[str]]:
+        """
+        在快照中匹配 glob 模式（语义同 Path.glob，但不包含被忽略的路径）
+
+        Args:
+            pattern: glob 模式，如 "**/*.py"
+            directory: 模式相对的目录
+
+        Returns:
+            匹配的路径（相对 directory，"/" 分隔），按路径排序；模式指向隐藏或
+            被忽略的路径、不含通配符或以 ** 结尾时返回 None（调用方使用 Path.glob）
+        """
+        segments = pattern.split("/")
+        if (
+            not any(c in _GLOB_MAGIC for c in pattern)
+            or "\\" in pattern
+            or os.path.isabs(pattern)
+            or segments[-1] in ("", "**")
+            or any(not segment or segment.startswith(".") for segment in segments)
+        ):
+            return None
+        key = self._key(directory)
+        if key is None:
+            return None
+
+        # 开头不含通配符的部分直接定位到目录
+        literal = 0
+        while not any(c in _GLOB_MAGIC for c in segments[literal]):
+            literal += 1
+        for segment in segments[:literal]:
+            key = self._child(key, segment)
+        prefix = "/".join(segments[:literal])
+        rest = segments[literal:]
+        regex = re.compile(_translate(rest), re.DOTALL)
+        depth_limit = None if "**" in rest else len(rest)
+
+        with self._lock:
+            self._refresh(key)
+            if key not in self._dirs:
+                return None
+            matched = []
+            stack = [(key, "", 1)]
+            while stack:
+                current, rel, depth = stack.pop()
+                node = self._dirs[current]
+                descend = depth_limit is None or depth < depth_limit
+                for name in node.files + node.subdirs:
+                    path = rel + name
+                    if (depth_limit is None or depth == depth_limit) and regex.fullmatch(path):
+                        matched.append(f"{prefix}/{path}" if prefix else path)
+                if descend:
+                    stack.extend((self._child(current, name), f"{rel}{name}/", depth + 1) for name in node.subdirs)
+        return sorted(matched, key=lambda path: path.split("/"))
+
+    # === 内部 ===
+
+    def _key(self, path: Path) -> Optional[str]:
+        try:
+            parts = Path(path).relative_to(self.root).parts
+        except ValueError:
+            return None
+        if ".." in parts:
+            return None
+        return "/".join(parts)
+
+    @staticmethod
+    def _child(key: str, name: str) -> str:
+        return f"{key}/{name}" if key else name
+
+    def _refresh(self, key: str, subtree: bool = True) -> None:
+        """检查 key 及其上级目录（subtree 为 True 时还有下级目录）的 mtime，重新列出变化的目录"""
+        if not self._built or self._gitignores_changed():
+            self._build()
+            return
+
+        ancestors = {""}
+        parts = key.split("/") if key else []
+        for i in range(1, len(parts) + 1):
+            ancestors.add("/".join(parts[:i]))
+        prefix = key + "/"
+        changed = [
+            current for current, node in self._dirs.items()
+            if (current in ancestors or (subtree and (not key or current.startswith(prefix))))
+            and self._changed(node)
+        ]
+        if not changed:
+            return
+        if self._git and not self._load_git_ignored():
+            self._build()
+            return
+        # 先列出上级目录：被删除的子目录不必再检查
+        for current in sorted(changed, key=lambda k: k.count("/") + 1 if k else 0):
+            node = self._dirs.get(current)
+            if node is not None:
+                self._scan(current, node.rules)
+        if self._rebuild:
+            self._build()
+
+    @staticmethod
+    def _changed(node: _Directory) -> bool:
+        try:
+            stamp = os.stat(node.path).st_mtime_ns
+        except OSError:
+            return True
+        return stamp != node.stamp or stamp >= node.scanned - RACY_WINDOW_NS
+
+    def _gitignores_changed(self) -> bool:
+        return any(
+            _stamp(os.path.join(self._root_path, *rel.split("/"))) != stamp
+            for rel, stamp in self._gitignores.items()
+        )
+
+    def _build(self) -> None:
+        """重新建立整个快照"""
+        self._dirs = {}
+        self._gitignores = {}
+        self._rebuild = False
+        self._git = self.use_git and self._load_git_ignored()
+        if not self._git:
+            self._git_ignored = set()
+        self._built = False
+        self._scan("", ())
+        self._built = True
+
+    def _load_git_ignored(self) -> bool:
+        """
+        用 git 列出被忽略的路径（完全被忽略的目录只列出目录本身）
+
+        Returns:
+            根目录不在 git 仓库中或 git 执行失败时返回 False
+        """
+        try:
+            completed = subprocess.run(
+                ["git", "ls-files", "-z", "--others", "--ignored", "--exclude-standard", "--directory"],
+                cwd=self._root_path,
+                capture_output=True,
+                timeout=GIT_TIMEOUT,
+            )
+        except (OSError, subprocess.SubprocessError):
+            return False
+        if completed.returncode != 0:
+            return False
+        self._git_ignored = {
+            os.fsdecode(path).rstrip("/") for path in completed.stdout.split(b"\0") if path
+        }
+        return True
+
+    def _ignored(self, rel: str, is_dir: bool, rules: tuple[IgnoreRule, ...]) -> bool:
+        if self._git:
+            return rel in self._git_ignored
+        for rule in reversed(rules):
+            if rule.matches(rel, is_dir):
+                return not rule.negate
+        return False
+
+    def _scan(self, key: str, inherited: tuple[IgnoreRule, ...]) -> None:
+        """列出目录，新出现的子目录递归列出，消失的子目录从快照中删除"""
+        stack = [(key, inherited)]
+        while stack:
+            key, inherited = stack.pop()
+            path = os.path.join(self._root_path, *key.split("/")) if key else self._root_path
+            scanned = time.time_ns()
+            try:
+                stamp = os.stat(path).st_mtime_ns
+                with os.scandir(path) as it:
+                    listed = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                self._drop(key)
+                continue
+            self.scans += 1
+
+            rules = inherited
+            if any(entry.name == ".gitignore" for entry in listed):
+                rel = self._child(key, ".gitignore")
+                gitignore = os.path.join(path, ".gitignore")
+                stamp_now = _stamp(gitignore)
+                if self._built and self._gitignores.get(rel) != stamp_now:
+                    self._rebuild = True
+                self._gitignores[rel] = stamp_now
+                if not self._git:
+                    try:
+                        with open(gitignore, encoding="utf-8", errors="replace") as f:
+                            rules = inherited + tuple(parse_gitignore(f.read(), key))
+                    except OSError:
+                        pass
+
+            entries, files, subdirs = [], [], []
+            for entry in listed:
+                name = entry.name
+                try:
+                    is_dir = entry.is_dir()
+                    real_dir = is_dir and not entry.is_symlink()
+                    is_file = not is_dir and entry.is_file()
+                except OSError:
+                    continue
+                entries.append((name, is_dir))
+                if name.startswith(".") or name in SKIP_DIRS:
+                    continue
+                if self._ignored(self._child(key, name), real_dir, rules):
+                    continue
+                if real_dir:
+                    subdirs.append(name)
+                elif is_file:
+                    files.append(name)
+
+            old = self._dirs.get(key)
+            self._dirs[key] = _Directory(path, stamp, scanned, entries, files, subdirs, inherited)
+            if old is not None:
+                for name in set(old.subdirs) - set(subdirs):
+                    self._drop(self._child(key, name))
+            for name in reversed(subdirs):
+                child = self._child(key, name)
+                if child not in self._dirs:
+                    stack.append((child, rules))
+
+    def _drop(self, key: str) -> None:
+        """从快照中删除目录及其子目录"""
+        prefix = key + "/" if key else ""
+        for current in [k for k in self._dirs if k == key or k.startswith(prefix)]:
+            del self._dirs[current]
+        for rel in [r for r in self._gitignores if r.startswith(prefix)]:
+            del self._gitignores[rel]
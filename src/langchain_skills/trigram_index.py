@@ -0,0 +1,523 @@
+"""
+grep 的三元组（trigram）索引
+
+Agent 在一次会话中会对同一个工作目录执行几十次 grep。TrigramIndex 为工作目录
+下的文本文件建立倒排索引（三字节子串 -> 包含它的文件），grep 先从正则中提取
+匹配行必须包含的字面量，用索引筛选候选文件，只搜索候选文件：
+
+- 后台线程建立索引，建立完成前 grep 照常全量搜索
+- 按 (mtime_ns, size) 增量更新，只重新读取变化的文件
+- Linux 上通过 inotify 感知变化：查询时非阻塞检查事件队列，没有事件时不需要
+  遍历目录；inotify 不可用时每次查询前遍历并 stat（仍然不必读取文件内容）
+- write_file / edit 通知索引重新读取该文件，bash 之后下次查询前重新检查
+- 可选持久化到 SKILLS_GREP_INDEX_DIR，下次启动只需重新读取变化的文件
+
+索引与全量搜索的结果一致：
+
+- 遍历规则与 file_search.iter_files 相同（传入 TreeSnapshot 时与快照相同，
+  即同时遵循 .gitignore），候选文件按遍历顺序返回
+- 索引小写化（仅 ASCII）后的字节；(?i) 模式中可能与非 ASCII 字符互相匹配的
+  字母（如 k 与开尔文符号）不参与筛选
+- 超过 MAX_INDEX_FILE_BYTES 或不是合法 UTF-8 的文件不建索引，总是作为候选
+- 无法从模式中提取至少 3 字节字面量时（如 \\w+）不使用索引
+
+使用示例：
+    index = TrigramIndex(Path.cwd()).start()
+    result = index.search(Matcher("def main"), Path.cwd())
+    if result is None:  # 索引未就绪或模式无法筛选
+        result = search("def main", Path.cwd())
+"""
+
+import hashlib
+import marshal
+import os
+import re
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Union
+
+from .file_search import BINARY_SNIFF_BYTES, DEFAULT_MAX_RESULTS, Matcher, SearchResult, iter_files, search_files
+from .skill_watcher import _Inotify, inotify_available
+from .tree_snapshot import TreeSnapshot
+
+try:
+    from re import _parser as _sre_parse
+except ImportError:  # pragma: no cover
+    import sre_parse as _sre_parse
+
+
+INDEX_VERSION = 1
+
+# 超过该大小的文件不建索引（总是作为候选文件搜索）
+MAX_INDEX_FILE_BYTES = 1024 * 1024
+
+# 持久化后再次写入的最短间隔（秒）
+SAVE_INTERVAL = 60.0
+
+# 持久化目录的环境变量
+INDEX_DIR_ENV = "SKILLS_GREP_INDEX_DIR"
+
+# (?i) 时可能与非 ASCII 字符互相匹配的字母（ı / ſ / 开尔文符号）
+_UNSAFE_IGNORECASE = frozenset("iksIKS")
+
+_REPEATS = {_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT}
+if hasattr(_sre_parse, "POSSESSIVE_REPEAT"):
+    _REPEATS.add(_sre_parse.POSSESSIVE_REPEAT)
+
+# 查询计划：字面量（小写字节）、("and", [...]) 或 ("or", [...])
+Plan = Union[bytes, tuple]
+
+
+def default_index_dir() -> Optional[Path]:
+    """从环境变量读取持久化目录，未配置时返回 None（仅内存索引）"""
+    raw = os.getenv(INDEX_DIR_ENV)
+    if not raw:
+        return None
+    return Path(raw).expanduser()
+
+
+def plan_query(pattern: str) -> Optional[Plan]:
+    """
+    提取匹配行必须包含的字面量
+
+    Args:
+        pattern: 正则表达式
+
+    Returns:
+        查询计划；无法用索引筛选时返回 None
+    """
+    try:
+        parsed = _sre_parse.parse(pattern)
+    except Exception:
+        return None
+    return _plan_sequence(list(parsed), bool(parsed.state.flags & re.IGNORECASE))
+
+
+def _plan_sequence(items: list, ignorecase: bool) -> Optional[Plan]:
+    """顺序排列的节点：连续的字面量合并为一个字符串，各部分之间是 and"""
+    parts: list[Plan] = []
+    run: list[str] = []
+
+    def flush() -> None:
+        literal = "".join(run).encode("utf-8").lower()
+        if len(literal) >= 3:
+            parts.append(literal)
+        run.clear()
+
+    for op, av in items:
+        if op is _sre_parse.LITERAL and not (ignorecase and (av > 127 or chr(av) in _UNSAFE_IGNORECASE)):
+            run.append(chr(av))
+            continue
+        flush()
+
+        sub: Optional[Plan] = None
+        if op is _sre_parse.SUBPATTERN:
+            _, add_flags, del_flags, pattern = av
+            # 组内单独设置的标志（如 (?i:...)）改变匹配语义，不参与筛选
+            if not add_flags and not del_flags:
+                sub = _plan_sequence(list(pattern), ignorecase)
+        elif op in _REPEATS:
+            minimum, _, pattern = av
+            if minimum >= 1:
+                sub = _plan_sequence(list(pattern), ignorecase)
+        elif op is _sre_parse.BRANCH:
+            alternatives = [_plan_sequence(list(branch), ignorecase) for branch in av[1]]
+            if all(alternative is not None for alternative in alternatives):
+                sub = ("or", alternatives)
+        elif getattr(_sre_parse, "ATOMIC_GROUP", None) is op:
+            sub = _plan_sequence(list(av), ignorecase)
+        if sub is not None:
+            parts.append(sub)
+    flush()
+
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else ("and", parts)
+
+
+@dataclass
+class _FileEntry:
+    """索引中的一个文件"""
+    stamp: tuple[int, int]      # (mtime_ns, size)
+    fid: Optional[int] = None   # 倒排表中的文件 ID，None 表示没有建索引（总是候选）
+    binary: bool = False        # 二进制文件（grep 不搜索）
+
+
+class TrigramIndex:
+    """
+    工作目录的三元组倒排索引
+
+    倒排表为 trigram -> array('I')（文件 ID）。文件变化后分配新的 ID，旧 ID 留在
+    倒排表中作废，作废的 ID 多于有效 ID 时压缩。
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        cache_dir: Optional[Path] = None,
+        use_inotify: Optional[bool] = None,
+        snapshot: Optional[TreeSnapshot] = None,
+    ):
+        """
+        Args:
+            root: 建立索引的目录（通常是工作目录）
+            cache_dir: 持久化目录，None 表示只在内存中维护索引
+            use_inotify: 是否使用 inotify 感知变化，默认自动检测
+            snapshot: 与 glob / list_dir 共用的目录树快照，None 时自行遍历
+        """
+        self.root = Path(root)
+        self.cache_dir = cache_dir
+        self.snapshot = snapshot
+        self.use_inotify = inotify_available() if use_inotify is None else use_inotify
+        # 建立 / 更新索引时读取的文件数
+        self.files_read = 0
+
+        self._files: dict[str, _FileEntry] = {}
+        self._order: list[str] = []
+        self._directories: set[str] = set()
+        self._postings: dict[bytes, array] = {}
+        self._next_fid = 0
+        self._live = 0
+
+        self._inotify: Optional[_Inotify] = None
+        self._watches: dict[str, int] = {}
+        self._stale = True
+        self._forced: set[str] = set()
+        self._pending_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_save = 0.0
+
+    @property
+    def cache_path(self) -> Optional[Path]:
+        """持久化文件路径（按根目录区分）"""
+        if self.cache_dir is None:
+            return None
+        digest = hashlib.sha1(str(self.root.resolve()).encode("utf-8")).hexdigest()[:16]
+        return self.cache_dir / f"trigram-{digest}.idx"
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    # === 生命周期 ===
+
+    def start(self) -> "TrigramIndex":
+        """在后台线程中建立索引"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.build, name="grep-index", daemon=True)
+            self._thread.start()
+        return self
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """等待索引建立完成"""
+        return self._ready.wait(timeout)
+
+    def build(self) -> None:
+        """加载持久化的索引（如果有），增量更新后标记为就绪"""
+        try:
+            with self._lock:
+                if self.use_inotify:
+                    try:
+                        self._inotify = _Inotify()
+                    except OSError:
+                        self._inotify = None
+                self._load()
+                self._refresh_locked()
+                if self._stale:
+                    # 添加监听之前的变化在这里补上，第一次查询不必再遍历
+                    self._refresh_locked()
+            self._ready.set()
+            self.save()
+        except Exception:
+            # 索引只是加速手段，建立失败时 grep 继续全量搜索
+            return
+
+    def close(self) -> None:
+        """停止监听"""
+        with self._lock:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+            self._watches = {}
+
+    # === 变化通知 ===
+
+    def invalidate(self, path: Path) -> None:
+        """文件被修改：下次查询前重新读取（不依赖 mtime 精度）"""
+        with self._pending_lock:
+            self._forced.add(str(path))
+            self._stale = True
+
+    def mark_stale(self) -> None:
+        """工作目录可能有任意变化（如 bash 命令之后）：下次查询前重新检查"""
+        self._stale = True
+
+    # === 查询 ===
+
+    def search(
+        self,
+        matcher: Matcher,
+        root: Path,
+        max_results: int = DEFAULT_MAX_RESULTS,
+    ) -> Optional[SearchResult]:
+        """
+        用索引筛选候选文件后搜索
+
+        Args:
+            matcher: 搜索模式
+            root: 搜索的目录（必须是索引遍历到的目录）
+            max_results: 达到该匹配数后停止
+
+        Returns:
+            SearchResult（files_searched 包含被索引排除的文本文件）；
+            索引未就绪、目录不在索引范围内或模式无法筛选时返回 None
+        """
+        if not self._ready.is_set():
+            return None
+        plan = plan_query(matcher.pattern)
+        if plan is None:
+            return None
+
+        with self._lock:
+            if self._needs_refresh():
+                self._refresh_locked()
+            root_key = str(root)
+            if root_key not in self._directories:
+                return None
+
+            matched = self._evaluate(plan)
+            if matched is None:
+                return None
+            prefix = None if root_key == str(self.root) else root_key + os.sep
+            candidates = []
+            excluded = 0
+            for key in self._order:
+                if prefix is not None and not key.startswith(prefix):
+                    continue
+                entry = self._files[key]
+                if entry.binary:
+                    continue
+                if entry.fid is None or entry.fid in matched:
+                    candidates.append(key)
+                else:
+                    excluded += 1
+
+        # 按需创建 Path：匹配很多时搜索很快停止，不必为全部候选文件创建对象
+        result = search_files(matcher, map(Path, candidates), max_results)
+        result.files_searched += excluded
+        if time.monotonic() - self._last_save > SAVE_INTERVAL:
+            self.save()
+        return result
+
+    def _evaluate(self, plan: Plan) -> Optional[set[int]]:
+        """计算查询计划匹配的文件 ID，None 表示不限制"""
+        if isinstance(plan, bytes):
+            grams = {plan[i:i + 3] for i in range(len(plan) - 2)}
+            postings = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+            matched = set(postings[0])
+            for posting in postings[1:]:
+                if not matched:
+                    break
+                matched.intersection_update(posting)
+            return matched
+
+        kind, children = plan
+        results = [self._evaluate(child) for child in children]
+        if kind == "or":
+            if any(result is None for result in results):
+                return None
+            return set().union(*results)
+        constrained = [result for result in results if result is not None]
+        if not constrained:
+            return None
+        return set.intersection(*constrained)
+
+    # === 更新 ===
+
+    def _needs_refresh(self) -> bool:
+        """是否需要在查询前重新检查文件"""
+        if self._stale or self._inotify is None:
+            return True
+        # 写入文件的系统调用返回前事件已进入队列，非阻塞检查即可
+        return self._inotify.wait(0)
+
+    def _refresh_locked(self) -> None:
+        """遍历目录，重新读取新增和变化的文件，删除已不存在的文件"""
+        with self._pending_lock:
+            forced, self._forced = self._forced, set()
+            self._stale = False
+
+        directories: list = []
+        keys = self.snapshot.files(self.root, directories) if self.snapshot is not None else None
+        if keys is None:
+            keys = map(str, iter_files(self.root, directories))
+        order = []
+        for key in keys:
+            try:
+                st = os.stat(key)
+            except OSError:
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+            entry = self._files.get(key)
+            if entry is None or entry.stamp != stamp or key in forced:
+                self._index_file(key, Path(key), stamp)
+            order.append(key)
+
+        for key in self._files.keys() - set(order):
+            self._drop(self._files.pop(key))
+
+        self._order = order
+        self._directories = {str(directory) for directory in directories}
+        if self._next_fid - self._live > max(self._live, 1024):
+            self._compact()
+        self._sync_watches()
+
+    def _sync_watches(self) -> None:
+        """
+        为遍历到的目录添加监听
+
+        目录被删除后内核自动移除监听，同名目录重建后需要重新添加，因此每次都对
+        所有目录调用 inotify_add_watch（已监听时返回原描述符）。添加失败（如超出
+        max_user_watches）时改为每次查询前检查。
+        """
+        if self._inotify is None:
+            return
+        watches = {}
+        added = False
+        for directory in self._directories:
+            wd = self._inotify.watch(Path(directory))
+            if wd < 0:
+                self._inotify.close()
+                self._inotify = None
+                self._watches = {}
+                return
+            added = added or self._watches.get(directory) != wd
+            watches[directory] = wd
+        self._watches = watches
+        if added:
+            # 遍历到添加监听之间新目录中可能已有变化
+            self._stale = True
+
+    def _index_file(self, key: str, path: Path, stamp: tuple[int, int]) -> None:
+        """读取文件并更新倒排表"""
+        old = self._files.get(key)
+        if old is not None:
+            self._drop(old)
+
+        entry = _FileEntry(stamp)
+        self._files[key] = entry
+        if stamp[1] > MAX_INDEX_FILE_BYTES:
+            return
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return
+        self.files_read += 1
+        if b"\0" in data[:BINARY_SNIFF_BYTES]:
+            entry.binary = True
+            return
+        try:
+            data.decode("utf-8")
+        except UnicodeDecodeError:
+            # grep 按 errors="ignore" 解码，删除非法字节后的内容不在字节索引中
+            return
+
+        data = data.lower()
+        fid = self._next_fid
+        self._next_fid += 1
+        self._live += 1
+        entry.fid = fid
+        postings = self._postings
+        for gram in {data[i:i + 3] for i in range(len(data) - 2)}:
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array("I")
+            posting.append(fid)
+
+    def _drop(self, entry: _FileEntry) -> None:
+        """作废文件的 ID（倒排表中的旧 ID 在压缩时删除）"""
+        if entry.fid is not None:
+            entry.fid = None
+            self._live -= 1
+
+    def _compact(self) -> None:
+        """删除倒排表中作废的 ID，并把有效 ID 重新编号为连续的整数"""
+        remap = {}
+        for entry in self._files.values():
+            if entry.fid is not None:
+                remap[entry.fid] = entry.fid = len(remap)
+        postings = {}
+        for gram, posting in self._postings.items():
+            kept = array("I", (remap[fid] for fid in posting if fid in remap))
+            if kept:
+                postings[gram] = kept
+        self._postings = postings
+        self._next_fid = self._live = len(remap)
+
+    # === 持久化 ===
+
+    def _load(self) -> None:
+        """从持久化文件加载，缺失、损坏或版本不一致时从空索引开始"""
+        path = self.cache_path
+        if path is None:
+            return
+        try:
+            data = marshal.loads(path.read_bytes())
+        except (OSError, EOFError, ValueError, TypeError):
+            return
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION or data.get("root") != str(self.root):
+            return
+
+        try:
+            files = {}
+            live = 0
+            for key, (mtime_ns, size, fid, binary) in data["files"].items():
+                files[key] = _FileEntry((mtime_ns, size), None if fid < 0 else fid, binary)
+                live += fid >= 0
+            postings = {}
+            for gram, raw in data["postings"].items():
+                posting = array("I")
+                posting.frombytes(raw)
+                postings[gram] = posting
+        except (KeyError, TypeError, ValueError):
+            return
+        self._files = files
+        self._postings = postings
+        self._next_fid = self._live = live
+
+    def save(self) -> None:
+        """
+        写入持久化文件（压缩后写入临时文件再 os.replace）
+
+        marshal 格式与 Python 版本相关，版本变化后读取失败时重新建立索引。
+        """
+        path = self.cache_path
+        if path is None or not self._ready.is_set():
+            return
+        with self._lock:
+            self._last_save = time.monotonic()
+            if self._next_fid != self._live:
+                self._compact()
+            data = {
+                "version": INDEX_VERSION,
+                "root": str(self.root),
+                "files": {
+                    key: (entry.stamp[0], entry.stamp[1], -1 if entry.fid is None else entry.fid, entry.binary)
+                    for key, entry in self._files.items()
+                },
+                "postings": {gram: posting.tobytes() for gram, posting in self._postings.items()},
+            }
+            payload = marshal.dumps(data)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            # 索引只是加速手段，写入失败不影响搜索结果
+            return
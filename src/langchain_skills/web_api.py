@@ -11,12 +11,15 @@ import json
 import logging
 import os
 import sys
-from collections.abc import Callable, Iterator
+import threading
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager
 from typing import Any, Protocol
 
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 
 from .agent import LangChainSkillsAgent, check_api_credentials
 
@@ -42,6 +45,8 @@ class AgentLike(Protocol):
 
 _AGENT_SINGLETON: LangChainSkillsAgent | None = None
 
+logger = logging.getLogger(__name__)
+
 
 def _to_sse_frame(event_type: str, payload: dict[str, Any]) -> str:
     """Encode one SSE frame."""
@@ -66,17 +71,40 @@ def _default_agent_provider() -> LangChainSkillsAgent:
     global _AGENT_SINGLETON
     if _AGENT_SINGLETON is None:
         _AGENT_SINGLETON = LangChainSkillsAgent()
+        # Keep skills current without rescanning on the request path.
+        if os.getenv("SKILLS_WATCH", "").lower() in ("1", "true", "yes"):
+            _AGENT_SINGLETON.watch_skills()
     return _AGENT_SINGLETON
 
 
+def _warm_up_agent(provider: Callable[[], AgentLike]) -> None:
+    """Build the agent and prime the provider prompt cache (runs in background)."""
+    try:
+        agent = provider()
+        warm_up = getattr(agent, "warm_up", None)
+        if warm_up is not None:
+            usage = warm_up()
+            logger.info("Prompt cache warmed up: %s", usage)
+    except Exception as exc:
+        logger.warning("Prompt cache warm-up failed: %s", exc)
+
+
 def create_app(agent_provider: Callable[[], AgentLike] | None = None) -> FastAPI:
     """Create FastAPI app with injectable agent provider (for tests)."""
     provider = agent_provider or _default_agent_provider
 
+    @asynccontextmanager
+    async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+        # Warm the prompt cache at startup so the first chat turn is a cache read.
+        if os.getenv("SKILLS_PROMPT_CACHE", "").lower() in ("1", "true", "yes"):
+            threading.Thread(target=_warm_up_agent, args=(provider,), daemon=True).start()
+        yield
+
     app = FastAPI(
         title="LangChain Skills Agent Web API",
         version="0.1.0",
         description="SSE bridge for stream_events()",
+        lifespan=lifespan,
     )
 
     app.add_middleware(
@@ -109,17 +137,24 @@ def create_app(agent_provider: Callable[[], AgentLike] | None = None) -> FastAPI
         message: str = Query(..., min_length=1),
         thread_id: str = Query("default", min_length=1),
     ) -> StreamingResponse:
-        def event_stream() -> Iterator[str]:
+        async def event_stream() -> AsyncIterator[str]:
             error_emitted = False
             try:
-                agent = provider()
+                agent = await run_in_threadpool(provider)
             except Exception as exc:  # pragma: no cover - defensive path
                 payload = {"type": "error", "message": f"Failed to initialize agent: {exc}"}
                 yield _to_sse_frame("error", payload)
                 return
 
+            # Prefer the native async stream so tool calls don't each hold a worker thread.
+            astream_events = getattr(agent, "astream_events", None)
+            if astream_events is not None:
+                events = astream_events(message, thread_id=thread_id)
+            else:
+                events = iterate_in_threadpool(agent.stream_events(message, thread_id=thread_id))
+
             try:
-                for event in agent.stream_events(message, thread_id=thread_id):
+                async for event in events:
                     event_type = str(event.get("type", "message"))
                     if event_type == "error":
                         error_emitted = True
@@ -0,0 +1,80 @@
+"""
+Agent 模块单元测试
+
+使用记录请求的假模型，测试 prompt cache 预热与实际请求的前缀一致。
+"""
+
+from pathlib import Path
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from langchain_skills.agent import LangChainSkillsAgent
+
+
+class RecordingModel(BaseChatModel):
+    """记录每次请求的消息，固定回复 "ok" """
+
+    calls: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls.append(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+
+def write_skill(base: Path, name: str, description: str) -> None:
+    """在 base 下创建一个 skill 目录"""
+    skill_dir = base / name
+    skill_dir.mkdir(parents=True)
+    (skill_dir / "SKILL.md").write_text(
+        f"---\nname: {name}\ndescription: {description}\n---\n# {name}\n", encoding="utf-8"
+    )
+
+
+def cached_prefix(message: SystemMessage) -> list[dict]:
+    """system message 中到第一个缓存断点为止的 content blocks"""
+    for i, block in enumerate(message.content):
+        if "cache_control" in block:
+            return message.content[:i + 1]
+    return []
+
+
+class TestWarmUp:
+    """测试 warm_up 预热的前缀与实际请求一致"""
+
+    @pytest.mark.parametrize("top_k", [1, 0])
+    def test_warmed_prefix_matches_first_request(self, tmp_path, monkeypatch, top_k):
+        skills = tmp_path / "skills"
+        write_skill(skills, "wechat-article", "提取微信公众号文章内容")
+        write_skill(skills, "slides-generator", "Generate presentation slides")
+        write_skill(skills, "pdf-summarizer", "Summarize PDF papers")
+        model = RecordingModel(calls=[])
+        monkeypatch.setattr(LangChainSkillsAgent, "_create_model", lambda self, **kwargs: model)
+
+        agent = LangChainSkillsAgent(
+            skill_paths=[skills], working_directory=tmp_path, prompt_caching=True, skill_top_k=top_k,
+            grep_index=False, tree_snapshot=False,
+        )
+        agent.warm_up()
+        agent.invoke("帮我提取这篇公众号文章", thread_id="t1")
+
+        warmed, request = model.calls[0][0], model.calls[1][0]
+        assert isinstance(warmed, SystemMessage) and isinstance(request, SystemMessage)
+        prefix = [block["text"] for block in cached_prefix(warmed)]
+        assert prefix
+        # 缓存按内容匹配：实际请求的 system prompt 以预热的内容开头
+        assert [block["text"] for block in request.content[:len(prefix)]] == prefix
+        if top_k:
+            # Skills 按请求挑选：只预热基础 prompt，实际请求在同一位置设置断点，其后注入相关的 Skills
+            assert len(prefix) == 1
+            assert request.content[0]["cache_control"] == {"type": "ephemeral"}
+            assert "wechat-article" in request.content[-1]["text"]
@@ -4,8 +4,14 @@ CLI 模块单元测试
 测试 StreamState 和相关显示函数。
 """
 
+import subprocess
+import sys
+
 import pytest
-from langchain_skills.cli import StreamState, format_tool_result, format_tool_args
+from langchain_skills.cli import (
+    StreamState, format_tool_result, format_tool_args, format_tool_progress, pair_tool_results,
+)
+from langchain_skills.stream import DisplayLimits
 
 
 class TestStreamState:
@@ -72,6 +78,20 @@ class TestStreamState:
         assert "[OK]" in state.tool_results[0]["content"]
         assert state.is_processing is True  # 工具执行后等待处理
 
+    def test_results_pair_with_calls_by_id(self):
+        """并行工具调用的结果按完成顺序到达，按 id 配对"""
+        state = StreamState()
+        for tool_id in ("t1", "t2", "t3"):
+            state.handle_event({"type": "tool_call", "id": tool_id, "name": "read_file", "args": {}})
+        state.handle_event({"type": "tool_result", "id": "t3", "name": "read_file", "content": "third"})
+        state.handle_event({"type": "tool_result", "name": "read_file", "content": "no id"})
+
+        paired = pair_tool_results(state.tool_calls, state.tool_results)
+
+        assert paired[2]["content"] == "third"
+        assert paired[0]["content"] == "no id"
+        assert paired[1] is None
+
     def test_handle_done_event(self):
         state = StreamState()
         # 没有 response_text 时，从 done 事件获取
@@ -111,6 +131,22 @@ class TestStreamState:
 
         assert state.response_text == "Hello World"
 
+    def test_tool_progress_keeps_latest_output(self):
+        """测试 tool_progress 按 tool_id 累积，只保留最新部分"""
+        state = StreamState()
+        state.handle_event({"type": "tool_call", "id": "t1", "name": "bash", "args": {}})
+        state.handle_event({"type": "tool_progress", "id": "t1", "name": "bash", "content": "a\n"})
+        state.handle_event({"type": "tool_progress", "id": "t1", "name": "bash", "content": "x" * 5000})
+
+        output = state.get_display_args()["tool_progress"]["t1"]
+        assert len(output) == DisplayLimits.TOOL_PROGRESS_TAIL
+        assert output.endswith("x")
+
+    def test_format_tool_progress_shows_tail(self):
+        elements = format_tool_progress("1\n2\n3\n4\n5\n6\n7\n10%\r50%\r", max_lines=3)
+
+        assert [e.plain for e in elements] == ["  └ 6", "    7", "    50%"]
+
     def test_get_display_args(self):
         state = StreamState()
         state.thinking_text = "thinking"
@@ -173,3 +209,30 @@ class TestFormatFunctions:
         long_args = {"command": "x" * 1000}
         elements = format_tool_args(long_args, max_length=50)
         assert len(elements) > 0
+
+
+class TestLazyImports:
+    """测试轻量命令不加载 LangChain（导入耗时回归，完整基准见 benchmarks/bench_import_time.py）"""
+
+    HEAVY = ("langchain", "langchain_core", "langchain_anthropic", "langgraph", "prompt_toolkit")
+
+    def _loaded_heavy_modules(self, code: str) -> list[str]:
+        probe = f"{code}\nimport sys\nprint(','.join(m for m in {self.HEAVY!r} if m in sys.modules))"
+        result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+        return [m for m in result.stdout.strip().split(",") if m]
+
+    def test_package_import_is_light(self):
+        assert self._loaded_heavy_modules("from langchain_skills import SkillLoader, SkillMetadata") == []
+
+    def test_cli_import_is_light(self):
+        assert self._loaded_heavy_modules("import langchain_skills.cli") == []
+
+    def test_lazy_attribute_loads_agent(self):
+        loaded = self._loaded_heavy_modules("from langchain_skills import LangChainSkillsAgent")
+        assert "langchain" in loaded
+
+    def test_unknown_attribute(self):
+        import langchain_skills
+
+        with pytest.raises(AttributeError):
+            langchain_skills.does_not_exist
@@ -0,0 +1,65 @@
+"""
+file_reader 模块单元测试
+
+测试行索引、分页读取和读取末尾在不同换行符下与 read_text 的一致性。
+"""
+
+import pytest
+
+from langchain_skills import file_reader
+
+
+def universal_lines(path):
+    """read_text（universal newlines）得到的行，不含行结束符"""
+    text = path.read_text(encoding="utf-8")
+    lines = text.split("\n")
+    return lines[:-1] if text.endswith("\n") else lines
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # 缩小索引块和搜索范围，让少量数据也能覆盖块边界
+    monkeypatch.setattr(file_reader, "INDEX_BLOCK_BYTES", 16)
+    monkeypatch.setattr(file_reader, "LINE_SCAN_BYTES", 5)
+
+
+class TestLineEndings:
+    """测试 \\n、\\r\\n 和单独的 \\r"""
+
+    def test_crlf(self, tmp_path):
+        path = tmp_path / "windows.txt"
+        path.write_bytes(b"foo\r\nbar\r\n")
+
+        page = file_reader.read_lines(path)
+
+        assert page.lines == [(1, "foo"), (2, "bar")]
+        assert page.total_lines == 2
+        assert file_reader.read_tail(path, 1).lines == [(2, "bar")]
+
+    def test_cr_only(self, tmp_path):
+        path = tmp_path / "classic-mac.txt"
+        path.write_bytes(b"foo\rbar\rbaz")
+
+        page = file_reader.read_lines(path)
+
+        assert page.lines == [(1, "foo"), (2, "bar"), (3, "baz")]
+        assert page.total_lines == 3
+        assert file_reader.read_tail(path, 2).lines == [(2, "bar"), (3, "baz")]
+
+    @pytest.mark.parametrize("data", [
+        b"".join(b"line %d\r\n" % i for i in range(1, 60)),
+        b"".join(b"line %d\r" % i for i in range(1, 60)),
+        b"".join(b"line %d%s" % (i, (b"\n", b"\r\n", b"\r")[i % 3]) for i in range(1, 60)) + b"last",
+        b"a\r\r\nb\n\n\rc\r\n\r\n",
+    ])
+    def test_matches_read_text(self, tmp_path, small_blocks, data):
+        path = tmp_path / "mixed.txt"
+        path.write_bytes(data)
+        expected = list(enumerate(universal_lines(path), 1))
+
+        # 逐页读取（每次从新的检查点定位）
+        pages = [file_reader.read_lines(path, offset, 3).lines for offset in range(1, len(expected) + 1, 3)]
+        assert [line for page in pages for line in page] == expected
+        assert file_reader.read_lines(path, len(expected) + 1).lines == []
+        assert file_reader.read_tail(path, 7).lines == expected[-7:]
+        assert file_reader.read_tail(path, 7).total_lines == len(expected)
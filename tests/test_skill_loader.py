@@ -0,0 +1,915 @@
+"""
+SkillLoader 模块单元测试
+
+测试 Skills 发现、元数据索引和 Level 2 加载。
+"""
+
+import asyncio
+import io
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from langchain_skills.skill_bundle import SkillBundle, build_bundle
+from langchain_skills.skill_loader import SkillLoader, SkillMetadata, read_frontmatter
+from langchain_skills.skill_sections import find_section, format_toc, parse_sections
+from langchain_skills.skill_references import CHUNK_LINES, ReferenceIndex, chunk_lines
+from langchain_skills.skill_search import SkillSearchIndex, tokenize
+from langchain_skills.token_budget import estimate_tokens, shorten_description
+from langchain_skills.skill_watcher import SkillWatcher, inotify_available
+
+
+def write_skill(base: Path, dir_name: str, name: str | None = None, description: str = "desc", body: str = "# Body\n\nInstructions") -> Path:
+    """在 base 下创建一个 skill 目录，返回 SKILL.md 路径"""
+    skill_dir = base / dir_name
+    skill_dir.mkdir(parents=True, exist_ok=True)
+    skill_md = skill_dir / "SKILL.md"
+    skill_md.write_text(
+        f"---\nname: {name or dir_name}\ndescription: {description}\n---\n{body}\n",
+        encoding="utf-8",
+    )
+    return skill_md
+
+
+def bump_mtime(path: Path) -> None:
+    """确保 mtime 发生变化（部分文件系统 mtime 精度较低）"""
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+class TestScanSkills:
+    """测试 Level 1 扫描"""
+
+    def test_scan_basic(self, tmp_path):
+        write_skill(tmp_path, "alpha", description="Alpha skill")
+        write_skill(tmp_path, "beta")
+        (tmp_path / "not-a-skill").mkdir()
+
+        loader = SkillLoader([tmp_path])
+        skills = loader.scan_skills()
+
+        assert {s.name for s in skills} == {"alpha", "beta"}
+        alpha = next(s for s in skills if s.name == "alpha")
+        assert alpha.description == "Alpha skill"
+        assert alpha.skill_path == tmp_path / "alpha"
+
+    def test_missing_root(self, tmp_path):
+        loader = SkillLoader([tmp_path / "missing"])
+        assert loader.scan_skills() == []
+
+    def test_project_level_wins(self, tmp_path):
+        project = tmp_path / "project"
+        user = tmp_path / "user"
+        write_skill(project, "shared", description="project")
+        write_skill(user, "shared", description="user")
+
+        loader = SkillLoader([project, user])
+        skills = loader.scan_skills()
+
+        assert len(skills) == 1
+        assert skills[0].description == "project"
+
+    def test_parallel_scan_matches_sequential(self, tmp_path):
+        project = tmp_path / "project"
+        user = tmp_path / "user"
+        for i in range(100):
+            write_skill(project, f"p-{i:03d}")
+            write_skill(user, f"u-{i:03d}")
+        write_skill(project, "shared", description="project")
+        write_skill(user, "shared", description="user")
+
+        sequential = SkillLoader([project, user], scan_workers=1).scan_skills()
+        parallel = SkillLoader([project, user], scan_workers=4).scan_skills()
+
+        assert [s.name for s in parallel] == [s.name for s in sequential]
+        assert len(parallel) == 201
+        shared = next(s for s in parallel if s.name == "shared")
+        assert shared.description == "project"
+
+    def test_invalid_frontmatter_skipped(self, tmp_path):
+        bad = tmp_path / "bad"
+        bad.mkdir()
+        (bad / "SKILL.md").write_text("no frontmatter here", encoding="utf-8")
+        write_skill(tmp_path, "good")
+
+        loader = SkillLoader([tmp_path])
+        assert [s.name for s in loader.scan_skills()] == ["good"]
+
+    def test_non_string_frontmatter_normalised(self, tmp_path):
+        # `name: 2048` 被 YAML 解析为 int，空的 `description:` 解析为 None
+        source = tmp_path / "skills"
+        write_skill(source, "numeric", name="2048", description="")
+        write_skill(source, "alpha", description="Alpha")
+        index_path = tmp_path / "index.json"
+        bundle_path = tmp_path / "skills.bundle"
+        build_bundle([source], bundle_path)
+
+        loaders = [
+            SkillLoader([source]),
+            SkillLoader([source], index_path=index_path),
+            SkillLoader([source], index_path=index_path),  # 从持久化索引热启动
+            SkillLoader(bundle_path=bundle_path),
+        ]
+        for loader in loaders:
+            skills = {s.name: s for s in loader.scan_skills()}
+            assert sorted(skills) == ["2048", "alpha"]
+            assert skills["2048"].description == ""
+            assert "**2048**" in loader.plan_system_prompt("Base").prompt
+
+
+class TestReadFrontmatter:
+    """测试逐行 frontmatter 解析"""
+
+    def test_basic(self):
+        data = b"---\nname: demo\ndescription: d\n---\n# Body\n"
+        frontmatter, offset = read_frontmatter(io.BytesIO(data))
+        assert frontmatter == {"name": "demo", "description": "d"}
+        assert data[offset:] == b"# Body\n"
+
+    def test_stops_at_closing_delimiter(self):
+        stream = io.BytesIO(b"---\nname: demo\n---\n" + b"x" * 100_000)
+        _, offset = read_frontmatter(stream)
+        assert stream.tell() == offset
+
+    def test_crlf_and_trailing_whitespace(self):
+        data = "---  \r\nname: 中文\r\n---\t\r\nbody".encode("utf-8")
+        frontmatter, offset = read_frontmatter(io.BytesIO(data))
+        assert frontmatter["name"] == "中文"
+        assert data[offset:] == b"body"
+
+    @pytest.mark.parametrize("data", [
+        b"no frontmatter",
+        b"---\nname: demo\n",            # 没有结束分隔符
+        b"---\nname: demo\n---",         # 结束分隔符后没有换行
+        b"---\n---\nbody",               # 空 frontmatter
+        b"---\n- a\n- b\n---\n",         # 不是映射
+        b"---\nname: [oops\n---\n",      # YAML 错误
+        b"---\nname: demo\n----\n",      # ---- 不是分隔符
+    ])
+    def test_invalid(self, data):
+        assert read_frontmatter(io.BytesIO(data)) is None
+
+
+class TestSkillIndex:
+    """测试 mtime 校验的元数据索引"""
+
+    def test_unchanged_files_not_reparsed(self, tmp_path):
+        write_skill(tmp_path, "alpha")
+        write_skill(tmp_path, "beta")
+
+        loader = SkillLoader([tmp_path])
+        parsed = []
+        original = loader._parse_skill_metadata
+
+        def counting_parse(path):
+            parsed.append(path.parent.name)
+            return original(path)
+
+        loader._parse_skill_metadata = counting_parse
+
+        loader.scan_skills()
+        assert sorted(parsed) == ["alpha", "beta"]
+
+        parsed.clear()
+        loader.scan_skills()
+        assert parsed == []
+
+    def test_changed_file_reparsed(self, tmp_path):
+        skill_md = write_skill(tmp_path, "alpha", description="old")
+        loader = SkillLoader([tmp_path])
+        loader.scan_skills()
+
+        skill_md.write_text("---\nname: alpha\ndescription: new\n---\nbody\n", encoding="utf-8")
+        bump_mtime(skill_md)
+
+        skills = loader.scan_skills()
+        assert skills[0].description == "new"
+
+    def test_added_and_removed_skills(self, tmp_path):
+        write_skill(tmp_path, "alpha")
+        loader = SkillLoader([tmp_path])
+        assert [s.name for s in loader.scan_skills()] == ["alpha"]
+
+        write_skill(tmp_path, "beta")
+        bump_mtime(tmp_path)
+        assert {s.name for s in loader.scan_skills()} == {"alpha", "beta"}
+
+        (tmp_path / "alpha" / "SKILL.md").unlink()
+        assert [s.name for s in loader.scan_skills()] == ["beta"]
+
+    def test_persisted_index_warm_start(self, tmp_path):
+        skills_root = tmp_path / "skills"
+        index_path = tmp_path / "cache" / "index.json"
+        write_skill(skills_root, "alpha", description="Alpha")
+
+        SkillLoader([skills_root], index_path=index_path).scan_skills()
+        assert index_path.exists()
+
+        data = json.loads(index_path.read_text(encoding="utf-8"))
+        entry = data["roots"][str(skills_root)]["skills"]["alpha"]
+        assert entry["name"] == "alpha"
+        assert entry["description"] == "Alpha"
+
+        # 新进程（新 loader）热启动：不需要重新解析
+        loader = SkillLoader([skills_root], index_path=index_path)
+        loader._parse_skill_metadata = lambda path: pytest.fail("should not parse")
+        skills = loader.scan_skills()
+        assert skills == [SkillMetadata("alpha", "Alpha", skills_root / "alpha")]
+
+    def test_corrupt_index_ignored(self, tmp_path):
+        index_path = tmp_path / "index.json"
+        index_path.write_text("{not json", encoding="utf-8")
+        write_skill(tmp_path / "skills", "alpha")
+
+        loader = SkillLoader([tmp_path / "skills"], index_path=index_path)
+        assert [s.name for s in loader.scan_skills()] == ["alpha"]
+
+
+class TestLoadSkill:
+    """测试 Level 2 加载"""
+
+    def test_load_skill_body(self, tmp_path):
+        write_skill(tmp_path, "alpha", body="# Alpha\n\nDo things.")
+        loader = SkillLoader([tmp_path])
+
+        content = loader.load_skill("alpha")
+        assert content is not None
+        assert content.metadata.name == "alpha"
+        assert content.instructions == "# Alpha\n\nDo things."
+
+    def test_load_skill_seeks_to_body_offset(self, tmp_path):
+        skill_md = write_skill(tmp_path, "alpha", body="# Alpha")
+        loader = SkillLoader([tmp_path])
+        metadata = loader.scan_skills()[0]
+
+        assert skill_md.read_bytes()[metadata.body_offset:].strip() == b"# Alpha"
+
+    def test_load_skill_after_edit(self, tmp_path):
+        skill_md = write_skill(tmp_path, "alpha", body="old body")
+        loader = SkillLoader([tmp_path])
+        loader.scan_skills()
+
+        # frontmatter 变长，扫描时记录的偏移失效
+        skill_md.write_text(
+            "---\nname: alpha\ndescription: a much longer description\n---\nnew body\n",
+            encoding="utf-8",
+        )
+        bump_mtime(skill_md)
+
+        assert loader.load_skill("alpha").instructions == "new body"
+
+    def test_load_unknown_skill(self, tmp_path):
+        loader = SkillLoader([tmp_path])
+        assert loader.load_skill("missing") is None
+
+
+class TestSkillWatcher:
+    """测试目录监听和变化通知"""
+
+    def test_refresh_reports_batch(self, tmp_path):
+        write_skill(tmp_path, "alpha")
+        skill_md = write_skill(tmp_path, "beta", description="old")
+        loader = SkillLoader([tmp_path])
+        watcher = SkillWatcher(loader, use_inotify=False, poll_interval=3600).start()
+
+        events = []
+        watcher.on_added(lambda s: events.append(("added", s.name)))
+        watcher.on_modified(lambda s: events.append(("modified", s.name)))
+        watcher.on_removed(lambda s: events.append(("removed", s.name)))
+        batches = []
+        watcher.on_batch(batches.append)
+
+        try:
+            write_skill(tmp_path, "gamma")
+            bump_mtime(tmp_path)
+            skill_md.write_text("---\nname: beta\ndescription: new\n---\n", encoding="utf-8")
+            bump_mtime(skill_md)
+            (tmp_path / "alpha" / "SKILL.md").unlink()
+
+            watcher.refresh()
+        finally:
+            watcher.stop()
+
+        assert sorted(events) == [("added", "gamma"), ("modified", "beta"), ("removed", "alpha")]
+        assert len(batches) == 1
+        assert loader.registry.get("alpha") is None
+        assert loader.registry.get("beta").description == "new"
+
+    def test_scan_skills_uses_watcher_state(self, tmp_path):
+        write_skill(tmp_path, "alpha")
+        loader = SkillLoader([tmp_path])
+        loader.watch(use_inotify=False, poll_interval=3600)
+        try:
+            loader._parse_skill_metadata = lambda path: pytest.fail("should not parse")
+            write_skill(tmp_path, "beta")
+            # 监听期间 scan_skills 不访问文件系统
+            assert [s.name for s in loader.scan_skills()] == ["alpha"]
+        finally:
+            loader.unwatch()
+
+    @pytest.mark.skipif(not inotify_available(), reason="inotify not available")
+    def test_inotify_coalesces_burst(self, tmp_path):
+        loader = SkillLoader([tmp_path])
+        watcher = loader.watch(debounce=0.2)
+        batches = []
+        watcher.on_batch(batches.append)
+
+        try:
+            for i in range(20):
+                write_skill(tmp_path, f"skill-{i}")
+
+            deadline = time.monotonic() + 5
+            while not batches and time.monotonic() < deadline:
+                time.sleep(0.05)
+            time.sleep(0.5)
+        finally:
+            loader.unwatch()
+
+        added = [s.name for batch in batches for s in batch.added]
+        assert sorted(added) == sorted(f"skill-{i}" for i in range(20))
+        assert len(batches) <= 2
+
+    @pytest.mark.skipif(not inotify_available(), reason="inotify not available")
+    def test_inotify_rewatches_recreated_directory(self, tmp_path):
+        write_skill(tmp_path, "alpha", description="v1")
+        loader = SkillLoader([tmp_path])
+        loader.watch(debounce=0.1)
+
+        def wait_for(condition):
+            deadline = time.monotonic() + 5
+            while not condition() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            return condition()
+
+        def description():
+            skills = {s.name: s.description for s in loader.scan_skills()}
+            return skills.get("alpha")
+
+        try:
+            shutil.rmtree(tmp_path / "alpha")
+            assert wait_for(lambda: description() is None)
+
+            write_skill(tmp_path, "alpha", description="v2")
+            assert wait_for(lambda: description() == "v2")
+
+            # 重建的目录需要重新监听，否则之后的修改不会被感知
+            skill_md = write_skill(tmp_path, "alpha", description="v3")
+            bump_mtime(skill_md)
+            assert wait_for(lambda: description() == "v3")
+        finally:
+            loader.unwatch()
+
+
+class TestSkillContentCache:
+    """测试 Level 2 内容 LRU 缓存"""
+
+    def test_hit_after_first_load(self, tmp_path):
+        write_skill(tmp_path, "alpha", body="# Alpha")
+        loader = SkillLoader([tmp_path])
+
+        first = loader.load_skill("alpha")
+        second = loader.load_skill("alpha")
+
+        assert second is first
+        stats = loader.cache_stats()
+        assert (stats.hits, stats.misses) == (1, 1)
+        assert stats.current_bytes == len("# Alpha")
+
+    def test_edit_invalidates_entry(self, tmp_path):
+        skill_md = write_skill(tmp_path, "alpha", body="old")
+        loader = SkillLoader([tmp_path])
+        loader.load_skill("alpha")
+
+        skill_md.write_text("---\nname: alpha\ndescription: d\n---\nnew\n", encoding="utf-8")
+        bump_mtime(skill_md)
+
+        assert loader.load_skill("alpha").instructions == "new"
+        assert loader.cache_stats().invalidations == 1
+
+    def test_byte_budget_evicts_lru(self, tmp_path):
+        for name in ("a", "b", "c"):
+            write_skill(tmp_path, name, body=name * 100)
+        loader = SkillLoader([tmp_path], content_cache_bytes=250)
+
+        loader.load_skill("a")
+        loader.load_skill("b")
+        loader.load_skill("a")      # a 变为最近使用
+        loader.load_skill("c")      # 淘汰 b
+
+        stats = loader.cache_stats()
+        assert stats.evictions == 1
+        assert stats.entries == 2
+        assert stats.current_bytes == 200
+
+        loader.load_skill("a")
+        assert loader.cache_stats().hits == 2
+
+    def test_disabled_cache(self, tmp_path):
+        write_skill(tmp_path, "alpha")
+        loader = SkillLoader([tmp_path], content_cache_bytes=0)
+        loader.load_skill("alpha")
+        loader.load_skill("alpha")
+        assert loader.cache_stats().entries == 0
+
+
+class TestSystemPrompt:
+    """测试 system prompt 构建"""
+
+    def test_skills_sorted_by_name(self, tmp_path):
+        project = tmp_path / "project"
+        user = tmp_path / "user"
+        write_skill(project, "zeta")
+        write_skill(user, "alpha")
+        write_skill(project, "mu")
+
+        prompt = SkillLoader([project, user]).build_system_prompt("Base")
+
+        assert prompt.startswith("Base\n\n## Available Skills")
+        positions = [prompt.index(f"**{name}**") for name in ("alpha", "mu", "zeta")]
+        assert positions == sorted(positions)
+
+    def test_blocks_join_to_prompt(self, tmp_path):
+        write_skill(tmp_path, "alpha")
+        loader = SkillLoader([tmp_path])
+
+        blocks = loader.build_system_prompt_blocks()
+        assert len(blocks) == 2
+        assert "\n\n".join(blocks) == loader.build_system_prompt()
+
+    def test_empty_library(self, tmp_path):
+        prompt = SkillLoader([tmp_path]).build_system_prompt()
+        assert "No skills currently available" in prompt
+
+
+class TestSkillSearch:
+    """测试 BM25 检索和 top-k 注入"""
+
+    def _skills(self):
+        return [
+            SkillMetadata("wechat-article", "提取微信公众号文章内容", Path("/a")),
+            SkillMetadata("news-extractor", "抓取新闻网站正文", Path("/b")),
+            SkillMetadata("slides-generator", "Generate presentation slides from an outline", Path("/c")),
+            SkillMetadata("pdf-summarizer", "Summarize PDF papers and reports", Path("/d")),
+        ]
+
+    def test_tokenize_mixed(self):
+        assert tokenize("News-Extractor 提取文章") == [
+            "news", "extractor", "提", "取", "文", "章", "提取", "取文", "文章",
+        ]
+
+    def test_chinese_query(self):
+        results = SkillSearchIndex(self._skills()).search("帮我提取这篇公众号文章", limit=2)
+        assert results[0][0].name == "wechat-article"
+
+    def test_english_query_matches_name(self):
+        results = SkillSearchIndex(self._skills()).search("make some slides", limit=3)
+        assert [skill.name for skill, _ in results] == ["slides-generator"]
+
+    def test_no_terms_matched(self):
+        index = SkillSearchIndex(self._skills())
+        assert index.search("kubernetes") == []
+        assert index.search("") == []
+
+    def test_prompt_injects_top_k(self, tmp_path):
+        for i in range(10):
+            write_skill(tmp_path, f"helper-{i}", description=f"generic helper {i}")
+        write_skill(tmp_path, "wechat-article", description="提取微信公众号文章内容")
+        loader = SkillLoader([tmp_path])
+
+        prompt = loader.build_system_prompt(query="提取公众号文章", top_k=3)
+
+        assert "11 skills are installed" in prompt
+        assert "**wechat-article**" in prompt
+        assert prompt.count("\n- **") <= 3
+        assert "search_skills" in prompt
+
+    @pytest.mark.parametrize("query", [None, "", "hi", "部署集群"])
+    def test_prompt_fills_top_k_without_matches(self, tmp_path, query):
+        # 空 query 或与任何 skill 都不相关时，按扫描顺序补足 top_k 个
+        for i in range(10):
+            write_skill(tmp_path, f"helper-{i}", description=f"generic helper {i}")
+        loader = SkillLoader([tmp_path])
+        expected = [s.name for s in loader.scan_skills()[:3]]
+
+        prompt = loader.build_system_prompt(query=query, top_k=3)
+
+        assert prompt.count("\n- **") == 3
+        assert all(f"**{name}**" in prompt for name in expected)
+
+    def test_prompt_fills_top_k_after_partial_match(self, tmp_path):
+        for i in range(10):
+            write_skill(tmp_path, f"helper-{i}", description=f"generic helper {i}")
+        write_skill(tmp_path, "wechat-article", description="提取微信公众号文章内容")
+        loader = SkillLoader([tmp_path])
+
+        prompt = loader.build_system_prompt(query="提取公众号文章", top_k=3)
+
+        assert "**wechat-article**" in prompt
+        assert prompt.count("\n- **") == 3
+
+    def test_prompt_small_library_unchanged(self, tmp_path):
+        write_skill(tmp_path, "alpha")
+        loader = SkillLoader([tmp_path])
+        assert loader.build_system_prompt(query="anything", top_k=3) == loader.build_system_prompt()
+
+    def test_index_rebuilt_after_rescan(self, tmp_path):
+        write_skill(tmp_path, "alpha", description="first skill")
+        loader = SkillLoader([tmp_path])
+        assert loader.search_skills("second") == []
+
+        write_skill(tmp_path, "beta", description="second skill")
+        loader.scan_skills()
+        assert [s.name for s in loader.search_skills("second")] == ["beta"]
+
+    def test_empty_description(self, tmp_path):
+        # 空的 `description:` 被 YAML 解析为 None，不应导致检索或 top-k 注入出错
+        write_skill(tmp_path, "blank-skill", description="")
+        write_skill(tmp_path, "wechat-article", description="提取微信公众号文章内容")
+        loader = SkillLoader([tmp_path])
+
+        assert [s.name for s in loader.search_skills("blank")] == ["blank-skill"]
+        prompt = loader.build_system_prompt(query="提取公众号文章", top_k=1)
+        assert "**wechat-article**" in prompt
+        assert "**blank-skill**" not in prompt
+
+
+class TestPromptBudget:
+    """测试 token 估算和按预算构建 system prompt"""
+
+    def test_estimate_cjk(self):
+        # 中文按字计数，len // 4 会严重低估
+        text = "提取微信公众号文章内容"
+        assert estimate_tokens(text) == len(text)
+        assert estimate_tokens(text) > len(text) // 4
+
+    def test_estimate_english(self):
+        assert estimate_tokens("hello world") == 2
+        assert estimate_tokens("") == 0
+
+    def test_lines_are_additive(self):
+        lines = ["- **a**: 提取文章\n", "- **b**: Generate slides\n"]
+        assert estimate_tokens("".join(lines)) == sum(estimate_tokens(line) for line in lines)
+
+    def test_shorten_description(self):
+        assert shorten_description("提取公众号文章。支持图片下载。") == "提取公众号文章。"
+        assert shorten_description("一二三四五六七八九十", max_tokens=4) == "一二三四…"
+
+    def test_shorten_non_string_description(self, tmp_path):
+        assert shorten_description(None) == ""
+        assert shorten_description(2048) == "2048"
+
+        write_skill(tmp_path, "alpha", description="")
+        write_skill(tmp_path, "beta", description="Generate slides")
+        loader = SkillLoader([tmp_path])
+        plan = loader.plan_system_prompt("Base", token_budget=5)
+        assert {cost.name for cost in plan.skills} == {"alpha", "beta"}
+
+    def test_no_budget_matches_prompt(self, tmp_path):
+        write_skill(tmp_path, "alpha", description="提取文章")
+        loader = SkillLoader([tmp_path])
+
+        plan = loader.plan_system_prompt("Base")
+
+        assert plan.prompt == loader.build_system_prompt("Base")
+        assert plan.total_tokens == estimate_tokens(plan.prompt)
+        assert [(c.name, c.mode) for c in plan.skills] == [("alpha", "full")]
+        assert plan.skills[0].tokens == estimate_tokens("- **alpha**: 提取文章\n")
+
+    def test_budget_shortens_then_drops(self, tmp_path):
+        long_description = "提取微信公众号文章。" + "支持图片下载和格式转换" * 10
+        for name in ("alpha", "beta", "gamma"):
+            write_skill(tmp_path, name, description=long_description)
+        loader = SkillLoader([tmp_path])
+        full = loader.plan_system_prompt("Base")
+
+        # 预算只够缩短描述
+        shortened = loader.plan_system_prompt("Base", token_budget=full.total_tokens - 50)
+        assert shortened.within_budget
+        assert [c.mode for c in shortened.skills] == ["full", "full", "short"]
+
+        # 预算更紧时从最低优先级开始移除
+        tight = loader.plan_system_prompt("Base", token_budget=full.total_tokens - 300)
+        assert tight.within_budget
+        assert tight.count("dropped") >= 1
+        assert tight.skills[0].mode != "dropped"
+        assert "search_skills" in tight.prompt
+        for cost in tight.skills:
+            assert (f"**{cost.name}**" in tight.prompt) == (cost.mode != "dropped")
+
+
+class TestSkillBundle:
+    """测试单文件 bundle"""
+
+    def test_round_trip(self, tmp_path):
+        source = tmp_path / "skills"
+        write_skill(source, "alpha", description="提取文章", body="# 标题\n\n正文内容")
+        write_skill(source, "beta", description="Generate slides")
+        bundle_path = tmp_path / "skills.bundle"
+
+        built = build_bundle([source], bundle_path)
+        assert sorted(s.name for s in built) == ["alpha", "beta"]
+
+        loader = SkillLoader(bundle_path=bundle_path)
+        skills = {s.name: s for s in loader.scan_skills()}
+        assert skills["alpha"].description == "提取文章"
+        assert skills["alpha"].skill_path == (source / "alpha").resolve()
+
+        content = loader.load_skill("alpha")
+        assert content.instructions == SkillLoader([source]).load_skill("alpha").instructions
+        assert loader.load_skill("missing") is None
+
+    def test_does_not_touch_source_tree(self, tmp_path):
+        source = tmp_path / "skills"
+        write_skill(source, "alpha")
+        bundle_path = tmp_path / "skills.bundle"
+        build_bundle([source], bundle_path)
+
+        # 源目录删除后仍可从 bundle 加载
+        (source / "alpha" / "SKILL.md").unlink()
+        loader = SkillLoader([source], bundle_path=bundle_path)
+        assert [s.name for s in loader.scan_skills()] == ["alpha"]
+        assert loader.load_skill("alpha").instructions == "# Body\n\nInstructions"
+
+    def test_reopens_rebuilt_bundle(self, tmp_path):
+        source = tmp_path / "skills"
+        write_skill(source, "alpha")
+        bundle_path = tmp_path / "skills.bundle"
+        build_bundle([source], bundle_path)
+        loader = SkillLoader(bundle_path=bundle_path)
+        assert [s.name for s in loader.scan_skills()] == ["alpha"]
+
+        write_skill(source, "beta")
+        build_bundle([source], bundle_path)
+        assert sorted(s.name for s in loader.scan_skills()) == ["alpha", "beta"]
+
+    def test_rebuild_ignores_bundle_env(self, tmp_path, monkeypatch):
+        source = tmp_path / "skills"
+        write_skill(source, "a")
+        bundle_path = tmp_path / "skills.bundle"
+        build_bundle([source], bundle_path)
+        monkeypatch.setenv("SKILLS_BUNDLE", str(bundle_path))
+
+        # 重新构建时扫描目录，而不是读取 SKILLS_BUNDLE 指向的旧 bundle
+        write_skill(source, "b")
+        assert sorted(s.name for s in build_bundle([source], bundle_path)) == ["a", "b"]
+        assert sorted(s.name for s in SkillBundle(bundle_path).skills) == ["a", "b"]
+
+    def test_rejects_invalid_file(self, tmp_path):
+        path = tmp_path / "bogus.bundle"
+        path.write_bytes(b"not a bundle at all")
+        with pytest.raises(ValueError):
+            SkillBundle(path)
+
+
+class TestNegativeLookup:
+    """测试未找到 skill 的负缓存和 did-you-mean 建议"""
+
+    def test_miss_is_cached(self, tmp_path):
+        write_skill(tmp_path, "alpha")
+        loader = SkillLoader([tmp_path])
+        scans = []
+        original = loader._rescan
+        loader._rescan = lambda: scans.append(1) or original()
+
+        assert loader.load_skill("missing") is None
+        assert loader.load_skill("missing") is None
+        assert loader.skill_names() == ["alpha"]
+        assert len(scans) == 1
+
+    def test_miss_expires(self, tmp_path):
+        loader = SkillLoader([tmp_path], negative_ttl=0.01)
+        assert loader.load_skill("alpha") is None
+
+        write_skill(tmp_path, "alpha")
+        time.sleep(0.02)
+        assert loader.load_skill("alpha") is not None
+
+    def test_suggestions(self, tmp_path):
+        for name in ("news-extractor", "slides-generator", "pdf-reader"):
+            write_skill(tmp_path, name)
+        loader = SkillLoader([tmp_path])
+
+        assert loader.suggest_skills("news") == ["news-extractor"]
+        assert loader.suggest_skills("slide-generator") == ["slides-generator"]
+        assert loader.suggest_skills("zzz") == []
+
+
+class TestSkillSections:
+    """测试 SKILL.md 章节解析"""
+
+    BODY = (
+        "Intro text\n\n"
+        "# Tool\n\n"
+        "## Usage\n\nRun it.\n\n"
+        "```bash\n# not a heading\n```\n\n"
+        "### Input/Output\n\nfiles\n\n"
+        "## Notes\n\nend\n"
+    )
+
+    def test_heading_tree(self):
+        sections = parse_sections(self.BODY)
+
+        assert [s.path_str for s in sections] == [
+            "Overview", "Tool", "Tool > Usage", "Tool > Usage > Input/Output", "Tool > Notes",
+        ]
+        usage = sections[2]
+        assert "# not a heading" in usage.text
+        assert "files" in usage.text
+        assert "end" not in usage.text
+        assert usage.children == [sections[3]]
+        assert all(s.tokens > 0 for s in sections)
+
+    def test_find_section(self):
+        sections = parse_sections(self.BODY)
+
+        assert find_section(sections, "usage").title == "Usage"
+        assert find_section(sections, "## Notes").title == "Notes"
+        # 标题本身含 /，优先按完整标题匹配
+        assert find_section(sections, "Input/Output").title == "Input/Output"
+        assert find_section(sections, "Tool / Usage").title == "Usage"
+        assert find_section(sections, "missing") is None
+
+    def test_toc_and_skill_content(self, tmp_path):
+        skill_dir = tmp_path / "tool"
+        skill_dir.mkdir()
+        (skill_dir / "SKILL.md").write_text(
+            "---\nname: tool\ndescription: d\n---\n" + self.BODY, encoding="utf-8"
+        )
+        content = SkillLoader([tmp_path]).load_skill("tool")
+
+        toc = content.table_of_contents()
+        assert toc == format_toc(content.sections)
+        assert "- Tool (~" in toc
+        assert "  - Usage (~" in toc
+        assert content.get_section("Notes").text.startswith("## Notes")
+
+
+class TestReferenceIndex:
+    """测试 references/ 和 assets/ 的段落索引"""
+
+    def _make_skill(self, tmp_path):
+        skill_dir = tmp_path / "api-client"
+        (skill_dir / "references").mkdir(parents=True)
+        (skill_dir / "assets").mkdir()
+        (skill_dir / "SKILL.md").write_text(
+            "---\nname: api-client\ndescription: d\n---\nbody\n", encoding="utf-8"
+        )
+        filler = "\n".join(f"filler line {i}" for i in range(30))
+        (skill_dir / "references" / "api.md").write_text(
+            f"# API\n\n{filler}\n\n## Pagination\n\nUse the cursor parameter to page results.\n",
+            encoding="utf-8",
+        )
+        (skill_dir / "assets" / "模板.txt").write_text("分页查询模板\n", encoding="utf-8")
+        (skill_dir / "assets" / "logo.png").write_bytes(b"\x89PNG\0\0cursor")
+        return skill_dir
+
+    def test_chunk_lines_bounded(self):
+        chunks = chunk_lines([f"line {i}" for i in range(100)])
+
+        assert chunks[0][0] == 0 and chunks[-1][1] == 100
+        assert all(end - start <= CHUNK_LINES for start, end in chunks)
+
+    def test_search_returns_anchor(self, tmp_path):
+        skill_dir = self._make_skill(tmp_path)
+        loader = SkillLoader([tmp_path])
+
+        hits = loader.search_references("cursor pagination")
+
+        assert len(hits) == 1
+        passage = hits[0][0]
+        assert passage.path == skill_dir / "references" / "api.md"
+        assert passage.start_line <= 35 <= passage.end_line
+        assert passage.anchor == f"{passage.path}:{passage.start_line}-{passage.end_line}"
+        assert "cursor parameter" in passage.text
+
+        hits = loader.search_references("分页")
+        assert hits[0][0].path.name == "模板.txt"
+        assert loader.search_references("分页", skill_name="other") == []
+
+    def test_refresh_reparses_changed_files_only(self, tmp_path):
+        skill_dir = self._make_skill(tmp_path)
+        loader = SkillLoader([tmp_path])
+        index = ReferenceIndex()
+        skills = loader.scan_skills()
+        assert index.refresh(skills) is True
+        assert index.refresh(skills) is False
+
+        doc = skill_dir / "references" / "api.md"
+        doc.write_text("webhook retries\n", encoding="utf-8")
+        os.utime(doc, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+        assert index.refresh(skills) is True
+        assert index.search("cursor") == []
+        assert index.search("webhook")[0][0].path == doc
+
+        doc.unlink()
+        assert index.refresh(skills) is True
+        assert index.search("webhook") == []
+
+
+class TestSkillRegistry:
+    """测试元数据快照（copy-on-write）和并发扫描合并"""
+
+    def test_snapshot_is_immutable_and_replaced(self, tmp_path):
+        write_skill(tmp_path, "alpha")
+        loader = SkillLoader([tmp_path])
+        assert not loader.registry.scanned
+
+        loader.scan_skills()
+        before = loader.registry
+        with pytest.raises(TypeError):
+            before.by_name["beta"] = before.skills[0]
+
+        write_skill(tmp_path, "beta")
+        loader.scan_skills()
+
+        # 旧快照不受新扫描影响
+        assert [s.name for s in before.skills] == ["alpha"]
+        assert sorted(loader.registry.by_name) == ["alpha", "beta"]
+        assert loader.registry.generation == before.generation + 1
+
+    def test_concurrent_rescans_are_merged(self, tmp_path):
+        write_skill(tmp_path, "alpha")
+        loader = SkillLoader([tmp_path], scan_workers=1)
+        original = loader._collect_skills
+        started = threading.Event()
+        release = threading.Event()
+        scans = []
+
+        def slow_collect(map_fn):
+            scans.append(1)
+            started.set()
+            release.wait(5)
+            return original(map_fn)
+
+        loader._collect_skills = slow_collect
+
+        # 第一次扫描进行中时到达的请求不能复用它，但彼此之间合并为一次扫描
+        first = threading.Thread(target=loader.scan_skills)
+        first.start()
+        assert started.wait(5)
+        waiters = [threading.Thread(target=loader.scan_skills) for _ in range(8)]
+        for t in waiters:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in [first, *waiters]:
+            t.join(5)
+
+        assert len(scans) == 2
+        assert [s.name for s in loader.registry.skills] == ["alpha"]
+
+
+class TestAsyncLoader:
+    """测试 SkillLoader 的异步接口"""
+
+    def test_results_match_sync(self, tmp_path):
+        write_skill(tmp_path, "alpha", description="提取文章")
+        write_skill(tmp_path, "beta")
+        loader = SkillLoader([tmp_path])
+
+        async def run():
+            return (
+                await loader.ascan_skills(),
+                await loader.aload_skill("alpha"),
+                await loader.aload_skill("missing"),
+                await loader.abuild_system_prompt("base", query="文章", top_k=1),
+            )
+
+        skills, content, missing, prompt = asyncio.run(run())
+        loader.close()
+
+        assert skills == loader.scan_skills()
+        assert content == loader.load_skill("alpha")
+        assert missing is None
+        assert prompt == loader.build_system_prompt("base", query="文章", top_k=1)
+
+    def test_concurrent_waiters_share_one_call(self, tmp_path):
+        write_skill(tmp_path, "alpha")
+        loader = SkillLoader([tmp_path])
+        calls = []
+        original = loader.load_skill
+
+        def slow_load(name):
+            calls.append(name)
+            time.sleep(0.05)
+            return original(name)
+
+        loader.load_skill = slow_load
+
+        async def run():
+            return await asyncio.gather(*(loader.aload_skill("alpha") for _ in range(10)))
+
+        results = asyncio.run(run())
+        loader.close()
+
+        assert calls == ["alpha"]
+        assert all(result is results[0] for result in results)
+        assert results[0].instructions == "# Body\n\nInstructions"
+        # 完成后不再共享，下一次调用重新执行
+        asyncio.run(loader.aload_skill("alpha"))
+        assert calls == ["alpha", "alpha"]
@@ -7,13 +7,35 @@ Tools 模块单元测试
 这里直接测试底层实现逻辑，而不是通过 .invoke() 调用。
 """
 
+import asyncio
+import os
 import pytest
+import re
+import shutil
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock, patch, MagicMock
 from pathlib import Path
 
-from langchain_skills.tools import SkillAgentContext
+from langchain.agents.middleware.types import ToolCallRequest
+from langchain_core.messages import HumanMessage
+from langchain_skills import file_reader, file_search, tree_snapshot
+from langchain_skills.read_cache import ReadCache, ReadRecord
+from langchain_skills.skill_loader import SkillLoader
+from langchain_skills.shell import OutputCapture, arun_command, default_spill_dir, run_command
+from langchain_skills.shell_session import ShellSession, ShellSessionPool, sessions_supported
+from langchain_skills.skill_watcher import inotify_available
+from langchain_skills.tool_concurrency import ToolConcurrencyMiddleware
+from langchain_skills.tools import (
+    SkillAgentContext, bash, edit, glob, grep, list_dir, load_skill, read_file, search_references, search_skills,
+    write_file,
+)
+from langchain_skills.tree_snapshot import TreeSnapshot
+from langchain_skills.trigram_index import TrigramIndex, plan_query
 from langchain_skills.stream import SUCCESS_PREFIX, FAILURE_PREFIX, resolve_path
+from langchain_skills.token_budget import estimate_tokens
 
 
 class MockRuntime:
@@ -25,6 +47,32 @@ class MockRuntime:
         )
 
 
+def process_alive(pid: int) -> bool:
+    """进程是否仍在运行（僵尸进程视为已结束）"""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+    except OSError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def wait_for_file(path: Path, timeout: float = 5.0) -> str:
+    """等待文件写入内容并返回"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if path.exists() and path.read_text().strip():
+            return path.read_text().strip()
+        time.sleep(0.05)
+    raise AssertionError(f"{path} was not written")
+
+
 def run_bash_command(command: str, working_directory: Path = None) -> str:
     """直接执行 bash 命令的测试辅助函数（复制 tools.py 中的逻辑）"""
     cwd = str(working_directory or Path.cwd())
@@ -110,6 +158,436 @@ class TestBashTool:
         assert "tmp" in result
 
 
+class TestRunCommand:
+    """测试增量读取输出的命令执行"""
+
+    def test_streams_output_incrementally(self):
+        chunks = []
+        result = run_command(
+            "echo first; sleep 0.3; echo second; echo oops >&2",
+            str(Path.cwd()),
+            on_output=lambda stream, text: chunks.append((stream, text)),
+        )
+
+        assert result.returncode == 0
+        assert result.stdout == "first\nsecond\n"
+        assert result.stderr == "oops\n"
+        # 第一行在命令结束前就已推送
+        assert chunks[0] == ("stdout", "first\n")
+        assert "".join(t for s, t in chunks if s == "stdout") == result.stdout
+
+    def test_timeout_keeps_partial_output(self):
+        result = run_command("echo started; sleep 5", str(Path.cwd()), timeout=0.5)
+
+        assert result.timed_out
+        assert result.returncode is None
+        assert result.stdout == "started\n"
+        assert result.duration < 4
+
+    @pytest.mark.skipif(os.name == "nt", reason="POSIX process groups only")
+    def test_timeout_kills_process_group(self, tmp_path):
+        pid_file = tmp_path / "child.pid"
+        result = run_command(f"sleep 30 & echo $! > {pid_file}; wait", str(tmp_path), timeout=0.5)
+
+        assert result.timed_out
+        pid = int(wait_for_file(pid_file))
+        deadline = time.monotonic() + 5
+        while process_alive(pid) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not process_alive(pid)
+
+    def test_large_output_keeps_head_and_tail(self, tmp_path):
+        spill_dir = tmp_path / "spill"
+        result = run_command(
+            "seq 1 20000",
+            str(tmp_path),
+            head_chars=100,
+            tail_chars=100,
+            spill_dir=spill_dir,
+        )
+
+        assert result.returncode == 0
+        assert result.truncated
+        assert result.stdout.startswith("1\n2\n3\n")
+        assert result.stdout.endswith("19999\n20000\n")
+        assert "characters omitted" in result.stdout
+        assert "20,000 lines" in result.stdout
+
+        capture = result.stdout_capture
+        assert capture.lines == 20000
+        assert capture.spill_path.parent == spill_dir
+        assert str(capture.spill_path) in result.stdout
+        # 溢出文件包含完整输出
+        full = capture.spill_path.read_text(encoding="utf-8")
+        assert full.splitlines() == [str(i) for i in range(1, 20001)]
+        assert capture.bytes == len(full.encode("utf-8"))
+
+    def test_small_output_is_not_spilled(self, tmp_path):
+        result = run_command("echo hi", str(tmp_path), spill_dir=tmp_path / "spill")
+
+        assert result.stdout == "hi\n"
+        assert not result.truncated
+        assert result.stdout_capture.spill_path is None
+        assert not (tmp_path / "spill").exists()
+
+    @pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions only")
+    def test_spill_files_are_private(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("SKILLS_OUTPUT_DIR", raising=False)
+        assert str(os.getuid()) in default_spill_dir().name
+
+        # 已存在的目录权限过宽时收紧为 0o700，文件以 0o600 创建
+        spill_dir = tmp_path / "spill"
+        spill_dir.mkdir(mode=0o777)
+        os.chmod(spill_dir, 0o777)
+        capture = OutputCapture("stdout", head_chars=10, tail_chars=10, spill_dir=spill_dir)
+        capture.write("x" * 100)
+        capture.close()
+
+        assert capture.spill_path is not None
+        assert spill_dir.stat().st_mode & 0o777 == 0o700
+        assert capture.spill_path.stat().st_mode & 0o777 == 0o600
+
+    def test_capture_memory_is_bounded(self, tmp_path):
+        # 溢出目录无法创建时仍正常捕获，只是不保存完整输出
+        blocker = tmp_path / "not-a-dir"
+        blocker.write_text("")
+        capture = OutputCapture("stdout", head_chars=10, tail_chars=10, spill_dir=blocker / "spill")
+        for _ in range(1000):
+            capture.write("x" * 50 + "\n")
+
+        assert capture.chars == 51000
+        assert capture._tail_len < 10 + 51
+        assert "full output was not saved" in capture.text()
+
+    def test_bash_tool_returns_spill_path(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("SKILLS_OUTPUT_DIR", str(tmp_path / "spill"))
+        runtime = MockRuntime(tmp_path)
+
+        result = bash.func("seq 1 100000", runtime=runtime)
+
+        assert result.startswith("[OK]\n\n1\n")
+        assert "use read_file to view it" in result
+        assert str(tmp_path / "spill") in result
+        assert len(result) < 20000
+
+    def test_bash_tool_emits_progress(self, tmp_path):
+        events = []
+        runtime = MockRuntime(tmp_path)
+        runtime.stream_writer = events.append
+        runtime.tool_call_id = "call-1"
+
+        result = bash.func("echo hello", runtime=runtime)
+
+        assert result == "[OK]\n\nhello"
+        assert events == [{
+            "type": "tool_progress", "name": "bash", "id": "call-1", "stream": "stdout", "content": "hello\n",
+        }]
+
+
+@pytest.mark.skipif(not sessions_supported(), reason="常驻 shell 仅支持 Unix")
+class TestShellSession:
+    """测试常驻 shell 会话"""
+
+    @pytest.fixture
+    def session(self, tmp_path):
+        session = ShellSession(str(tmp_path))
+        yield session
+        session.close()
+
+    def test_state_persists_between_commands(self, session, tmp_path):
+        (tmp_path / "sub").mkdir()
+        session.run("cd sub && export GREETING=hi")
+
+        result = session.run("pwd; echo $GREETING")
+
+        assert result.stdout == f"{tmp_path / 'sub'}\nhi\n"
+        assert session.spawn_count == 1
+
+    def test_exit_code_and_streams(self, session):
+        result = session.run("printf partial; echo oops >&2; false")
+
+        assert result.returncode == 1
+        assert result.stdout == "partial"
+        assert result.stderr == "oops\n"
+
+    def test_syntax_error_does_not_break_session(self, session):
+        result = session.run("echo 'unterminated")
+
+        assert result.returncode != 0
+        assert result.stderr
+        assert session.run("echo ok").stdout == "ok\n"
+        assert session.spawn_count == 1
+
+    def test_command_cannot_read_session_stdin(self, session):
+        result = session.run("read line; echo got=$line")
+
+        assert result.stdout == "got=\n"
+        assert session.run("echo next").stdout == "next\n"
+
+    def test_respawns_after_exit(self, session, tmp_path):
+        assert not session.run("cd /").shell_restarted
+
+        result = session.run("exit 3")
+
+        assert result.returncode == 3
+        restarted = session.run("pwd")
+        assert restarted.stdout == f"{tmp_path}\n"
+        assert restarted.shell_restarted
+        assert not session.run("pwd").shell_restarted
+        assert session.spawn_count == 2
+
+    def test_timeout_restarts_shell(self, session, tmp_path):
+        session.run("export KEPT=1")
+
+        result = session.run("echo started; sleep 5", timeout=0.5)
+
+        assert result.timed_out
+        assert result.returncode is None
+        assert result.stdout == "started\n"
+        assert result.duration < 4
+        assert session.run("echo ${KEPT:-reset}").stdout == "reset\n"
+
+    def test_streams_output(self, session):
+        chunks = []
+        result = session.run(
+            "echo first; sleep 0.3; echo second",
+            on_output=lambda stream, text: chunks.append((stream, text)),
+        )
+
+        # 第一行在命令结束前就已推送（结尾的换行可能与分隔标记一起等待确认）
+        assert chunks[0][0] == "stdout"
+        assert chunks[0][1].startswith("first") and "second" not in chunks[0][1]
+        assert "".join(t for s, t in chunks if s == "stdout") == result.stdout
+
+    def test_pool_evicts_least_recently_used(self, tmp_path):
+        pool = ShellSessionPool(max_sessions=2)
+        first = pool.get("a", str(tmp_path))
+        first.run("true")
+        pool.get("b", str(tmp_path))
+        pool.get("c", str(tmp_path))
+
+        assert len(pool) == 2
+        assert not first.alive
+        assert pool.get("b", str(tmp_path)) is not first
+        # 被淘汰的线程重新获取会话：第一条命令标记 shell 已重新启动
+        assert pool.get("a", str(tmp_path)).run("true").shell_restarted
+        assert not pool.get("d", str(tmp_path)).run("true").shell_restarted
+        pool.close()
+        assert len(pool) == 0
+
+    def test_running_command_survives_pool_overflow(self, tmp_path):
+        pool = ShellSessionPool(max_sessions=1)
+        busy = pool.get("a", str(tmp_path))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(busy.run, "sleep 1; echo done")
+            deadline = time.monotonic() + 5
+            while not busy.busy and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            # 正在执行命令的会话不被淘汰，池暂时超出上限；get 也不等待命令结束
+            start = time.monotonic()
+            pool.get("b", str(tmp_path))
+            assert time.monotonic() - start < 0.5
+            assert len(pool) == 2
+
+            # close() 同样不打断命令，只在命令结束后关闭
+            busy.close()
+            result = future.result(timeout=5)
+
+        assert result.returncode == 0
+        assert result.stdout == "done\n"
+        assert not busy.alive
+        # 命令结束后，下一次 get 淘汰空闲会话
+        pool.get("c", str(tmp_path))
+        assert len(pool) == 1
+        pool.close()
+
+    def test_bash_tool_uses_thread_session(self, tmp_path):
+        pool = ShellSessionPool()
+        runtime = MockRuntime(tmp_path)
+        runtime.context.shell_sessions = pool
+        runtime.config = {"configurable": {"thread_id": "t1"}}
+        (tmp_path / "sub").mkdir()
+
+        try:
+            bash.func("cd sub", runtime=runtime)
+            assert bash.func("pwd", runtime=runtime) == f"[OK]\n\n{tmp_path / 'sub'}"
+
+            runtime.config = {"configurable": {"thread_id": "t2"}}
+            assert bash.func("pwd", runtime=runtime) == f"[OK]\n\n{tmp_path}"
+
+            # shell 退出后重新启动：结果中提示之前的状态已失效
+            runtime.config = {"configurable": {"thread_id": "t1"}}
+            bash.func("exit", runtime=runtime)
+            result = bash.func("pwd", runtime=runtime)
+            assert result.startswith(f"[OK]\n\n{tmp_path}\n")
+            assert "a new shell was started" in result
+        finally:
+            pool.close()
+
+
+class TestLoadSkillTool:
+    """测试 load_skill 工具的未找到提示"""
+
+    def test_not_found_suggests_similar(self, tmp_path):
+        skill_dir = tmp_path / "news-extractor"
+        skill_dir.mkdir()
+        (skill_dir / "SKILL.md").write_text(
+            "---\nname: news-extractor\ndescription: d\n---\nbody\n", encoding="utf-8"
+        )
+        runtime = MockRuntime(tmp_path)
+        runtime.context.skill_loader = SkillLoader([tmp_path])
+
+        result = load_skill.func("news-extracter", runtime=runtime)
+
+        assert result == "Skill 'news-extracter' not found. Did you mean: news-extractor?"
+
+    def test_not_found_reply_is_bounded(self, tmp_path):
+        """大型 skill 库中未找到时只返回建议和数量，不列出全部名称"""
+        for i in range(500):
+            skill_dir = tmp_path / f"skill-{i:03d}-helper"
+            skill_dir.mkdir()
+            (skill_dir / "SKILL.md").write_text(
+                f"---\nname: skill-{i:03d}-helper\ndescription: d\n---\nbody\n", encoding="utf-8"
+            )
+        runtime = MockRuntime(tmp_path)
+        runtime.context.skill_loader = SkillLoader([tmp_path])
+
+        result = load_skill.func("skill-042-helpr", runtime=runtime)
+        assert "Did you mean: skill-042-helper" in result
+        assert result.count("skill-") <= 4
+        assert "more skill(s) installed; use search_skills(query)" in result
+        assert len(result) < 300
+
+        result = load_skill.func("kubernetes", runtime=runtime)
+        assert result == (
+            "Skill 'kubernetes' not found. 500 skill(s) installed; "
+            "use search_skills(query) to find one by keywords."
+        )
+
+    def _sectioned_runtime(self, tmp_path, names=("pdf-tools",)):
+        for name in names:
+            skill_dir = tmp_path / name
+            skill_dir.mkdir()
+            (skill_dir / "SKILL.md").write_text(
+                f"---\nname: {name}\ndescription: d\n---\n# {name}\n\n"
+                "## Installation\n\npip install x\n\n## Usage\n\nRun it.\n\n### Options\n\n--fast\n",
+                encoding="utf-8",
+            )
+        runtime = MockRuntime(tmp_path)
+        runtime.context.skill_loader = SkillLoader([tmp_path])
+        return runtime
+
+    def test_toc_lists_sections_with_tokens(self, tmp_path):
+        """toc=True 只返回目录"""
+        result = load_skill.func("pdf-tools", runtime=self._sectioned_runtime(tmp_path), toc=True)
+
+        assert "## Table of Contents" in result
+        assert "  - Usage (~" in result
+        assert "    - Options (~" in result
+        assert "pip install x" not in result
+
+    def test_toc_total_without_top_level_heading(self, tmp_path):
+        """只有 ## 标题的 skill，目录中的总 token 数仍按完整指令估算"""
+        skill_dir = tmp_path / "flat"
+        skill_dir.mkdir()
+        (skill_dir / "SKILL.md").write_text(
+            "---\nname: flat\ndescription: d\n---\n## Installation\n\npip install x\n\n## Usage\n\nRun it.\n",
+            encoding="utf-8",
+        )
+        runtime = MockRuntime(tmp_path)
+        runtime.context.skill_loader = SkillLoader([tmp_path])
+
+        result = load_skill.func("flat", runtime=runtime, toc=True)
+
+        total = estimate_tokens(runtime.context.skill_loader.load_skill("flat").instructions)
+        assert total > 0
+        assert f"## Table of Contents (~{total} tokens in full)" in result
+
+    def test_named_sections_only(self, tmp_path):
+        """sections 只返回指定章节（含子章节）"""
+        result = load_skill.func(
+            "pdf-tools", runtime=self._sectioned_runtime(tmp_path), sections=["usage", "Options"]
+        )
+
+        assert "Run it." in result
+        assert result.count("--fast") == 1
+        assert "pip install x" not in result
+
+    def test_missing_section_lists_available(self, tmp_path):
+        result = load_skill.func(
+            "pdf-tools", runtime=self._sectioned_runtime(tmp_path), sections=["Deploy"]
+        )
+
+        assert "Section(s) not found: Deploy" in result
+        assert "pdf-tools > Usage > Options" in result
+
+    def test_multiple_skills_with_prefixed_sections(self, tmp_path):
+        """逗号分隔多个 skill，skill#Section 只作用于对应 skill"""
+        runtime = self._sectioned_runtime(tmp_path, names=("pdf-tools", "news"))
+
+        result = load_skill.func(
+            "pdf-tools, news", runtime=runtime, sections=["pdf-tools#Installation", "Usage"]
+        )
+
+        pdf, news = result.split("\n---\n")
+        assert "pip install x" in pdf and "Run it." in pdf
+        assert "pip install x" not in news and "Run it." in news
+
+
+class TestSearchSkillsTool:
+    """测试 search_skills 工具"""
+
+    def _runtime(self, tmp_path):
+        for name, description in [("wechat-article", "提取微信公众号文章"), ("slides", "Generate slides")]:
+            skill_dir = tmp_path / name
+            skill_dir.mkdir()
+            (skill_dir / "SKILL.md").write_text(
+                f"---\nname: {name}\ndescription: {description}\n---\nbody\n", encoding="utf-8"
+            )
+        runtime = MockRuntime(tmp_path)
+        runtime.context.skill_loader = SkillLoader([tmp_path])
+        return runtime
+
+    def test_returns_matches(self, tmp_path):
+        result = search_skills.func("公众号", runtime=self._runtime(tmp_path))
+        assert "Found 1 skill(s)" in result
+        assert "- **wechat-article**: 提取微信公众号文章" in result
+        assert "slides" not in result
+
+    def test_no_match(self, tmp_path):
+        result = search_skills.func("database", runtime=self._runtime(tmp_path))
+        assert "No skills matched 'database'" in result
+
+
+class TestSearchReferencesTool:
+    """测试 search_references 工具"""
+
+    def test_returns_numbered_passages(self, tmp_path):
+        skill_dir = tmp_path / "api-client"
+        (skill_dir / "references").mkdir(parents=True)
+        (skill_dir / "SKILL.md").write_text(
+            "---\nname: api-client\ndescription: d\n---\nbody\n", encoding="utf-8"
+        )
+        doc = skill_dir / "references" / "api.md"
+        doc.write_text("# API\n\nRate limit is 100 requests per minute.\n", encoding="utf-8")
+        runtime = MockRuntime(tmp_path)
+        runtime.context.skill_loader = SkillLoader([tmp_path])
+
+        result = search_references.func("rate limit", runtime=runtime)
+
+        assert f"### {doc}:1-3 (api-client)" in result
+        assert "   3| Rate limit is 100 requests per minute." in result
+
+    def test_no_match(self, tmp_path):
+        runtime = MockRuntime(tmp_path)
+        runtime.context.skill_loader = SkillLoader([tmp_path])
+
+        result = search_references.func("anything", runtime=runtime, skill_name="x")
+
+        assert "No reference passages matched 'anything' in skill 'x'" in result
+
+
 class TestReadFileTool:
     """测试 read_file 工具的路径处理"""
 
@@ -135,6 +613,535 @@ class TestReadFileTool:
         assert "Hello World" in content
 
 
+class TestPagedReadFile:
+    """测试 read_file 的分页读取"""
+
+    @pytest.fixture
+    def log_file(self, tmp_path, monkeypatch):
+        # 缩小索引块，让少量数据也能覆盖多个检查点
+        monkeypatch.setattr(file_reader, "INDEX_BLOCK_BYTES", 64)
+        path = tmp_path / "app.log"
+        path.write_text("".join(f"line {i}\n" for i in range(1, 1001)), encoding="utf-8")
+        return path
+
+    def test_offset_and_limit(self, log_file):
+        runtime = MockRuntime(log_file.parent)
+
+        result = read_file.func("app.log", runtime=runtime, offset=500, limit=3)
+
+        assert result.splitlines() == [
+            " 500| line 500",
+            " 501| line 501",
+            " 502| line 502",
+            "... (more lines; continue with offset=503)",
+        ]
+
+    def test_line_index_matches_full_scan(self, log_file):
+        for offset in (1, 63, 64, 65, 999, 1000):
+            page = file_reader.read_lines(log_file, offset, 2)
+            assert page.lines[0] == (offset, f"line {offset}")
+        assert file_reader.read_lines(log_file, 1001, 2).lines == []
+
+    def test_default_reads_first_page_and_reports_total(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("".join(f"{i}\n" for i in range(2500)), encoding="utf-8")
+        runtime = MockRuntime(tmp_path)
+
+        lines = read_file.func("a.txt", runtime=runtime).splitlines()
+
+        assert len(lines) == 2001
+        # 文件在一个索引块内，已扫描到末尾，给出剩余行数
+        assert lines[-1] == "... (500 more lines; continue with offset=2001)"
+        tail_page = read_file.func("a.txt", runtime=runtime, offset=2001, limit=100)
+        assert tail_page.splitlines()[-1] == "... (400 more lines; continue with offset=2101)"
+
+    def test_tail(self, log_file):
+        runtime = MockRuntime(log_file.parent)
+
+        result = read_file.func("app.log", runtime=runtime, tail=2)
+
+        assert result == " 999| line 999\n1000| line 1000"
+
+    def test_past_end_and_empty(self, log_file, tmp_path):
+        runtime = MockRuntime(tmp_path)
+        (tmp_path / "empty.txt").write_text("")
+
+        assert "past the end of the file (1000 lines)" in read_file.func("app.log", runtime=runtime, offset=5000)
+        assert read_file.func("empty.txt", runtime=runtime) == "(empty file)"
+
+    def test_byte_range(self, log_file):
+        runtime = MockRuntime(log_file.parent)
+
+        result = read_file.func("app.log", runtime=runtime, byte_offset=0, byte_length=14)
+
+        assert result == f"[bytes 0-14 of {log_file.stat().st_size}] (continue with byte_offset=14)\nline 1\nline 2\n"
+        assert read_file.func("app.log", runtime=runtime, byte_offset=-10).endswith("line 1000\n")
+
+    def test_binary_and_long_lines(self, tmp_path):
+        runtime = MockRuntime(tmp_path)
+        (tmp_path / "bin.dat").write_bytes(b"\x00\x01\x02")
+        (tmp_path / "min.js").write_text("x" * 10000, encoding="utf-8")
+
+        assert "binary" in read_file.func("bin.dat", runtime=runtime)
+        result = read_file.func("min.js", runtime=runtime)
+        assert "line truncated, 10000 bytes in total" in result
+        assert len(result) < 5000
+
+    def test_index_rebuilt_after_change(self, log_file):
+        assert file_reader.read_lines(log_file, 1, 1).lines == [(1, "line 1")]
+
+        log_file.write_text("changed\n", encoding="utf-8")
+
+        assert file_reader.read_lines(log_file, 1, 1).lines == [(1, "changed")]
+
+
+class TestReadCache:
+    """测试 read_file 的按线程读取缓存"""
+
+    @pytest.fixture
+    def runtime(self, tmp_path):
+        runtime = MockRuntime(tmp_path)
+        runtime.context.read_cache = ReadCache()
+        runtime.config = {"configurable": {"thread_id": "t-1"}}
+        runtime.state = {"messages": [HumanMessage(content="hi")]}
+        return runtime
+
+    @pytest.fixture
+    def source(self, tmp_path):
+        path = tmp_path / "main.py"
+        path.write_text("".join(f"value_{i} = {i}\n" for i in range(1, 41)), encoding="utf-8")
+        return path
+
+    def test_unchanged_reread_returns_notice(self, runtime, source):
+        first = read_file.func("main.py", runtime=runtime)
+        runtime.state["messages"].append(HumanMessage(content="again"))
+
+        second = read_file.func("main.py", runtime=runtime)
+
+        assert "value_40 = 40" in first
+        assert second.startswith("[Unchanged] main.py has not changed since turn 1")
+        # 不同的范围单独记录
+        assert "value_5 = 5" in read_file.func("main.py", runtime=runtime, offset=5, limit=1)
+
+    def test_threads_are_independent(self, runtime, source):
+        read_file.func("main.py", runtime=runtime)
+        runtime.config = {"configurable": {"thread_id": "t-2"}}
+
+        assert "value_1 = 1" in read_file.func("main.py", runtime=runtime)
+
+    def test_small_change_returns_diff_with_file_line_numbers(self, runtime, source):
+        read_file.func("main.py", runtime=runtime, offset=11, limit=20)
+        text = source.read_text(encoding="utf-8").replace("value_20 = 20", "value_20 = 200")
+        source.write_text(text, encoding="utf-8")
+
+        result = read_file.func("main.py", runtime=runtime, offset=11, limit=20)
+
+        lines = result.splitlines()
+        assert lines[0].startswith("[Changed] main.py changed since turn 1")
+        assert "@@ -18,5 +18,5 @@" in lines
+        assert "-value_20 = 20" in lines and "+value_20 = 200" in lines
+        assert lines[-1] == "... (10 more lines; continue with offset=31)"
+
+    def test_large_change_returns_full_content(self, runtime, source):
+        read_file.func("main.py", runtime=runtime)
+        source.write_text("".join(f"other_{i}\n" for i in range(40)), encoding="utf-8")
+
+        result = read_file.func("main.py", runtime=runtime)
+
+        assert result.startswith("   1| other_0")
+
+    def test_edit_invalidates_even_when_stamp_is_unchanged(self, runtime, source):
+        read_file.func("main.py", runtime=runtime)
+        st = source.stat()
+
+        edit.func("main.py", "value_3 = 3", "value_3 = 9", runtime=runtime)
+        # 模拟 mtime 精度较粗：修改后文件状态与上次读取时相同
+        os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+        result = read_file.func("main.py", runtime=runtime)
+        assert "+value_3 = 9" in result
+
+    def test_bash_invalidates_thread_records(self, runtime, source):
+        read_file.func("main.py", runtime=runtime)
+        bash.func("true", runtime=runtime)
+
+        # 记录失效后重新读取，内容未变时仍返回提示
+        assert read_file.func("main.py", runtime=runtime).startswith("[Unchanged]")
+        record = runtime.context.read_cache.get("t-1", (str(source), "lines", 1, 2000))
+        assert record.stamp is not None
+
+    def test_disabled_without_cache(self, source):
+        runtime = MockRuntime(source.parent)
+
+        read_file.func("main.py", runtime=runtime)
+
+        assert "value_1 = 1" in read_file.func("main.py", runtime=runtime)
+
+    def test_cache_bounds(self):
+        cache = ReadCache(max_threads=2, max_entries=2)
+        record = ReadRecord((1, 1), 1, 1, ("a",))
+        for thread in ("a", "b", "c"):
+            for key in ("x", "y", "z"):
+                cache.put(thread, (key,), record)
+
+        assert cache.get("a", ("z",)) is None
+        assert cache.get("c", ("x",)) is None
+        assert cache.get("c", ("z",)) == record
+
+
+class TestGrepSearch:
+    """测试 grep 的文件搜索"""
+
+    @pytest.fixture
+    def tree(self, tmp_path):
+        (tmp_path / "src" / "pkg").mkdir(parents=True)
+        (tmp_path / "src" / "main.py").write_text(
+            "import os\n\ndef main():\n    return os.getcwd()\n\nclass Main:\n    pass\n", encoding="utf-8",
+        )
+        (tmp_path / "src" / "pkg" / "util.py").write_text(
+            "def helper(x):\n    return x  # main helper\n中文 main\n", encoding="utf-8",
+        )
+        (tmp_path / "node_modules" / "lib").mkdir(parents=True)
+        (tmp_path / "node_modules" / "lib" / "index.js").write_text("main()\n", encoding="utf-8")
+        (tmp_path / ".hidden").mkdir()
+        (tmp_path / ".hidden" / "main.txt").write_text("main\n", encoding="utf-8")
+        (tmp_path / "image.bin").write_bytes(b"\x89PNG\0\0main\n")
+        return tmp_path
+
+    @staticmethod
+    def _reference(pattern: str, files) -> list:
+        """逐行匹配的参考实现"""
+        regex = re.compile(pattern)
+        found = []
+        for path in files:
+            lines = path.read_text(encoding="utf-8", errors="ignore").split("\n")
+            found.extend((path, n, line) for n, line in enumerate(lines, 1) if regex.search(line))
+        return found
+
+    def test_walk_prunes_ignored_directories(self, tree):
+        files = [p.relative_to(tree).as_posix() for p in file_search.iter_files(tree)]
+
+        assert files == ["image.bin", "src/main.py", "src/pkg/util.py"]
+
+    @pytest.mark.parametrize("pattern", [
+        "main", "中文", r"^def \w+", r"\)$", r"(?i)MAIN", r"x\s*#", r"^$", "", r"(?<=def )\w+", r"pass\Z",
+        r"os\.\w+\(\)", r"a\sb|[Cc]lass", r"foo$", r"^foo", r"n\s*+$", r"(?>n\s*)$", r"\w++\($",
+    ])
+    def test_matches_line_by_line_search(self, tree, pattern):
+        # CRLF 和单独的 \r 按通用换行处理（与 read_text 一致）
+        (tree / "src" / "crlf.txt").write_bytes(b"foo\r\nmain(\r\nin  \r\nfoo\rbar foo\r\n")
+        files = [tree / "src" / "main.py", tree / "src" / "pkg" / "util.py", tree / "src" / "crlf.txt"]
+
+        result = file_search.search_files(file_search.Matcher(pattern), files, max_results=1000)
+
+        assert result.matches == self._reference(pattern, files)
+        assert result.files_searched == 3
+
+    def test_skips_binary_files(self, tree):
+        result = file_search.search("main", tree)
+
+        assert {p.name for p, _, _ in result.matches} == {"main.py", "util.py"}
+        assert result.files_searched == 2
+
+    def test_stops_at_max_results_in_walk_order(self, tmp_path):
+        for i in range(40):
+            (tmp_path / f"f{i:02d}.txt").write_text("hit\n" * 3, encoding="utf-8")
+
+        result = file_search.search("hit", tmp_path, max_results=10)
+
+        assert result.truncated
+        assert [(p.name, n) for p, n, _ in result.matches][:4] == [
+            ("f00.txt", 1), ("f00.txt", 2), ("f00.txt", 3), ("f01.txt", 1),
+        ]
+        assert len(result.matches) == 10
+        assert result.files_searched < 40
+
+    def test_parallel_search_matches_sequential_order(self, tmp_path, monkeypatch):
+        for i in range(30):
+            (tmp_path / f"d{i % 3}").mkdir(exist_ok=True)
+            (tmp_path / f"d{i % 3}" / f"f{i:02d}.txt").write_text("a\nhit\n" * (i % 4), encoding="utf-8")
+        executor = ThreadPoolExecutor(max_workers=4)
+        monkeypatch.setattr(file_search, "_get_executor", lambda: (executor, 4))
+        monkeypatch.setattr(file_search, "FILES_PER_TASK", 2)
+        matcher = file_search.Matcher("hit")
+
+        try:
+            for limit in (5, 1000):
+                files = list(file_search.iter_files(tmp_path))
+                parallel = file_search.search_files(matcher, files, limit)
+                sequential = file_search.search_files(matcher, files, limit, parallel=False)
+                assert parallel.matches == sequential.matches
+                assert parallel.truncated == sequential.truncated == (limit == 5)
+        finally:
+            executor.shutdown()
+
+    def test_grep_tool_output(self, tree):
+        runtime = MockRuntime(tree)
+
+        result = grep.func(r"def \w+", ".", runtime=runtime)
+
+        assert result == "[OK]\n\nsrc/main.py:3: def main():\nsrc/pkg/util.py:1: def helper(x):"
+        assert grep.func("nothing_here", "src", runtime=runtime) == (
+            "No matches found for pattern: nothing_here (searched 2 files)"
+        )
+        assert grep.func("(", ".", runtime=runtime).startswith("[FAILED] Invalid regex pattern")
+
+
+class TestTrigramIndex:
+    """测试 grep 的三元组索引"""
+
+    PATTERNS = [
+        "helper", "main", r"def \w+\(", r"(?i)HELPER", "Kelvin", r"(?i)kelvin", "中文", r"retur?n x",
+        r"foo|main\(", r"(main|helper)_v2", r"\w+", "needle", r"(?i:MAIN)", r"ab{2,}c",
+    ]
+
+    @pytest.fixture
+    def tree(self, tmp_path):
+        (tmp_path / "src" / "pkg").mkdir(parents=True)
+        (tmp_path / "src" / "main.py").write_text(
+            "import os\n\ndef main():\n    return os.getcwd()\n# Kelvin and main_v2\n", encoding="utf-8",
+        )
+        (tmp_path / "src" / "pkg" / "util.py").write_text(
+            "def helper(x):\n    return x  # main helper\n中文 main abbbc\n", encoding="utf-8",
+        )
+        (tmp_path / "src" / "latin1.txt").write_bytes(b"nee\xffdle\n")
+        (tmp_path / "node_modules").mkdir()
+        (tmp_path / "node_modules" / "x.js").write_text("helper\n", encoding="utf-8")
+        (tmp_path / ".cache").mkdir()
+        (tmp_path / ".cache" / "helper.txt").write_text("helper\n", encoding="utf-8")
+        (tmp_path / "blob.bin").write_bytes(b"\0helper\n")
+        return tmp_path
+
+    @staticmethod
+    def _index(root, use_inotify=False):
+        index = TrigramIndex(root, use_inotify=use_inotify)
+        index.build()
+        assert index.ready
+        return index
+
+    @staticmethod
+    def _assert_same(index, root, pattern):
+        matcher = file_search.Matcher(pattern)
+        expected = file_search.search_files(matcher, file_search.iter_files(root), 1000, parallel=False)
+        result = index.search(matcher, root, 1000)
+        if result is not None:
+            assert result.matches == expected.matches
+            assert result.files_searched == expected.files_searched
+        return result
+
+    def test_plan_query(self):
+        assert plan_query("def main") == b"def main"
+        assert plan_query(r"Foo\w+Bar") == ("and", [b"foo", b"bar"])
+        assert plan_query(r"foo|ba") is None
+        assert plan_query(r"(?i)kelvin") == b"elv"
+        assert plan_query(r"\w+\s*=") is None
+
+    @pytest.mark.parametrize("pattern", PATTERNS)
+    def test_results_match_full_scan(self, tree, pattern):
+        index = self._index(tree)
+
+        self._assert_same(index, tree, pattern)
+        self._assert_same(index, tree / "src" / "pkg", pattern)
+
+    def test_unsupported_queries_fall_back(self, tree):
+        index = self._index(tree)
+
+        assert index.search(file_search.Matcher(r"\w+"), tree) is None
+        assert index.search(file_search.Matcher("helper"), tree / ".cache") is None
+        assert index.search(file_search.Matcher("helper"), tree / "node_modules") is None
+        assert self._assert_same(index, tree, "helper") is not None
+
+    @pytest.mark.parametrize("use_inotify", [False, pytest.param(True, marks=pytest.mark.skipif(
+        not inotify_available(), reason="inotify not available"))])
+    def test_incremental_updates(self, tree, use_inotify):
+        index = self._index(tree, use_inotify)
+        index.search(file_search.Matcher("helper"), tree)
+        read = index.files_read
+
+        (tree / "src" / "main.py").write_text("def helper_two():\n    pass\n", encoding="utf-8")
+        (tree / "src" / "new").mkdir()
+        (tree / "src" / "new" / "added.py").write_text("helper = 1\n", encoding="utf-8")
+        (tree / "src" / "pkg" / "util.py").unlink()
+
+        result = self._assert_same(index, tree, "helper")
+        assert [p.name for p, _, _ in result.matches] == ["main.py", "added.py"]
+        # 只重新读取变化的文件
+        assert index.files_read == read + 2
+
+        (tree / "src" / "new" / "later.py").write_text("helper = 2\n", encoding="utf-8")
+        result = self._assert_same(index, tree, "helper")
+        assert [p.name for p, _, _ in result.matches] == ["main.py", "added.py", "later.py"]
+        index.close()
+
+    def test_invalidate_rereads_file_with_same_stamp(self, tree):
+        index = self._index(tree)
+        path = tree / "src" / "pkg" / "util.py"
+        st = path.stat()
+
+        path.write_text(path.read_text(encoding="utf-8").replace("helper", "zipper"), encoding="utf-8")
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        index.invalidate(path)
+
+        assert [p.name for p, _, _ in self._assert_same(index, tree, "zipper").matches] == ["util.py", "util.py"]
+
+    def test_persisted_index_only_rereads_changed_files(self, tree, tmp_path_factory):
+        cache_dir = tmp_path_factory.mktemp("index")
+        index = TrigramIndex(tree, cache_dir=cache_dir, use_inotify=False)
+        index.build()
+        assert index.cache_path.exists()
+
+        (tree / "src" / "main.py").write_text("helper()\n", encoding="utf-8")
+        reloaded = TrigramIndex(tree, cache_dir=cache_dir, use_inotify=False)
+        reloaded.build()
+
+        assert reloaded.files_read == 1
+        for pattern in self.PATTERNS:
+            self._assert_same(reloaded, tree, pattern)
+
+    def test_grep_tool_uses_index(self, tree):
+        runtime = MockRuntime(tree)
+        expected = grep.func("helper", ".", runtime=runtime)
+        runtime.context.grep_index = self._index(tree)
+
+        assert grep.func("helper", ".", runtime=runtime) == expected
+        edit.func("src/pkg/util.py", "def helper(x):", "def zipper(x):", runtime=runtime)
+        assert grep.func("zipper", "src", runtime=runtime) == "[OK]\n\nsrc/pkg/util.py:1: def zipper(x):"
+
+
+class TestTreeSnapshot:
+    """测试 glob / grep / list_dir 共用的目录树快照"""
+
+    GLOB_PATTERNS = ["*.py", "**/*.py", "src/*", "src/**/*.py", "**/pkg/*", "src/p?g/[a-m]*.py", "*/*/*"]
+
+    @pytest.fixture(params=[False, pytest.param(True, marks=pytest.mark.skipif(
+        shutil.which("git") is None, reason="git not available"))], ids=["gitignore", "git"])
+    def tree(self, request, tmp_path):
+        if request.param:
+            subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+        (tmp_path / ".gitignore").write_text("build/\n*.log\n/out.txt\n", encoding="utf-8")
+        (tmp_path / "src" / "pkg").mkdir(parents=True)
+        (tmp_path / "src" / ".gitignore").write_text("generated_*\n!keep.log\n", encoding="utf-8")
+        (tmp_path / "src" / "main.py").write_text("def main():\n    pass\n", encoding="utf-8")
+        (tmp_path / "src" / "keep.log").write_text("main\n", encoding="utf-8")
+        (tmp_path / "src" / "generated_api.py").write_text("def main():\n    pass\n", encoding="utf-8")
+        (tmp_path / "src" / "pkg" / "util.py").write_text("import main\n", encoding="utf-8")
+        (tmp_path / "src" / "pkg" / "out.txt").write_text("main\n", encoding="utf-8")
+        (tmp_path / "build" / "lib").mkdir(parents=True)
+        (tmp_path / "build" / "lib" / "main.py").write_text("def main():\n    pass\n", encoding="utf-8")
+        (tmp_path / "node_modules").mkdir()
+        (tmp_path / "node_modules" / "main.js").write_text("main\n", encoding="utf-8")
+        (tmp_path / "run.log").write_text("main\n", encoding="utf-8")
+        (tmp_path / "out.txt").write_text("main\n", encoding="utf-8")
+        (tmp_path / "setup.py").write_text("main\n", encoding="utf-8")
+        return tmp_path
+
+    @staticmethod
+    def _files(snapshot, base):
+        return [Path(key).relative_to(snapshot.root).as_posix() for key in snapshot.files(base)]
+
+    def test_files_honor_gitignore(self, tree):
+        snapshot = TreeSnapshot(tree, use_git=(tree / ".git").exists())
+
+        assert self._files(snapshot, tree) == [
+            "setup.py", "src/keep.log", "src/main.py", "src/pkg/out.txt", "src/pkg/util.py",
+        ]
+        assert snapshot.git == (tree / ".git").exists()
+        assert self._files(snapshot, tree / "src" / "pkg") == ["src/pkg/out.txt", "src/pkg/util.py"]
+        # 被忽略的目录不在快照中，由调用方直接遍历
+        assert snapshot.files(tree / "build") is None
+        assert snapshot.files(tree / "node_modules") is None
+        assert ("build", True) in snapshot.entries(tree)
+
+    @pytest.mark.parametrize("pattern", GLOB_PATTERNS)
+    def test_glob_matches_pathlib(self, tmp_path, pattern):
+        (tmp_path / "src" / "pkg" / "sub").mkdir(parents=True)
+        for name in ["setup.py", "README.md", "src/main.py", "src/pkg/app.py", "src/pkg/zed.py", "src/pkg/sub/deep.py"]:
+            (tmp_path / name).write_text("x\n", encoding="utf-8")
+        snapshot = TreeSnapshot(tmp_path, use_git=False)
+
+        expected = [path.relative_to(tmp_path).as_posix() for path in sorted(tmp_path.glob(pattern))]
+        assert snapshot.glob(pattern, tmp_path) == expected
+
+    def test_glob_excludes_ignored_paths(self, tree):
+        snapshot = TreeSnapshot(tree, use_git=(tree / ".git").exists())
+
+        assert snapshot.glob("**/*.py", tree) == ["setup.py", "src/main.py", "src/pkg/util.py"]
+        assert snapshot.glob("**/*.log", tree) == ["src/keep.log"]
+        # 指向被忽略或隐藏的路径、不含通配符时由调用方使用 Path.glob
+        assert snapshot.glob("build/**/*.py", tree) is None
+        assert snapshot.glob(".git*", tree) is None
+        assert snapshot.glob("run.log", tree) is None
+
+    def test_only_changed_directories_are_rescanned(self, tree, monkeypatch):
+        monkeypatch.setattr(tree_snapshot, "RACY_WINDOW_NS", 0)
+        snapshot = TreeSnapshot(tree, use_git=(tree / ".git").exists())
+        snapshot.files(tree)
+        scans = snapshot.scans
+
+        assert snapshot.glob("**/*.py", tree) is not None
+        assert snapshot.entries(tree / "src") is not None
+        assert snapshot.scans == scans
+
+        (tree / "src" / "pkg" / "added.py").write_text("main\n", encoding="utf-8")
+        (tree / "src" / "new").mkdir()
+        (tree / "src" / "new" / "more.py").write_text("main\n", encoding="utf-8")
+        (tree / "src" / "pkg" / "out.txt").unlink()
+
+        assert self._files(snapshot, tree / "src") == [
+            "src/keep.log", "src/main.py", "src/new/more.py", "src/pkg/added.py", "src/pkg/util.py",
+        ]
+        # src、src/pkg 和新目录 src/new
+        assert snapshot.scans == scans + 3
+
+        shutil.rmtree(tree / "src" / "new")
+        assert snapshot.files(tree / "src" / "new") is None
+        assert "src/new/more.py" not in self._files(snapshot, tree)
+
+    def test_gitignore_change_rebuilds(self, tree):
+        snapshot = TreeSnapshot(tree, use_git=(tree / ".git").exists())
+        assert "setup.py" in self._files(snapshot, tree)
+
+        with open(tree / ".gitignore", "a", encoding="utf-8") as f:
+            f.write("setup.py\n")
+        (tree / "src" / "pkg" / ".gitignore").write_text("*.txt\n", encoding="utf-8")
+
+        assert self._files(snapshot, tree) == ["src/keep.log", "src/main.py", "src/pkg/util.py"]
+
+    def test_parse_gitignore(self):
+        rules = tree_snapshot.parse_gitignore("# comment\n\n*.pyc\n!keep.pyc\n/dist\ndocs/**/tmp\nlogs/\n\\#notes\n", "sub")
+
+        def ignored(rel, is_dir=False):
+            matched = [rule for rule in rules if rule.matches(rel, is_dir)]
+            return bool(matched) and not matched[-1].negate
+
+        assert ignored("sub/a/b.pyc")
+        assert not ignored("sub/keep.pyc")
+        assert ignored("sub/dist") and not ignored("sub/a/dist")
+        assert ignored("sub/docs/tmp") and ignored("sub/docs/a/b/tmp")
+        assert ignored("sub/a/logs", is_dir=True) and not ignored("sub/a/logs")
+        assert ignored("sub/#notes")
+
+    def test_tools_use_snapshot(self, tree):
+        runtime = MockRuntime(tree)
+        listing = list_dir.func(".", runtime=runtime)
+        runtime.context.tree_snapshot = TreeSnapshot(tree, use_git=(tree / ".git").exists())
+
+        assert glob.func("**/*.py", runtime=runtime) == "[OK]\n\nsetup.py\nsrc/main.py\nsrc/pkg/util.py"
+        assert grep.func("^def main", ".", runtime=runtime) == "[OK]\n\nsrc/main.py:1: def main():"
+        # 显式指定被忽略的目录时直接遍历
+        assert glob.func("build/**/*.py", runtime=runtime) == "[OK]\n\nbuild/lib/main.py"
+        assert grep.func("^def main", "build", runtime=runtime) == "[OK]\n\nbuild/lib/main.py:1: def main():"
+        assert list_dir.func(".", runtime=runtime) == listing
+        assert list_dir.func("build", runtime=runtime) == "[OK]\n\n📁 lib/"
+
+        # 使用快照的索引与快照的遍历结果一致
+        expected = grep.func("main", ".", runtime=runtime)
+        runtime.context.grep_index = TrigramIndex(tree, use_inotify=False, snapshot=runtime.context.tree_snapshot)
+        runtime.context.grep_index.build()
+        assert grep.func("main", ".", runtime=runtime) == expected
+        assert "run.log" not in expected and "src/keep.log" in expected
+
+
 class TestWriteFileTool:
     """测试 write_file 工具的路径处理"""
 
@@ -156,6 +1163,189 @@ class TestWriteFileTool:
         assert path.read_text() == "Deep content"
 
 
+class TestAsyncTools:
+    """测试工具的异步版本"""
+
+    def test_all_tools_have_coroutines(self):
+        from langchain_skills.tools import ALL_TOOLS
+
+        assert all(t.coroutine is not None for t in ALL_TOOLS)
+
+    def test_arun_command_streams_and_times_out(self, tmp_path):
+        chunks = []
+
+        async def main():
+            ok = await arun_command(
+                "echo first; sleep 0.3; echo oops >&2; exit 3",
+                str(tmp_path),
+                on_output=lambda stream, text: chunks.append((stream, text)),
+            )
+            slow = await arun_command("echo started; sleep 5", str(tmp_path), timeout=0.5)
+            return ok, slow
+
+        ok, slow = asyncio.run(main())
+
+        assert ok.returncode == 3
+        assert ok.stdout == "first\n"
+        assert ok.stderr == "oops\n"
+        assert chunks[0] == ("stdout", "first\n")
+        assert slow.timed_out and slow.returncode is None
+        assert slow.stdout == "started\n"
+        assert slow.duration < 4
+
+    @pytest.mark.skipif(os.name == "nt", reason="POSIX process groups only")
+    def test_arun_command_cancel_kills_process_group(self, tmp_path):
+        pid_file = tmp_path / "child.pid"
+
+        async def main():
+            task = asyncio.create_task(arun_command(f"sleep 30 & echo $! > {pid_file}; wait", str(tmp_path)))
+            pid = await asyncio.to_thread(wait_for_file, pid_file)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return int(pid)
+
+        pid = asyncio.run(main())
+
+        deadline = time.monotonic() + 5
+        while process_alive(pid) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not process_alive(pid)
+
+    def test_arun_command_runs_concurrently(self, tmp_path):
+        async def main():
+            return await asyncio.gather(*(arun_command("sleep 0.5", str(tmp_path)) for _ in range(20)))
+
+        start = time.monotonic()
+        results = asyncio.run(main())
+
+        assert all(r.returncode == 0 for r in results)
+        assert time.monotonic() - start < 5
+
+    def test_async_bash_matches_sync(self, tmp_path):
+        events = []
+        runtime = MockRuntime(tmp_path)
+        runtime.stream_writer = events.append
+        runtime.tool_call_id = "call-1"
+
+        result = asyncio.run(bash.coroutine("echo hello; false", runtime=runtime))
+
+        assert result == bash.func("echo hello; false", runtime=MockRuntime(tmp_path))
+        assert result == "[FAILED] Exit code: 1\n\nhello"
+        assert events[0]["id"] == "call-1"
+
+    def test_async_file_tools_match_sync(self, tmp_path):
+        runtime = MockRuntime(tmp_path)
+
+        written = asyncio.run(write_file.coroutine("a.txt", "one\ntwo\n", runtime=runtime))
+
+        assert written.startswith("[Success]")
+        assert asyncio.run(read_file.coroutine("a.txt", runtime=runtime)) == read_file.func("a.txt", runtime=runtime)
+        assert asyncio.run(grep.coroutine("two", ".", runtime=runtime)) == "[OK]\n\na.txt:2: two"
+        assert asyncio.run(list_dir.coroutine(".", runtime=runtime)) == list_dir.func(".", runtime=runtime)
+
+    def test_async_load_skill_matches_sync(self, tmp_path):
+        for name in ("alpha", "beta"):
+            skill_dir = tmp_path / name
+            skill_dir.mkdir()
+            (skill_dir / "SKILL.md").write_text(
+                f"---\nname: {name}\ndescription: d\n---\n# {name}\n\n## Usage\n\nRun {name}.\n",
+                encoding="utf-8",
+            )
+        runtime = MockRuntime(tmp_path)
+        runtime.context.skill_loader = SkillLoader([tmp_path])
+
+        result = asyncio.run(load_skill.coroutine("alpha, beta, gamma", runtime=runtime, sections=["Usage"]))
+
+        assert result == load_skill.func("alpha, beta, gamma", runtime=runtime, sections=["Usage"])
+        assert "Run alpha." in result and "Run beta." in result
+        assert "Skill 'gamma' not found." in result
+
+
+class TestToolConcurrency:
+    """测试并行工具调用的加锁策略"""
+
+    def _request(self, tool, args, thread_id="t1"):
+        runtime = Mock()
+        runtime.config = {"configurable": {"thread_id": thread_id}}
+        return ToolCallRequest(
+            tool_call={"name": tool.name, "args": args, "id": "call"},
+            tool=tool,
+            state={},
+            runtime=runtime,
+        )
+
+    def test_lock_keys(self, tmp_path):
+        middleware = ToolConcurrencyMiddleware(tmp_path)
+
+        assert middleware.lock_key(self._request(read_file, {"file_path": "a.txt"})) is None
+        assert middleware.lock_key(self._request(grep, {"pattern": "x", "path": "."})) is None
+        assert middleware.lock_key(self._request(write_file, {"file_path": "a.txt"})) == f"path:{tmp_path / 'a.txt'}"
+        # 相对路径与绝对路径指向同一文件时使用同一把锁
+        assert middleware.lock_key(self._request(edit, {"file_path": str(tmp_path / "a.txt")})) == \
+            middleware.lock_key(self._request(write_file, {"file_path": "a.txt"}))
+        assert middleware.lock_key(self._request(bash, {"command": "ls"})) == "thread:t1"
+
+    def _max_overlap(self, middleware, requests):
+        """并发执行 requests，返回同时执行的最大调用数"""
+        active = 0
+        peak = 0
+        guard = threading.Lock()
+
+        def handler(request):
+            nonlocal active, peak
+            with guard:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with guard:
+                active -= 1
+            return request.tool_call["id"]
+
+        threads = [threading.Thread(target=middleware.wrap_tool_call, args=(r, handler)) for r in requests]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return peak
+
+    def test_writes_to_same_path_are_serialized(self, tmp_path):
+        middleware = ToolConcurrencyMiddleware(tmp_path)
+
+        same = [self._request(edit, {"file_path": "a.txt"}) for _ in range(4)]
+        different = [self._request(edit, {"file_path": f"{i}.txt"}) for i in range(4)]
+        reads = [self._request(read_file, {"file_path": "a.txt"}) for _ in range(4)]
+
+        assert self._max_overlap(middleware, same) == 1
+        assert self._max_overlap(middleware, different) > 1
+        assert self._max_overlap(middleware, reads) > 1
+        # 锁在无人使用后释放
+        assert len(middleware._thread_locks) == 0
+
+    def test_async_writes_to_same_path_are_serialized(self, tmp_path):
+        middleware = ToolConcurrencyMiddleware(tmp_path)
+        order = []
+
+        async def handler(request):
+            order.append(("start", request.tool_call["args"]["file_path"]))
+            await asyncio.sleep(0.05)
+            order.append(("end", request.tool_call["args"]["file_path"]))
+
+        async def main():
+            await asyncio.gather(*(
+                middleware.awrap_tool_call(self._request(write_file, {"file_path": p}), handler)
+                for p in ("a.txt", "a.txt", "b.txt")
+            ))
+
+        asyncio.run(main())
+
+        a_events = [kind for kind, path in order if path == "a.txt"]
+        assert a_events == ["start", "end", "start", "end"]
+        # 不同文件的写入仍并发执行
+        assert order.index(("start", "b.txt")) < order.index(("end", "a.txt"))
+        assert len(middleware._async_locks) == 0
+
+
 class TestOutputFormatIntegration:
     """测试输出格式与 formatter 的集成"""
 
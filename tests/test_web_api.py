@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import json
-from typing import Iterator
+from typing import AsyncIterator, Iterator
 
 from fastapi.testclient import TestClient
 
@@ -36,6 +36,14 @@ class FakeAgent:
         yield {"type": "done", "response": "Done."}
 
 
+class FakeAsyncAgent(FakeAgent):
+    """Test double that also exposes the native async stream."""
+
+    async def astream_events(self, message: str, thread_id: str = "default") -> AsyncIterator[dict]:
+        yield {"type": "text", "content": f"async:{thread_id}"}
+        yield {"type": "done", "response": "async"}
+
+
 def _read_sse_text(client: TestClient, url: str) -> str:
     with client.stream("GET", url) as response:
         assert response.status_code == 200
@@ -99,6 +107,17 @@ def test_chat_stream_endpoint_wraps_errors_as_error_event():
     assert "boom" in text
 
 
+def test_chat_stream_prefers_async_stream():
+    app = create_app(agent_provider=FakeAsyncAgent)
+    client = TestClient(app)
+
+    text = _read_sse_text(client, "/api/chat/stream?message=hello&thread_id=t-2")
+
+    assert '"content": "async:t-2"' in text
+    assert "event: done" in text
+    assert "event: thinking" not in text
+
+
 def test_chat_stream_requires_message():
     app = create_app(agent_provider=FakeAgent)
     client = TestClient(app)
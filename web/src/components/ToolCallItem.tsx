@@ -3,6 +3,7 @@ import { memo } from "react";
 import type { ToolCallView } from "../state/chatReducer";
 
 const MAX_VISIBLE_LINES = 12;
+const MAX_PROGRESS_LINES = 8;
 
 type ToolCallItemProps = {
   assistantId: string;
@@ -67,6 +68,16 @@ function linesWithTreePrefix(content: string, expanded: boolean): {
   return { lines: prefixed, hiddenCount, totalLines: rawLines.length };
 }
 
+function progressTail(progress: string): string {
+  // Progress bars rewrite the current line with \r; keep the last rewrite only.
+  const lines = progress
+    .trimEnd()
+    .split("\n")
+    .map((line) => line.slice(line.lastIndexOf("\r") + 1))
+    .filter((line) => line.trim());
+  return lines.slice(-MAX_PROGRESS_LINES).join("\n");
+}
+
 export const ToolCallItem = memo(function ToolCallItem({
   assistantId,
   tool,
@@ -99,6 +110,12 @@ export const ToolCallItem = memo(function ToolCallItem({
         <div className="tool-call__skill-tag">检测到技能: {tool.skillName}</div>
       )}
 
+      {!tool.result && tool.status === "running" && tool.progress && (
+        <div className="tool-call__result tool-call__result--live">
+          <pre>{progressTail(tool.progress)}</pre>
+        </div>
+      )}
+
       {tool.result && (
         <div className="tool-call__result">
           <pre>{lines.join("\n")}</pre>
@@ -4,6 +4,7 @@ const STREAM_EVENT_TYPES = [
   "thinking",
   "text",
   "tool_call",
+  "tool_progress",
   "tool_result",
   "done",
   "agent_error",
@@ -152,6 +152,86 @@ describe("chatReducer", () => {
     expect(done.isStreaming).toBe(false);
   });
 
+  it("accumulates tool_progress output until the tool result arrives", () => {
+    const submitted = chatReducer(createInitialState(), {
+      type: "submit_user_message",
+      threadId: "thread-1",
+      message: "run tool",
+      userEntryId: "user-1",
+      assistantEntryId: "assistant-1",
+      createdAt: 1,
+    });
+
+    const withToolCall = chatReducer(submitted, {
+      type: "stream_event",
+      threadId: "thread-1",
+      assistantEntryId: "assistant-1",
+      event: { type: "tool_call", id: "tool-1", name: "bash", args: { command: "make" } },
+    });
+
+    const withProgress = ["step 1\n", "step 2\n"].reduce(
+      (state, content) =>
+        chatReducer(state, {
+          type: "stream_event",
+          threadId: "thread-1",
+          assistantEntryId: "assistant-1",
+          event: { type: "tool_progress", id: "tool-1", name: "bash", stream: "stdout", content },
+        }),
+      withToolCall,
+    );
+
+    const running = withProgress.threads["thread-1"].timeline[1];
+    if (running.kind !== "assistant") throw new Error("expected assistant entry");
+    expect(running.tools[0].progress).toBe("step 1\nstep 2\n");
+
+    const withResult = chatReducer(withProgress, {
+      type: "stream_event",
+      threadId: "thread-1",
+      assistantEntryId: "assistant-1",
+      event: { type: "tool_result", name: "bash", content: "[OK]\n\nstep 1\nstep 2", success: true },
+    });
+
+    const finished = withResult.threads["thread-1"].timeline[1];
+    if (finished.kind !== "assistant") throw new Error("expected assistant entry");
+    expect(finished.tools[0].progress).toBeUndefined();
+    expect(finished.tools[0].status).toBe("success");
+  });
+
+  it("matches out-of-order tool results by tool id", () => {
+    const submitted = chatReducer(createInitialState(), {
+      type: "submit_user_message",
+      threadId: "thread-1",
+      message: "read files",
+      userEntryId: "user-1",
+      assistantEntryId: "assistant-1",
+      createdAt: 1,
+    });
+
+    const withCalls = ["tool-1", "tool-2"].reduce(
+      (state, id) =>
+        chatReducer(state, {
+          type: "stream_event",
+          threadId: "thread-1",
+          assistantEntryId: "assistant-1",
+          event: { type: "tool_call", id, name: "read_file", args: { file_path: id } },
+        }),
+      submitted,
+    );
+
+    const withResult = chatReducer(withCalls, {
+      type: "stream_event",
+      threadId: "thread-1",
+      assistantEntryId: "assistant-1",
+      event: { type: "tool_result", id: "tool-2", name: "read_file", content: "second", success: true },
+    });
+
+    const assistant = withResult.threads["thread-1"].timeline[1];
+    if (assistant.kind !== "assistant") throw new Error("expected assistant entry");
+    expect(assistant.tools[0].status).toBe("running");
+    expect(assistant.tools[1].status).toBe("success");
+    expect(assistant.tools[1].result).toBe("second");
+  });
+
   it("stores skills on skills_loaded", () => {
     const state = createInitialState();
     const next = chatReducer(state, {
@@ -4,6 +4,7 @@ import type {
   ErrorEvent,
   ThinkingEvent,
   ToolCallEvent,
+  ToolProgressEvent,
   ToolResultEvent,
   TextEvent,
 } from "../types/events";
@@ -30,6 +31,7 @@ export type ToolCallView = {
   args: Record<string, unknown>;
   status: ToolStatus;
   result?: string;
+  progress?: string;
   success?: boolean;
   expanded?: boolean;
   skillName?: string;
@@ -126,6 +128,9 @@ export type ChatAction =
 
 const DEFAULT_THREAD_ID = "thread-1";
 
+// Keep only the latest output of a running tool.
+const MAX_PROGRESS_CHARS = 4000;
+
 export function createInitialState(): ChatState {
   return {
     skills: [],
@@ -228,6 +233,29 @@ function upsertToolCall(
   return { tools: [...tools, nextTool], skillName };
 }
 
+function applyToolProgress(
+  tools: ToolCallView[],
+  event: ToolProgressEvent,
+): ToolCallView[] {
+  let index = event.id ? tools.findIndex((tool) => tool.id === event.id) : -1;
+  if (index < 0) {
+    index = tools.findIndex(
+      (tool) => tool.status === "running" && tool.name === event.name,
+    );
+  }
+  if (index < 0 || tools[index].status !== "running") {
+    return tools;
+  }
+
+  const cloned = [...tools];
+  const progress = (cloned[index].progress ?? "") + event.content;
+  cloned[index] = {
+    ...cloned[index],
+    progress: progress.slice(-MAX_PROGRESS_CHARS),
+  };
+  return cloned;
+}
+
 function applyToolResult(
   tools: ToolCallView[],
   event: ToolResultEvent,
@@ -235,9 +263,16 @@ function applyToolResult(
   const success = inferToolSuccess(event.content, event.success);
   const nextStatus: ToolStatus = success ? "success" : "failed";
 
-  let index = tools.findIndex(
-    (tool) => tool.status === "running" && tool.name === event.name,
-  );
+  // Parallel tool calls finish out of order, so match by id when the backend sends one.
+  let index = event.id
+    ? tools.findIndex((tool) => tool.id === event.id)
+    : -1;
+
+  if (index < 0) {
+    index = tools.findIndex(
+      (tool) => tool.status === "running" && tool.name === event.name,
+    );
+  }
 
   if (index < 0) {
     index = tools.findIndex((tool) => tool.status === "running");
@@ -264,6 +299,7 @@ function applyToolResult(
     ...cloned[index],
     status: nextStatus,
     result: event.content,
+    progress: undefined,
     success,
   };
   return cloned;
@@ -450,6 +486,12 @@ export function chatReducer(state: ChatState, action: ChatAction): ChatState {
             };
           }
 
+          case "tool_progress":
+            return {
+              ...assistant,
+              tools: applyToolProgress(assistant.tools, event),
+            };
+
           case "tool_result":
             return {
               ...assistant,
@@ -16,11 +16,20 @@ export type ToolCallEvent = {
   id?: string;
 };
 
+export type ToolProgressEvent = {
+  type: "tool_progress";
+  name: string;
+  id?: string;
+  stream?: "stdout" | "stderr";
+  content: string;
+};
+
 export type ToolResultEvent = {
   type: "tool_result";
   name: string;
   content: string;
   success?: boolean;
+  id?: string;
 };
 
 export type DoneEvent = {
@@ -37,6 +46,7 @@ export type AgentStreamEvent =
   | ThinkingEvent
   | TextEvent
   | ToolCallEvent
+  | ToolProgressEvent
   | ToolResultEvent
   | DoneEvent
   | ErrorEvent;